@@ -0,0 +1,79 @@
+"""
+Re-checking an unchanged corpus with and without the on-disk AST cache.
+
+parse:  parse every file (what each build did before the cache)
+cold:   an empty cache: parse every file and store it
+warm:   every file loaded from the cache
+edited: one file in ten changed, so only those are parsed
+
+Also reports the size of the cache against the size of the sources.
+
+Run from the repository root: python benchmarks/ast_cache.py [files] [statements_per_file]
+"""
+
+import os
+import sys
+import tempfile
+
+from timing import timed
+
+from rellang.cache import ParseCache
+from rellang.parser import get_parser, parse
+
+
+def write_file(path: str, prefix: str, statements: int) -> None:
+    with open(path, "w") as f:
+        f.write(f"set {prefix}P := A * B\n")
+        for i in range(statements // 2):
+            f.write(
+                f"rel {prefix}R{i} := (F{i} : {prefix}P -> C + D);(G{i} : C + D -> E);(K{i} : E -> E)^+\n"
+            )
+            f.write(f"export {prefix}R{i};(H{i} : E -> {prefix}P)\n")
+
+
+def directory_size(directory: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    directory = tempfile.mkdtemp()
+    corpus = []
+    for n in range(files):
+        path = os.path.join(directory, f"file{n}.rel")
+        write_file(path, f"F{n}_", statements)
+        corpus.append(path)
+    cache = ParseCache(tempfile.mkdtemp())
+    get_parser()
+
+    def parse_all():
+        for path in corpus:
+            with open(path) as f:
+                parse(f.read())
+
+    def cached_all():
+        for path in corpus:
+            cache.parse_file(path)
+
+    times = {"parse": timed(parse_all)[0], "cold": timed(cached_all)[0]}
+    times["warm"] = timed(cached_all)[0]
+    assert cache.hits == files
+    for path in corpus[::10]:
+        with open(path, "a") as f:
+            f.write("(Edited : A -> B)\n")
+    times["edited"] = timed(cached_all)[0]
+
+    print(f"{files} files of {statements} statements")
+    for label, seconds in times.items():
+        print(
+            f"{label:<7} {seconds * 1e3:9.1f} ms   {seconds * 1e6 / files:8.1f} us per file"
+        )
+    print(f"speedup warm vs parse {times['parse'] / times['warm']:7.1f}x")
+    print(
+        f"sources {directory_size(directory) / 1e6:6.2f} MB   cache {directory_size(cache.directory) / 1e6:6.2f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
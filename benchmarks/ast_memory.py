@@ -0,0 +1,46 @@
+"""
+Memory used by a parsed program as AST node objects vs the nested dict export.
+
+Run from the repository root: python benchmarks/ast_memory.py [statements]
+"""
+
+import sys
+import tracemalloc
+
+from rellang.parser import get_parser, parse
+
+
+def make_program(statements: int) -> str:
+    lines = []
+    for i in range(statements // 2):
+        lines.append(f"rel R{i} := (F{i} : A * B -> C + D);(G{i} : C + D -> E)")
+        lines.append(f"(R{i} * (H{i} : X -> Y)) + (K{i} : Z -> W)")
+    return "\n".join(lines)
+
+
+def measure(build) -> tuple[object, int]:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    text = make_program(statements)
+    get_parser()
+
+    program, node_bytes = measure(lambda: parse(text))
+    _, dict_bytes = measure(program.to_dict)
+
+    count = len(program["expr"])
+    print(f"{count} statements")
+    print(f"nodes   {node_bytes / 1e6:8.2f} MB  ({node_bytes / count:7.0f} B/statement)")
+    print(f"dicts   {dict_bytes / 1e6:8.2f} MB  ({dict_bytes / count:7.0f} B/statement)")
+    print(f"ratio   {dict_bytes / node_bytes:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Scaling of batch parsing with 1, 2, 4 and 8 workers on a synthetic corpus.
+
+corpus:  many independent files, distributed by parse_files()
+single:  one large file, split into waves of independent statements by parse_parallel()
+
+Run from the repository root: python benchmarks/batch_scaling.py [files] [statements_per_file]
+"""
+
+import os
+import sys
+import tempfile
+
+from timing import timed
+
+from rellang.batch import parse_files
+
+
+def write_file(path: str, prefix: str, statements: int) -> None:
+    with open(path, "w") as f:
+        for i in range(statements // 2):
+            f.write(
+                f"rel {prefix}R{i} := (F{i} : A * B -> C + D);(G{i} : C + D -> E)\n"
+            )
+            f.write(f"{prefix}R{i};(H{i} : E -> A * B)\n")
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    directory = tempfile.mkdtemp()
+    corpus = []
+    for n in range(files):
+        path = os.path.join(directory, f"file{n}.rel")
+        write_file(path, f"F{n}_", statements)
+        corpus.append(path)
+    single = os.path.join(directory, "single.rel")
+    write_file(single, "", files * statements)
+
+    print(f"{files} files x {statements} statements, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'corpus':>10} {'speedup':>8} {'single':>10} {'speedup':>8}")
+    base_corpus = base_single = None
+    for workers in (1, 2, 4, 8):
+        corpus_time, _ = timed(lambda: parse_files(corpus, workers))
+        # workers=1 parses serially, otherwise the single file goes through parse_parallel
+        single_time, _ = timed(lambda: parse_files([single], workers))
+        base_corpus = base_corpus or corpus_time
+        base_single = base_single or single_time
+        print(
+            f"{workers:>7} {corpus_time:>9.2f}s {base_corpus / corpus_time:>7.2f}x"
+            f" {single_time:>9.2f}s {base_single / single_time:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
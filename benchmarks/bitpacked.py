@@ -0,0 +1,57 @@
+"""
+Bit-packed vs byte-per-entry relations at medium density.
+
+For square relations of growing size, compares the storage of a BitRelation with a boolean matrix, and the time of composition, product (with a 4 x 4 relation) and coproduct with the bit-packed and dense backends. The dense composition converts to float32 for BLAS, so its working memory is 4 bytes per entry.
+
+Run from the repository root: python benchmarks/bitpacked.py [max_size]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import timed
+
+from rellang.bitpacked import BitPackedBackend, BitRelation
+from rellang.evaluator import DenseBackend
+
+DENSITY = 0.2
+
+
+def main() -> None:
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    rng = np.random.default_rng(0)
+    dense, packed = DenseBackend(), BitPackedBackend()
+    size = 256
+    while size <= max_size:
+        r = rng.random((size, size)) < DENSITY
+        s = rng.random((size, size)) < DENSITY
+        small = rng.random((4, 4)) < DENSITY
+        br, bs, bsmall = (BitRelation.from_dense(m) for m in (r, s, small))
+        print(
+            f"n = {size:<5} storage: bool {r.nbytes / 1e6:8.2f} MB"
+            f"   packed {br.nbytes / 1e6:8.2f} MB"
+        )
+        for label, dense_fn, packed_fn in (
+            ("compose", lambda: dense.compose(r, s), lambda: packed.compose(br, bs)),
+            (
+                "product",
+                lambda: dense.product(r, small),
+                lambda: packed.product(br, bsmall),
+            ),
+            (
+                "coproduct",
+                lambda: dense.coproduct(r, s),
+                lambda: packed.coproduct(br, bs),
+            ),
+        ):
+            dense_time, packed_time = timed(dense_fn)[0], timed(packed_fn)[0]
+            print(
+                f"          {label:<10} bool {dense_time * 1e3:9.2f} ms"
+                f"   packed {packed_time * 1e3:9.2f} ms"
+            )
+        size *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Composition chains evaluated as written vs in the order chosen by ChainOptimizer.
+
+Each chain alternates wide and narrow carriers, so the left-deep order as written builds large intermediate relations that a different bracketing avoids.
+
+Run from the repository root: python benchmarks/chain.py
+"""
+
+import numpy as np
+
+from timing import timed
+
+from rellang.evaluator import Evaluator
+from rellang.parser import parse
+
+DENSITY = 0.3
+CHAINS = {
+    "wide-narrow": [2000, 8, 2000, 8, 2000, 8],
+    "funnel": [3000, 2000, 1000, 100, 10, 2],
+    "narrow-ends": [4, 3000, 3000, 3000, 4],
+}
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    for label, sizes in CHAINS.items():
+        carriers = {f"S{i}": size for i, size in enumerate(sizes)}
+        relations = {
+            f"R{i}": rng.random((sizes[i], sizes[i + 1])) < DENSITY
+            for i in range(len(sizes) - 1)
+        }
+        text = ";".join(f"(R{i} : S{i} -> S{i + 1})" for i in range(len(sizes) - 1))
+        expr = parse(text).expr[0].expr
+
+        times = {}
+        for reorder in (False, True):
+            evaluator = Evaluator(carriers, relations, reorder_chains=reorder)
+            times[reorder], _ = timed(lambda: evaluator.evaluate(expr))
+        print(f"{label}: {' x '.join(map(str, sizes))}")
+        print(Evaluator(carriers, relations, reorder_chains=True).chains.explain(expr))
+        print(
+            f"  as written {times[False] * 1e3:9.2f} ms   reordered {times[True] * 1e3:9.2f} ms\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Transitive closure algorithms on graphs of increasing size.
+
+For random graphs of average out-degree 0.5, 2 and 8 and for a path, computes R^+ by repeated squaring, by Warshall's algorithm on bit-packed rows and by semi-naive iteration over a SparseRelation (run to the end, without handing over to a dense algorithm), checks that they agree and reports the times next to that of the evaluator's choice, matrix_closure. Semi-naive iteration is skipped where it would take more than a few seconds.
+
+Run from the repository root: python benchmarks/closure.py [max_size]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import timed
+
+from rellang.bitpacked import BitRelation
+from rellang.closure import (
+    matrix_closure,
+    semi_naive_closure,
+    squaring_closure,
+    warshall_closure,
+)
+from rellang.sparse import SparseRelation, as_dense
+
+DEGREES = (0.5, 2.0, 8.0)
+# Closure pairs above which semi-naive iteration is not timed
+MAX_SEMI_NAIVE_PAIRS = 1 << 20
+
+
+def graphs(size: int, rng: np.random.Generator):
+    for degree in DEGREES:
+        yield f"degree {degree}", rng.random((size, size)) < degree / size
+    yield "path", np.eye(size, k=1, dtype=bool)
+
+
+def warshall(matrix: np.ndarray) -> np.ndarray:
+    packed = BitRelation.from_dense(matrix)
+    return BitRelation(packed.shape, warshall_closure(packed.words)).to_dense()
+
+
+def main() -> None:
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    rng = np.random.default_rng(0)
+    size = 128
+    while size <= max_size:
+        for label, matrix in graphs(size, rng):
+            squaring_time, expected = timed(lambda: squaring_closure(matrix))
+            warshall_time, result = timed(lambda: warshall(matrix))
+            assert np.array_equal(result, expected)
+            chosen_time, result = timed(lambda: matrix_closure(matrix))
+            assert np.array_equal(result, expected)
+            line = (
+                f"|A| = {size:<5} {label:<11} closure density {expected.mean():5.3f}"
+                f"   squaring {squaring_time * 1e3:9.2f} ms"
+                f"   warshall {warshall_time * 1e3:8.2f} ms"
+            )
+            if np.count_nonzero(expected) <= MAX_SEMI_NAIVE_PAIRS:
+                sparse = SparseRelation.from_dense(matrix)
+                semi_naive_time, result = timed(
+                    lambda: semi_naive_closure(sparse, max_density=1.0)
+                )
+                assert np.array_equal(as_dense(result), expected)
+                line += f"   semi-naive {semi_naive_time * 1e3:8.2f} ms"
+            else:
+                line += f"   semi-naive {'-':>8}   "
+            print(line + f"   chosen {chosen_time * 1e3:8.2f} ms")
+        size *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Lazy converse and complement vs negating and transposing matrices first.
+
+Evaluates compositions with complemented and converse operands through the evaluator, where complements are flags resolved from path counts and converses are transposed views, and through materialized matrices, checks that they agree and reports times and peak memory (NumPy allocations are traced by tracemalloc).
+
+Run from the repository root: python benchmarks/complement.py [max_size]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import traced
+
+from rellang.evaluator import DenseBackend, Evaluator
+from rellang.parser import parse
+
+EXPRESSIONS = {
+    "~R;S": "~(R : A -> B);(S : B -> A)",
+    "R;~S": "(R : A -> B);~(S : B -> A)",
+    "~R;~S": "~(R : A -> B);~(S : B -> A)",
+    "R^;~R": "(R : A -> B)^;~(R : A -> B)",
+}
+DENSITY = 0.05
+
+
+def materialized(text: str, relations: dict) -> np.ndarray:
+    dense = DenseBackend()
+    r, s = relations["R"], relations["S"]
+    if text == "~R;S":
+        return dense.compose(~r, s)
+    if text == "R;~S":
+        return dense.compose(r, ~s)
+    if text == "~R;~S":
+        return dense.compose(~r, ~s)
+    return dense.compose(np.ascontiguousarray(r.T), ~r)
+
+
+def main() -> None:
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(0)
+    size = 250
+    while size <= max_size:
+        carriers = {"A": size, "B": size}
+        relations = {
+            "R": rng.random((size, size)) < DENSITY,
+            "S": rng.random((size, size)) < DENSITY,
+        }
+        for label, text in EXPRESSIONS.items():
+            expr = parse(text).expr[0].expr
+            evaluator = Evaluator(carriers, relations)
+            lazy_time, lazy_peak, value = traced(lambda: evaluator.evaluate(expr))
+            matrix_time, matrix_peak, expected = traced(
+                lambda: materialized(label, relations)
+            )
+            assert np.array_equal(value, expected)
+            print(
+                f"|A| = {size:<5} {label:<6} lazy {lazy_time * 1e3:8.2f} ms"
+                f" {lazy_peak / 2**20:7.1f} MiB"
+                f"   materialized {matrix_time * 1e3:8.2f} ms"
+                f" {matrix_peak / 2**20:7.1f} MiB"
+            )
+        size *= 2
+
+
+if __name__ == "__main__":
+    main()
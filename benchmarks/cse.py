@@ -0,0 +1,66 @@
+"""
+Evaluator vs CachingEvaluator on a program reusing subexpressions.
+
+The program defines a relation and uses it, and the same written-out fragment, in many statements. Reports the time of a first whole-program evaluation, of a second one answered from the cache, and of a re-evaluation after one input relation changes, with the cache statistics.
+
+Run from the repository root: python benchmarks/cse.py [size] [statements]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import timed
+
+from rellang.cse import CachingEvaluator
+from rellang.evaluator import Evaluator
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+
+DENSITY = 0.05
+
+
+def program_text(statements: int) -> str:
+    lines = ["rel D := (R : A -> B);(S : B -> A);(T : A -> A)"]
+    for i in range(statements):
+        if i % 3 == 0:
+            lines.append("D;D;(R : A -> B)")
+        elif i % 3 == 1:
+            lines.append("((R : A -> B);(S : B -> A);(T : A -> A));(R : A -> B)")
+        else:
+            lines.append("(D;D) + (T : A -> A)")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    rng = np.random.default_rng(0)
+    carriers = {"A": size, "B": size // 2}
+    relations = {
+        "R": rng.random((size, size // 2)) < DENSITY,
+        "S": rng.random((size // 2, size)) < DENSITY,
+        "T": rng.random((size, size)) < DENSITY,
+    }
+    names = NamesContext()
+    program = parse(program_text(statements), names)
+
+    plain = Evaluator(carriers, relations, names)
+    plain_time, expected = timed(lambda: plain.evaluate_program(program))
+    caching = CachingEvaluator(carriers, relations, names)
+    first_time, values = timed(lambda: caching.evaluate_program(program))
+    assert all(np.array_equal(a, b) for a, b in zip(values, expected))
+    second_time, _ = timed(lambda: caching.evaluate_program(program))
+    caching.update_relation("T", rng.random((size, size)) < DENSITY)
+    update_time, _ = timed(lambda: caching.evaluate_program(program))
+
+    print(f"|A| = {size}, {statements} statements")
+    print(f"  Evaluator              {plain_time * 1e3:9.2f} ms")
+    print(f"  CachingEvaluator first {first_time * 1e3:9.2f} ms")
+    print(f"  cached                 {second_time * 1e3:9.2f} ms")
+    print(f"  after updating T       {update_time * 1e3:9.2f} ms")
+    print(f"  cache {caching.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+NumPy evaluator vs a pure-Python set-of-pairs reference.
+
+Evaluates a composition chain, a product and a coproduct over random relations of increasing carrier size with both, checks that they agree and reports the times.
+
+Run from the repository root: python benchmarks/evaluator.py [max_size]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import timed
+
+from rellang.evaluator import Evaluator
+from rellang.nodes import (
+    AtomicRelation,
+    ComposedRelation,
+    CoproductRelation,
+    ProductRelation,
+)
+from rellang.parser import parse
+
+EXPRESSIONS = {
+    "chain": "(R : A -> B);(S : B -> C);(T : C -> A);(R : A -> B)",
+    "product": "(R : A -> B) * (U : D -> D)",
+    "coproduct": "((R : A -> B);(S : B -> C)) + (T : C -> A)",
+}
+DENSITY = 0.05
+
+
+def reference(expr, evaluator: Evaluator, relations: dict) -> set[tuple[int, int]]:
+    """The relation as a set of (domain index, codomain index) pairs."""
+    if isinstance(expr, AtomicRelation):
+        rows, columns = np.nonzero(relations[expr.rel_name])
+        return set(zip(rows.tolist(), columns.tolist()))
+    left = reference(expr.left, evaluator, relations)
+    right = reference(expr.right, evaluator, relations)
+    if isinstance(expr, ComposedRelation):
+        successors: dict[int, list[int]] = {}
+        for b, c in right:
+            successors.setdefault(b, []).append(c)
+        return {(a, c) for a, b in left for c in successors.get(b, ())}
+    right_rows = evaluator.set_size(expr.right.dom_cod.domain)
+    right_columns = evaluator.set_size(expr.right.dom_cod.codomain)
+    if isinstance(expr, ProductRelation):
+        return {
+            (a * right_rows + c, b * right_columns + d)
+            for a, b in left
+            for c, d in right
+        }
+    assert isinstance(expr, CoproductRelation)
+    left_rows = evaluator.set_size(expr.left.dom_cod.domain)
+    left_columns = evaluator.set_size(expr.left.dom_cod.codomain)
+    return left | {(c + left_rows, d + left_columns) for c, d in right}
+
+
+def main() -> None:
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    rng = np.random.default_rng(0)
+    size = 100
+    while size <= max_size:
+        carriers = {"A": size, "B": size // 2, "C": size * 2, "D": 20}
+        shapes = {"R": ("A", "B"), "S": ("B", "C"), "T": ("C", "A"), "U": ("D", "D")}
+        relations = {
+            name: rng.random((carriers[dom], carriers[cod])) < DENSITY
+            for name, (dom, cod) in shapes.items()
+        }
+        for label, text in EXPRESSIONS.items():
+            expr = parse(text).expr[0].expr
+            evaluator = Evaluator(carriers, relations)
+            numpy_time, value = timed(lambda: evaluator.evaluate(expr))
+            python_time, pairs = timed(lambda: reference(expr, evaluator, relations))
+            rows, columns = np.nonzero(value)
+            assert set(zip(rows.tolist(), columns.tolist())) == pairs
+            print(
+                f"|A| = {size:<5} {label:<10} numpy {numpy_time * 1e3:9.2f} ms"
+                f"   set of pairs {python_time * 1e3:10.2f} ms"
+                f"   x{python_time / numpy_time:8.1f}"
+            )
+        size *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Editing one line of a 10k statement program: full parse() vs IncrementalParser.
+
+Run from the repository root: python benchmarks/incremental.py [statements]
+"""
+
+import sys
+
+from timing import timed
+
+from rellang.incremental import IncrementalParser
+from rellang.parser import get_parser, parse
+
+
+def make_program(statements: int) -> list[str]:
+    # Chains of definitions: each block defines R{i} and uses it in a composition
+    lines = []
+    for i in range(statements // 2):
+        lines.append(f"rel R{i} := (F{i} : A{i} -> B{i});(G{i} : B{i} -> C{i})")
+        lines.append(f"R{i};(H{i} : C{i} -> D{i})")
+    return lines
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    lines = make_program(statements)
+    original = "\n".join(lines)
+    middle = len(lines) // 2 - (len(lines) // 2) % 2
+    lines[middle] = lines[middle].replace("(F", "(FF")
+    edited = "\n".join(lines)
+    get_parser()
+
+    full, _ = timed(lambda: parse(edited))
+
+    incremental = IncrementalParser()
+    initial, _ = timed(lambda: incremental.parse(original))
+    reparse, _ = timed(lambda: incremental.parse(edited))
+
+    print(f"{len(lines)} statements, one definition body edited")
+    print(f"full parse()            {full * 1e3:9.1f} ms")
+    print(f"incremental, first run  {initial * 1e3:9.1f} ms")
+    print(
+        f"incremental, after edit {reparse * 1e3:9.1f} ms"
+        f"  ({incremental.reparsed} reparsed, {incremental.reused} reused)"
+    )
+    print(f"speedup vs full parse   {full / reparse:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+LaTeX export of growing programs.
+
+Generates programs of n definitions and exported statements, exports them with rellang.latex.compile_latex, parsing one statement at a time and writing to a stream that only counts characters, and reports the time per statement and the peak memory traced during a second, traced export. Time per statement should stay flat as n grows, and peak memory should only grow with the definitions held in the names context, not with the text written.
+
+Run from the repository root: python benchmarks/latex.py [max_statements]
+"""
+
+import sys
+
+from timing import timed, traced
+
+from rellang.latex import compile_latex
+
+
+class CountingStream:
+    def __init__(self):
+        self.characters = 0
+
+    def write(self, text: str) -> int:
+        self.characters += len(text)
+        return len(text)
+
+
+def program(statements: int):
+    """Lines of a program, generated as they are read."""
+    yield "set P := A * B"
+    yield "rel D0 := (R : P -> C);(S : C -> C)^+"
+    for i in range(1, statements):
+        yield f"rel D{i} := D{i - 1};(S : C -> C)^+"
+        yield (
+            f"export ((D{i};(S : C -> C)^) * ~(First : P -> A)^);((U : C -> A) * (V : P -> A))"
+            ";(T : A * A -> A * A)^+"
+        )
+
+
+def main() -> None:
+    max_statements = int(sys.argv[1]) if len(sys.argv) > 1 else 16000
+    statements = 1000
+    while statements <= max_statements:
+        stream = CountingStream()
+        elapsed, lines = timed(lambda: compile_latex(program(statements), stream))
+        _, peak, _ = traced(
+            lambda: compile_latex(program(statements), CountingStream())
+        )
+        print(
+            f"{statements:>6} statements   {lines:>6} lines   {stream.characters / 1e6:6.2f} M characters"
+            f"   {elapsed * 1e6 / statements:7.1f} us per statement   peak {peak / 1e6:6.2f} MB"
+        )
+        statements *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Peak RSS when scanning and parsing a large generated file.
+
+scan read        open().read() the file, then Scanner over the string
+scan mmap        Scanner.open(), scanning the memory mapped bytes
+parse            parse() of the whole text (on a smaller file)
+parse_file       parse_file() through the memory map (on the same smaller file)
+
+Each case runs in a fresh interpreter so ru_maxrss is its own peak.
+
+Run from the repository root: python benchmarks/mmap_scan.py [scan_MB] [parse_MB]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+LINES = (
+    "rel R{i} := (F{i} : A * B -> C + D);(G{i} : C + D -> E)\n",
+    "R{i};((H{i} : E -> X);(K{i} : X -> Y * Z)) : A * B -> Y * Z\n",
+)
+
+
+def write_file(path: str, megabytes: float) -> None:
+    size = 0
+    i = 0
+    with open(path, "w") as f:
+        while size < megabytes * 1e6:
+            for line in LINES:
+                size += f.write(line.format(i=i))
+            i += 1
+
+
+def run_case(case: str, path: str) -> None:
+    start = time.perf_counter()
+    if case == "scan read":
+        from rellang.scanner.scanner import Scanner
+
+        with open(path) as f:
+            count = sum(1 for _ in Scanner(f.read()).iter_tokens())
+    elif case == "scan mmap":
+        from rellang.scanner.scanner import Scanner
+
+        with Scanner.open(path) as scanner:
+            count = sum(1 for _ in scanner.iter_tokens())
+    elif case == "parse":
+        from rellang.parser import parse
+
+        with open(path) as f:
+            count = len(parse(f.read()).expr)
+    else:
+        from rellang.parser import iter_file_statements
+
+        count = sum(1 for _ in iter_file_statements(path))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"{case:<11} {count:>10} items {elapsed:7.2f} s   peak RSS {peak:8.1f} MB")
+
+
+def main() -> None:
+    if len(sys.argv) > 2 and sys.argv[1] == "--case":
+        run_case(sys.argv[2], sys.argv[3])
+        return
+    scan_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+    parse_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    directory = tempfile.mkdtemp()
+    scan_path = os.path.join(directory, "scan.rel")
+    parse_path = os.path.join(directory, "parse.rel")
+    write_file(scan_path, scan_mb)
+    write_file(parse_path, parse_mb)
+
+    for case, path in (
+        ("scan read", scan_path),
+        ("scan mmap", scan_path),
+        ("parse", parse_path),
+        ("parse_file", parse_path),
+    ):
+        print(f"{os.path.getsize(path) / 1e6:6.1f} MB file: ", end="", flush=True)
+        subprocess.run([sys.executable, __file__, "--case", case, path], check=True)
+
+
+if __name__ == "__main__":
+    main()
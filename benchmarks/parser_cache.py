@@ -0,0 +1,42 @@
+"""
+Cold vs warm parse latency.
+
+cold:  build the LALR parser from the grammar, then parse (the old per-call behaviour)
+disk:  load the parser from the on-disk cache, then parse
+warm:  parse with the process-wide parser from get_parser()
+
+Run from the repository root: python benchmarks/parser_cache.py
+"""
+
+import os
+import statistics
+import tempfile
+
+from timing import repeated
+
+from rellang.parser import build_parser, get_parser, parse
+
+STATEMENT = "(R : A -> B) * (S : C -> D);(T : B * D -> E)"
+
+
+def report(label: str, times: list[float]) -> None:
+    print(
+        f"{label:<6} median {statistics.median(times) * 1e3:8.3f} ms"
+        f"   min {min(times) * 1e3:8.3f} ms   ({len(times)} runs)"
+    )
+
+
+def main() -> None:
+    cache_path = os.path.join(tempfile.mkdtemp(), "rellang.lark")
+    build_parser(cache=cache_path)  # populate the cache file
+
+    report("cold", repeated(lambda: parse(STATEMENT, parser=build_parser()), 20))
+    report(
+        "disk", repeated(lambda: parse(STATEMENT, parser=build_parser(cache_path)), 20)
+    )
+    get_parser()
+    report("warm", repeated(lambda: parse(STATEMENT), 2000))
+
+
+if __name__ == "__main__":
+    main()
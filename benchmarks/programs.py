@@ -0,0 +1,66 @@
+"""
+Generators for synthetic rellang programs, shared by the benchmarks.
+
+Every generator takes a size and returns program text that parses without errors, so the same families can be fed to parse(), the Scanner and any other engine. PROGRAMS maps a family name to its generator.
+"""
+
+from typing import Callable
+
+
+def composition_chain(length: int) -> str:
+    """One statement composing length annotated relations, (R0 : S0 -> S1);(R1 : S1 -> S2);..."""
+    return (
+        ";".join(f"(R{i} : S{i} -> S{i + 1})" for i in range(length))
+        + f" : S0 -> S{length}\n"
+    )
+
+
+def wide_product(width: int) -> str:
+    """A product and a coproduct of width relations over distinct sets, the sets as wide products too."""
+    product = " * ".join(f"(P{i} : A{i} -> B{i})" for i in range(width))
+    coproduct = " + ".join(f"(Q{i} : A{i} * B{i} -> C{i})" for i in range(width))
+    return f"{product}\n{coproduct}\n"
+
+
+def deep_parens(depth: int) -> str:
+    """Right-nested compositions, every level in its own parentheses, and a set expression nested as deep."""
+    rel = "(R : A -> A)"
+    for i in range(depth):
+        rel = f"((R{i} : A -> A);{rel})"
+    nested_set = "A"
+    for i in range(depth):
+        nested_set = f"(B{i} * {nested_set})"
+    return f"{rel}\nset X := {nested_set}\n"
+
+
+def definition_table(size: int) -> str:
+    """size relation definitions, each referring to the previous two by name, followed by uses of all of them."""
+    lines = [
+        "set X := A * B",
+        "rel D0 := (F0 : X -> X)",
+        "rel D1 := (F1 : X -> X);D0",
+    ]
+    for i in range(2, size):
+        lines.append(f"rel D{i} := D{i - 1};((G{i} : X -> X);D{i - 2}) : X -> X")
+    lines.extend(f"D{i};(H : X -> C)" for i in range(size))
+    return "\n".join(lines) + "\n"
+
+
+def realistic(statements: int) -> str:
+    """A mix of set and relation definitions and the expressions using them."""
+    lines = []
+    for i in range(statements // 4):
+        lines.append(f"set S{i} := A{i} * (B{i} + C)")
+        lines.append(f"rel R{i} := (F{i} : S{i} -> D) * (G{i} : E -> E)")
+        lines.append(f"R{i};(H : D * E -> Y)")
+        lines.append(f"(K{i} : Y -> S{i}) + (L{i} : Z -> W) : Y + Z -> S{i} + W")
+    return "\n".join(lines) + "\n"
+
+
+PROGRAMS: dict[str, Callable[[int], str]] = {
+    "chain": composition_chain,
+    "wide": wide_product,
+    "parens": deep_parens,
+    "definitions": definition_table,
+    "realistic": realistic,
+}
@@ -0,0 +1,54 @@
+"""
+Point and subset queries vs evaluating the whole expression.
+
+Takes the image of one element and of a 1% subset under the chain R;S;T;U;V of random relations, once with rellang.query.Query and once by evaluating the composed relation with the dense and sparse backends and reading its rows, checks that they agree and reports the times. Query times are for repeated queries, after the one-off conversion of the matrices.
+
+Run from the repository root: python benchmarks/query.py [max_size]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import timed
+
+from rellang.evaluator import Evaluator
+from rellang.parser import parse
+from rellang.query import Query
+from rellang.sparse import SparseBackend, as_dense
+
+NAMES = "RSTUV"
+AVERAGE_DEGREE = 4
+
+
+def main() -> None:
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    rng = np.random.default_rng(0)
+    expr = parse(";".join(f"({name} : A -> A)" for name in NAMES)).expr[0].expr
+    size = 500
+    while size <= max_size:
+        relations = {
+            name: rng.random((size, size)) < AVERAGE_DEGREE / size for name in NAMES
+        }
+        query = Query({"A": size}, relations)
+        query.image(expr, [0])
+        subsets = {
+            "point": np.array([0]),
+            "1% subset": rng.choice(size, size // 100, replace=False),
+        }
+        for backend in (None, SparseBackend()):
+            evaluator = Evaluator({"A": size}, relations, backend=backend)
+            full_time, value = timed(lambda: as_dense(evaluator.evaluate(expr)))
+            for label, subset in subsets.items():
+                query_time, image = timed(lambda: query.image(expr, subset))
+                assert np.array_equal(image, np.flatnonzero(value[subset].any(axis=0)))
+                print(
+                    f"|A| = {size:<5} {label:<10} query {query_time * 1e3:8.3f} ms"
+                    f" ({query.pairs_visited} pairs)   full {evaluator.backend.name:<6}"
+                    f" {full_time * 1e3:9.2f} ms   x{full_time / query_time:9.1f}"
+                )
+        size *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Benchmark suite over the generated programs in programs.py.
+
+For every program family and size each engine is timed (median and min over several runs) and its peak traced memory measured in a separate run. The engines are
+
+scanner     Scanner(text) tokens only
+lark        the shared LALR parser, syntax only
+typecheck   ASTTransformer over an already parsed tree (names, types, AST nodes)
+parse       parse(text), everything
+incremental IncrementalParser reparsing the text it parsed last, every statement reused
+expand      Expander over a parsed program, replacing every definition by its body
+latex       compile_latex(text), every statement
+evaluate    Evaluator.evaluate_program with the dense backend
+sparse      the same with SparseBackend
+bitpacked   the same with BitPackedBackend
+reorder     the same with the dense backend and reorder_chains
+cse         CachingEvaluator.evaluate_program, a new evaluator and cache each run
+
+The evaluating engines give every atomic set 4 elements and each atomic relation a random matrix of density 0.2. Programs with a relation type of more than 2**22 pairs, such as the larger wide products, are reported as too large rather than evaluated.
+
+New engines are added to ENGINES as (setup, run): setup(text) is not timed and its result is passed to run. A setup raises TooLarge for programs the engine cannot handle.
+
+Results are written as JSON, by default to benchmarks/results/<commit>.json, and two result files can be compared:
+
+    python benchmarks/run.py [--quick] [--programs chain,wide] [--engines parse] [--out FILE]
+    python benchmarks/run.py --compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+from programs import PROGRAMS
+from timing import timed, traced
+
+from rellang.bitpacked import BitPackedBackend
+from rellang.cse import CachingEvaluator
+from rellang.evaluator import Evaluator
+from rellang.expansion import Expander
+from rellang.incremental import IncrementalParser
+from rellang.latex import compile_latex
+from rellang.names_context import NamesContext
+from rellang.nodes import AtomicRelation, Relation, SetExpr, walk
+from rellang.parser import get_parser, parse, transform
+from rellang.scanner.scanner import Scanner
+from rellang.sparse import SparseBackend
+from rellang.testing import random_relations
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SIZES = {
+    "chain": (10, 100, 1000),
+    "wide": (10, 100, 1000),
+    "parens": (10, 100, 1000),
+    "definitions": (10, 100, 1000),
+    "realistic": (100, 1000, 5000),
+}
+QUICK_SIZES = {name: sizes[:2] for name, sizes in SIZES.items()}
+
+# Inputs of the evaluating engines
+CARRIER_SIZE = 4
+DENSITY = 0.2
+MAX_CELLS = 1 << 22
+
+
+class TooLarge(Exception):
+    """The program is too large for the engine."""
+
+
+def _same(text: str) -> str:
+    return text
+
+
+def _parse_with_names(text: str) -> tuple:
+    names = NamesContext()
+    return parse(text, names), names
+
+
+def _expand(parsed: tuple) -> None:
+    program, names = parsed
+    Expander(names).expand(program)
+
+
+def _scan(text: str) -> None:
+    for _ in Scanner(text).iter_tokens():
+        pass
+
+
+def _parsed_incrementally(text: str) -> tuple:
+    parser = IncrementalParser()
+    parser.parse(text)
+    return parser, text
+
+
+def _latex(text: str) -> None:
+    compile_latex(text, io.StringIO(), exported_only=False)
+
+
+def _evaluation_inputs(text: str) -> tuple:
+    """The program, its names, carriers and relations for the evaluating engines."""
+    program, names = _parse_with_names(text)
+    carriers = {}
+    relations = []
+    for node in walk(program):
+        if isinstance(node, SetExpr) and node.operation == "atomic":
+            carriers[node.name] = CARRIER_SIZE
+        elif isinstance(node, Relation):
+            relations.append(node)
+    set_size = Evaluator(carriers, {}, names).set_size
+    shapes = {}
+    for relation in relations:
+        shape = (
+            set_size(relation.dom_cod.domain),
+            set_size(relation.dom_cod.codomain),
+        )
+        if shape[0] * shape[1] > MAX_CELLS:
+            raise TooLarge(f"a relation of {shape[0]} x {shape[1]} pairs")
+        if isinstance(relation, AtomicRelation):
+            shapes[relation.rel_name] = shape
+    return program, names, carriers, random_relations(shapes, DENSITY)
+
+
+def _evaluate(evaluator=Evaluator, **options) -> Callable[[tuple], None]:
+    def run(inputs: tuple) -> None:
+        program, names, carriers, relations = inputs
+        evaluator(carriers, relations, names, **options).evaluate_program(program)
+
+    return run
+
+
+ENGINES: dict[str, tuple[Callable[[str], Any], Callable[[Any], Any]]] = {
+    "scanner": (_same, _scan),
+    "lark": (_same, lambda text: get_parser().parse(text)),
+    "typecheck": (lambda text: get_parser().parse(text), transform),
+    "parse": (_same, parse),
+    "incremental": (_parsed_incrementally, lambda parsed: parsed[0].parse(parsed[1])),
+    "expand": (_parse_with_names, _expand),
+    "latex": (_same, _latex),
+    "evaluate": (_evaluation_inputs, _evaluate()),
+    "sparse": (_evaluation_inputs, _evaluate(backend=SparseBackend())),
+    "bitpacked": (_evaluation_inputs, _evaluate(backend=BitPackedBackend())),
+    "reorder": (_evaluation_inputs, _evaluate(reorder_chains=True)),
+    "cse": (_evaluation_inputs, _evaluate(CachingEvaluator)),
+}
+
+
+def measure(setup, run, text: str, min_time: float, max_runs: int) -> dict:
+    times = []
+    total = 0.0
+    while len(times) < max_runs and (total < min_time or len(times) < 3):
+        arg = setup(text)
+        elapsed, _ = timed(lambda: run(arg))
+        times.append(elapsed)
+        total += elapsed
+
+    arg = setup(text)
+    _, peak, _ = traced(lambda: run(arg))
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "runs": len(times),
+        "peak_bytes": peak,
+    }
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(programs: list[str], engines: list[str], quick: bool) -> dict:
+    get_parser()  # Building the parser is not part of any measurement
+    sizes = QUICK_SIZES if quick else SIZES
+    results = []
+    for program in programs:
+        for size in sizes[program]:
+            text = PROGRAMS[program](size)
+            for engine in engines:
+                setup, run = ENGINES[engine]
+                result = {"program": program, "size": size, "engine": engine}
+                try:
+                    result.update(measure(setup, run, text, 0.05 if quick else 0.5, 50))
+                except RecursionError:
+                    result["error"] = "RecursionError"
+                except TooLarge:
+                    result["error"] = "too large"
+                results.append(result)
+                print(format_result(result), flush=True)
+    return {
+        "commit": current_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def format_result(result: dict) -> str:
+    label = f"{result['program']:<12} {result['size']:>6} {result['engine']:<11}"
+    if "error" in result:
+        return f"{label} {result['error']}"
+    return (
+        f"{label} median {result['median_s'] * 1e3:10.3f} ms"
+        f"   peak {result['peak_bytes'] / 1e6:8.2f} MB"
+    )
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Prints new/old ratios of median time and peak memory for the cases in both files."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    key = lambda result: (result["program"], result["size"], result["engine"])
+    old_results = {key(result): result for result in old["results"]}
+    print(f"{old['commit']} -> {new['commit']}  (ratio < 1 is faster / smaller)")
+    for result in new["results"]:
+        before = old_results.get(key(result))
+        label = f"{result['program']:<12} {result['size']:>6} {result['engine']:<11}"
+        if before is None:
+            print(f"{label} new")
+        elif "error" in result or "error" in before:
+            print(f"{label} {before.get('error', 'ok')} -> {result.get('error', 'ok')}")
+        else:
+            time_ratio = result["median_s"] / before["median_s"]
+            memory_ratio = result["peak_bytes"] / max(before["peak_bytes"], 1)
+            flag = "  <-- slower" if time_ratio > 1.1 else ""
+            print(
+                f"{label} time x{time_ratio:6.2f}   memory x{memory_ratio:6.2f}{flag}"
+            )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    arg_parser.add_argument(
+        "--quick", action="store_true", help="small sizes, short runs"
+    )
+    arg_parser.add_argument("--programs", default=",".join(PROGRAMS))
+    arg_parser.add_argument("--engines", default=",".join(ENGINES))
+    arg_parser.add_argument("--out", help="result file, default results/<commit>.json")
+    arg_parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = arg_parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    programs = args.programs.split(",")
+    engines = args.engines.split(",")
+    for kind, names, known in (
+        ("program", programs, PROGRAMS),
+        ("engine", engines, ENGINES),
+    ):
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            sys.exit(f"Unknown {kind}: {', '.join(unknown)}")
+
+    suite = run_suite(programs, engines, args.quick)
+    out = args.out or os.path.join(RESULTS_DIR, f"{suite['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(suite, f, indent=2)
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
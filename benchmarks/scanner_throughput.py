@@ -0,0 +1,57 @@
+"""
+Tokenizer throughput in tokens/sec: rellang's Scanner vs Lark's built-in lexer.
+
+Scanner           Scanner.iter_tokens() over the whole source
+ScannerLexer      Scanner wrapped as a Lark lexer, producing Lark tokens
+lark basic lexer  Lark(...).lex(), Lark's standard lexer over the whole source
+parse (scanner)   full parse() with build_parser(scanner=True), for reference
+parse (lark)      full parse() with the default parser, for reference
+
+Run from the repository root: python benchmarks/scanner_throughput.py [statements]
+"""
+
+import sys
+
+from lark import Lark
+
+from timing import best_of
+
+from rellang.grammar import grammar
+from rellang.parser import build_parser, parse
+from rellang.scanner.scanner import Scanner
+
+
+def make_source(statements: int) -> str:
+    lines = []
+    for i in range(statements // 2):
+        lines.append(f"rel R{i} := (F{i} : A * B -> C + D);(G{i} : C + D -> E)")
+        lines.append(f"R{i};((H{i} : E -> X);(K{i} : X -> Y * Z)) : A * B -> Y * Z")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    source = make_source(statements)
+    tokens = sum(1 for _ in Scanner(source).iter_tokens())
+
+    lark_lexer = Lark(grammar, parser="lalr")
+    lark_parser = build_parser()
+    scanner_parser = build_parser(scanner=True)
+
+    cases = [
+        ("Scanner", lambda: sum(1 for _ in Scanner(source).iter_tokens())),
+        ("ScannerLexer", lambda: sum(1 for _ in scanner_parser.lex(source))),
+        ("lark basic lexer", lambda: sum(1 for _ in lark_lexer.lex(source))),
+        ("parse (scanner)", lambda: parse(source, parser=scanner_parser)),
+        ("parse (lark)", lambda: parse(source, parser=lark_parser)),
+    ]
+    print(f"{tokens} tokens, {len(source) / 1e6:.1f} MB source")
+    for label, fn in cases:
+        elapsed = best_of(fn, 1 if label.startswith("parse") else 5)
+        print(
+            f"{label:<17} {tokens / elapsed / 1e6:6.2f} M tokens/s  ({elapsed * 1e3:8.1f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
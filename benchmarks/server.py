@@ -0,0 +1,131 @@
+"""
+Diagnostics latency of the resident language server, against starting a fresh process per check.
+
+Starts python -m rellang.server, opens documents of increasing size and types into the body of a definition in the middle one character at a time, alternating edits that type check and edits that do not. Reports the median and 95th percentile time from sending each didChange to receiving its publishDiagnostics, next to the time taken by a new process that imports the parser and checks the document once.
+
+Run from the repository root: python benchmarks/server.py [max_statements]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from rellang.server import read_message, write_message
+
+EDITS = 200
+
+
+def make_program(statements: int) -> list[str]:
+    lines = []
+    for i in range(statements // 2):
+        lines.append(f"rel R{i} := (F{i} : A{i} -> B{i});(G{i} : B{i} -> C{i})")
+        lines.append(f"R{i};(H{i} : C{i} -> D{i})")
+    return lines
+
+
+def start_server() -> subprocess.Popen:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [os.getcwd(), env.get("PYTHONPATH")])
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "rellang.server"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env=env,
+    )
+
+
+def send(server: subprocess.Popen, method: str, params: dict, **fields):
+    write_message(
+        server.stdin, {"jsonrpc": "2.0", "method": method, "params": params, **fields}
+    )
+
+
+def cold_check(text: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from rellang.parser import parse; parse(sys.stdin.read())",
+        ],
+        input=text.encode(),
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    max_statements = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    server = start_server()
+    send(server, "initialize", {"capabilities": {}}, id=1)
+    read_message(server.stdout)
+    send(server, "initialized", {})
+
+    statements = 100
+    while statements <= max_statements:
+        lines = make_program(statements)
+        uri = f"file:///program{statements}.rel"
+        send(
+            server,
+            "textDocument/didOpen",
+            {"textDocument": {"uri": uri, "version": 0, "text": "\n".join(lines)}},
+        )
+        read_message(server.stdout)
+
+        # Edit G{i} : B{i} -> C{i} in the middle definition: appending to B{i} breaks the composition (and the statement using R{i}), deleting it again fixes it
+        line = len(lines) // 2 - (len(lines) // 2) % 2
+        column = lines[line].index(" -> ", lines[line].index("(G"))
+        latencies = []
+        errors = 0
+        for version in range(1, EDITS + 1):
+            if version % 2:
+                change = {
+                    "range": {
+                        "start": {"line": line, "character": column},
+                        "end": {"line": line, "character": column},
+                    },
+                    "text": "x",
+                }
+            else:
+                change = {
+                    "range": {
+                        "start": {"line": line, "character": column},
+                        "end": {"line": line, "character": column + 1},
+                    },
+                    "text": "",
+                }
+            start = time.perf_counter()
+            send(
+                server,
+                "textDocument/didChange",
+                {
+                    "textDocument": {"uri": uri, "version": version},
+                    "contentChanges": [change],
+                },
+            )
+            published = read_message(server.stdout)
+            latencies.append(time.perf_counter() - start)
+            errors += bool(published["params"]["diagnostics"])
+        assert errors == EDITS // 2
+
+        latencies.sort()
+        cold = cold_check("\n".join(lines))
+        print(
+            f"{statements:>6} statements   median {statistics.median(latencies) * 1e3:7.2f} ms"
+            f"   p95 {latencies[int(len(latencies) * 0.95)] * 1e3:7.2f} ms"
+            f"   fresh process {cold * 1e3:8.1f} ms"
+        )
+        statements *= 10
+
+    send(server, "shutdown", {}, id=2)
+    read_message(server.stdout)
+    send(server, "exit", {})
+    server.wait()
+
+
+if __name__ == "__main__":
+    main()
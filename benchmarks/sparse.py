@@ -0,0 +1,64 @@
+"""
+Dense vs sparse vs automatic backends on sparse relations over growing carriers.
+
+Every atomic relation has about DEGREE pairs per domain element. The dense backend is skipped once its largest matrix would exceed DENSE_LIMIT entries.
+
+Run from the repository root: python benchmarks/sparse.py [max_size]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import timed
+
+from rellang.evaluator import DenseBackend, Evaluator
+from rellang.parser import parse
+from rellang.sparse import AutoBackend, SparseBackend, SparseRelation
+
+DEGREE = 3
+DENSE_LIMIT = 1 << 27
+EXPRESSIONS = {
+    "chain": "(R : A -> B);(S : B -> A);(R : A -> B);(S : B -> A)",
+    "product": "(R : A -> B) * (U : D -> D)",
+    "coproduct": "((R : A -> B);(S : B -> A)) + (S : B -> A)",
+}
+
+
+def random_relation(rng, rows: int, columns: int) -> SparseRelation:
+    pairs = rows * DEGREE
+    return SparseRelation.from_pairs(
+        (rows, columns), rng.integers(0, rows, pairs), rng.integers(0, columns, pairs)
+    )
+
+
+def main() -> None:
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    size = 250
+    while size <= max_size:
+        carriers = {"A": size, "B": size // 2, "D": 10}
+        sparse = {
+            "R": random_relation(rng, size, size // 2),
+            "S": random_relation(rng, size // 2, size),
+            "U": random_relation(rng, 10, 10),
+        }
+        for label, text in EXPRESSIONS.items():
+            expr = parse(text).expr[0].expr
+            times = []
+            for backend in (DenseBackend(), SparseBackend(), AutoBackend()):
+                relations = sparse
+                if isinstance(backend, DenseBackend):
+                    if size * size * 50 > DENSE_LIMIT:  # The product's matrix
+                        times.append(f"{backend.name} {'-':>9}   ")
+                        continue
+                    relations = {name: r.to_dense() for name, r in sparse.items()}
+                evaluator = Evaluator(carriers, relations, backend=backend)
+                elapsed, _ = timed(lambda: evaluator.evaluate(expr))
+                times.append(f"{backend.name} {elapsed * 1e3:9.2f} ms")
+            print(f"|A| = {size:<7} {label:<10} " + "   ".join(times))
+        size *= 4
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Time from interpreter start to the first parsed statement, and to the command line's help.
+
+Each variant runs in a fresh python process that imports the parser, parses one statement and exits:
+
+interpreter   python -c pass, for reference
+standalone    parse() with the default parser, loaded from the generated rellang.standalone_parser
+lark disk     a parser built by lark from its on-disk cache (build_parser(cache=True))
+lark          a parser built by lark from the grammar (the default before the standalone parser)
+cli --help    rellang --help, which does not load the parser
+
+Every variant is run once to warm the bytecode and parser caches before it is timed.
+
+Run from the repository root: python benchmarks/startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+from timing import timed
+
+STATEMENT = "(R : A -> B) * (S : C -> D);(T : B * D -> E)"
+
+VARIANTS = {
+    "interpreter": "pass",
+    "standalone": f"from rellang.parser import parse; parse({STATEMENT!r})",
+    "lark disk": f"from rellang.parser import build_parser, parse; parse({STATEMENT!r}, parser=build_parser(cache=True))",
+    "lark": f"from rellang.parser import build_parser, parse; parse({STATEMENT!r}, parser=build_parser())",
+    "cli --help": "import sys; sys.argv = ['rellang', '--help']; from rellang.main import main; main()",
+}
+
+
+def run(code: str, env: dict) -> float:
+    elapsed, _ = timed(
+        lambda: subprocess.run(
+            [sys.executable, "-c", code], env=env, stdout=subprocess.DEVNULL, check=True
+        )
+    )
+    return elapsed
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    env = dict(os.environ)
+    # The warm up run writes the bytecode, which for the standalone parser's tables is most of its import time
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [os.getcwd(), env.get("PYTHONPATH")])
+    )
+    for label, code in VARIANTS.items():
+        run(code, env)
+        times = [run(code, env) for _ in range(runs)]
+        print(
+            f"{label:<12} median {statistics.median(times) * 1e3:7.1f} ms"
+            f"   min {min(times) * 1e3:7.1f} ms   ({runs} runs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Peak memory of iter_statements() over a generated file vs parse() of the whole text.
+
+Run from the repository root: python benchmarks/streaming.py [definitions]
+"""
+
+import os
+import sys
+import tempfile
+
+from timing import traced
+
+from rellang.parser import get_parser, iter_statements, parse
+
+
+def write_program(path: str, definitions: int) -> None:
+    with open(path, "w") as f:
+        for i in range(definitions):
+            f.write(f"rel R{i} := (F{i} : A -> B * C);(G{i} : B * C -> D)\n")
+            f.write(f"R{i};(H : D -> E)\n")
+
+
+def stream(path: str) -> None:
+    with open(path) as source:
+        for _ in iter_statements(source):
+            pass
+
+
+def parse_whole(path: str) -> None:
+    with open(path) as source:
+        parse(source.read())
+
+
+def main() -> None:
+    definitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    path = os.path.join(tempfile.mkdtemp(), "program.rel")
+    write_program(path, definitions)
+    get_parser()
+
+    print(f"{2 * definitions} statements, {os.path.getsize(path) / 1e6:.1f} MB source")
+    for label, fn in (("iter_statements", stream), ("parse", parse_whole)):
+        elapsed, peak, _ = traced(lambda: fn(path))
+        print(f"{label:<16} {elapsed:7.2f} s   peak {peak / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Implicit structural relations vs materialized matrices.
+
+Composes a random relation with First, Second, Copy and Full, once with the evaluator's implicit structural relations and once with each structural relation built as a matrix first, checks that they agree and reports the times.
+
+Run from the repository root: python benchmarks/structural.py [max_size]
+"""
+
+import sys
+
+import numpy as np
+
+from timing import timed
+
+from rellang.evaluator import DenseBackend, Evaluator
+from rellang.nodes import StructuralRelation
+from rellang.parser import parse
+from rellang.structural import structural_value
+
+EXPRESSIONS = {
+    "R;First": ("(R : C -> A * B);(First : A * B -> A)", "right"),
+    "R;Second": ("(R : C -> A * B);(Second : A * B -> B)", "right"),
+    "Copy;T": ("(Copy : A -> A * A);(T : A * A -> C)", "left"),
+    "R;Full": ("(R : C -> A * B);(Full : A * B -> C)", "right"),
+}
+DENSITY = 0.05
+
+
+def main() -> None:
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 160
+    rng = np.random.default_rng(0)
+    dense = DenseBackend()
+    size = 20
+    while size <= max_size:
+        carriers = {"A": size, "B": size, "C": 200}
+        relations = {
+            "R": rng.random((200, size * size)) < DENSITY,
+            "T": rng.random((size * size, 200)) < DENSITY,
+        }
+        evaluator = Evaluator(carriers, relations)
+        for label, (text, side) in EXPRESSIONS.items():
+            expr = parse(text).expr[0].expr
+            structural = expr.right if side == "right" else expr.left
+            assert isinstance(structural, StructuralRelation)
+            implicit_time, value = timed(lambda: evaluator.evaluate(expr))
+
+            def materialized():
+                matrix = structural_value(
+                    structural, evaluator.set_size, evaluator.names
+                ).materialize(dense)
+                other = evaluator.evaluate(expr.left if side == "right" else expr.right)
+                if side == "right":
+                    return dense.compose(other, matrix)
+                return dense.compose(matrix, other)
+
+            matrix_time, expected = timed(materialized)
+            assert np.array_equal(value, expected)
+            print(
+                f"|A| = |B| = {size:<4} {label:<9} implicit {implicit_time * 1e3:8.2f} ms"
+                f"   materialized {matrix_time * 1e3:9.2f} ms"
+                f"   x{matrix_time / implicit_time:7.1f}"
+            )
+        size *= 2
+
+
+if __name__ == "__main__":
+    main()
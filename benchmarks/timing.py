@@ -0,0 +1,36 @@
+"""
+Timing helpers shared by the benchmarks.
+
+Each helper calls fn() with no arguments, so the scripts pass lambdas closing over their inputs. Times are wall-clock seconds from time.perf_counter.
+"""
+
+import time
+import tracemalloc
+
+
+def timed(fn) -> tuple[float, object]:
+    """The time fn() takes, and its result."""
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def repeated(fn, repeat: int) -> list[float]:
+    """The times of repeat calls of fn()."""
+    return [timed(fn)[0] for _ in range(repeat)]
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    """The shortest time of repeat calls of fn()."""
+    return min(repeated(fn, repeat))
+
+
+def traced(fn) -> tuple[float, int, object]:
+    """The time fn() takes, the peak memory traced by tracemalloc during the call in bytes, and its result. Tracing slows the call, time it separately with timed when both matter."""
+    tracemalloc.start()
+    try:
+        elapsed, result = timed(fn)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak, result
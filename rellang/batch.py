@@ -0,0 +1,316 @@
+import os
+import re
+import sys
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+from rellang.cache import ParseCache
+from rellang.incremental import IncrementalParser
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    Definition,
+    Program,
+    Relation,
+    SetExpr,
+    Statement,
+    statement_body,
+)
+from rellang.parser import (
+    _newline_regex,
+    describe_error,
+    parse,
+    parse_statement,
+    split_statements,
+)
+
+_identifier_regex = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+_definition_regex = re.compile(
+    r"\s*(?:export\s+)?(set|rel)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*:="
+)
+
+# Identifiers that are grammar keywords rather than names
+_keywords = {"set", "rel", "export"}
+
+
+class BatchResult:
+    """Programs parsed from several files, with their definitions merged into one context."""
+
+    def __init__(self, programs: dict[str, Program], names: NamesContext):
+        self.programs = programs  # Path -> program, in the order the paths were given
+        self.names = names
+
+
+class FileCheck:
+    """The result of check_file: the program of the statements that succeeded, the definitions they made and the errors of the others."""
+
+    def __init__(
+        self,
+        path: str,
+        program: Program,
+        names: NamesContext,
+        errors: list[tuple[Optional[int], int, int, str]],
+    ):
+        self.path = path
+        self.program = program
+        self.names = names
+        # (line_index, start, end, message) with start and end indices into the line, see describe_error. line_index is None when the file could not be read.
+        self.errors = errors
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def check_file(path: str, cache: Optional[ParseCache] = None) -> FileCheck:
+    """
+    Parses and type checks one file in a NamesContext of its own, collecting every error instead of raising the first.
+
+    Statements are checked as by IncrementalParser.parse with an errors list: one that fails is reported and left out, and the statements after it are checked against the definitions that did succeed. With a ParseCache a file whose text is cached is not parsed, and a file without errors is stored.
+    """
+    try:
+        with open(path, "rb") as f:
+            source = f.read()
+        text = source.decode("utf-8")
+    except (OSError, UnicodeDecodeError) as e:
+        return FileCheck(path, Program(()), NamesContext(), [(None, 0, 0, str(e))])
+    if cache is not None:
+        key = cache.key(source)
+        cached = cache.get(key)
+        if cached is not None:
+            return FileCheck(path, *cached, [])
+
+    parser = IncrementalParser()
+    failed: list[tuple[int, Exception]] = []
+    program = parser.parse(text, failed)
+    lines = _newline_regex.split(text) if failed else []
+    errors = [(index, *describe_error(lines[index], e)) for index, e in failed]
+    if cache is not None and not errors:
+        cache.put(key, program, parser.names)
+    return FileCheck(path, program, parser.names, errors)
+
+
+def check_files(
+    paths: list[str], workers: Optional[int] = None, cache: Optional[ParseCache] = None
+) -> Iterator[FileCheck]:
+    """Checks each file with check_file, yielding the results in the order of paths. The files are distributed over a process pool unless workers is 1 or there is only one."""
+    check = partial(check_file, cache=cache)
+    if workers == 1 or len(paths) < 2:
+        yield from map(check, paths)
+        return
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(check, paths, chunksize=max(1, len(paths) // (4 * workers)))
+
+
+def _parse_file(path: str) -> tuple[Program, NamesContext]:
+    names = NamesContext()
+    with open(path, encoding="utf-8") as f:
+        program = parse(f.read(), names)
+    return program, names
+
+
+def merge_names(contexts: list[NamesContext]) -> NamesContext:
+    """Merges definition tables in order. A name defined in two of them raises like a redefinition."""
+    merged = NamesContext()
+    for names in contexts:
+        for name, expr in names.set_definitions.items():
+            merged.define_set(name, expr)
+        for name, expr in names.rel_definitions.items():
+            merged.define_rel(name, expr)
+    for names in contexts:
+        merged.used_names |= names.used_names
+    return merged
+
+
+def parse_files(
+    paths: list[str], workers: Optional[int] = None, cache: Optional[ParseCache] = None
+) -> BatchResult:
+    """
+    Parses each file as a separate program, distributing the files over a process pool. A single file is split by statements with parse_parallel instead.
+
+    With a ParseCache, files whose text is in the cache are loaded from it, and only the others are parsed and then stored.
+    """
+    results: dict[str, tuple[Program, NamesContext]] = {}
+    keys: dict[str, str] = {}
+    if cache is not None:
+        for path in paths:
+            with open(path, "rb") as f:
+                keys[path] = cache.key(f.read())
+            cached = cache.get(keys[path])
+            if cached is not None:
+                results[path] = cached
+    pending = [path for path in paths if path not in results]
+
+    if not pending:
+        parsed = []
+    elif workers == 1:
+        parsed = [_parse_file(path) for path in pending]
+    elif len(pending) == 1:
+        with open(pending[0], encoding="utf-8") as f:
+            parsed = [_parse_parallel(f.read(), workers)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            parsed = list(pool.map(_parse_file, pending))
+    for path, result in zip(pending, parsed):
+        results[path] = result
+        if cache is not None:
+            cache.put(keys[path], *result)
+
+    programs = {path: results[path][0] for path in paths}
+    return BatchResult(programs, merge_names([results[path][1] for path in paths]))
+
+
+def _check_statements(
+    task: list[tuple[int, str, dict[str, SetExpr], dict[str, Relation]]],
+) -> list[tuple[int, Optional[Statement], set[str]]]:
+    """
+    Worker side of parse_parallel. Each statement is checked in a fresh context holding only the definitions it refers to, name clashes are checked by the caller. The names the statement used are returned with it, for the caller's context.
+    """
+    results = []
+    for index, line, set_defs, rel_defs in task:
+        names = NamesContext()
+        for name, expr in set_defs.items():
+            names.define_set(name, expr)
+        for name, expr in rel_defs.items():
+            names.define_rel(name, expr)
+        try:
+            statement = parse_statement(line, names)
+            results.append((index, statement, names.used_names))
+        except Exception:
+            # The caller reparses serially to raise the error in its original form
+            results.append((index, None, set()))
+    return results
+
+
+def parse_parallel(
+    text: str, workers: Optional[int] = None, pool: Optional[Executor] = None
+) -> Program:
+    """
+    Parses one program on a process pool, returning the same AST as parse(text).
+
+    Statements are grouped into waves: a statement that mentions a name defined on an earlier line runs in a later wave than that definition, and everything within a wave is independent and checked in parallel. Definitions are registered in source order, and redefinitions or definitions of names used on an earlier line are detected here, so workers never need the whole context. If any statement fails the text is parsed serially, so the error raised is exactly the one parse() gives.
+    """
+    return _parse_parallel(text, workers, pool)[0]
+
+
+def _parse_parallel(
+    text: str, workers: Optional[int] = None, pool: Optional[Executor] = None
+) -> tuple[Program, NamesContext]:
+    """parse_parallel, also returning a NamesContext with the definitions and used names parse(text, names) would have recorded."""
+    statements = split_statements(text)
+    identifiers: list[list[str]] = (
+        []
+    )  # Names mentioned in each statement, except a defined name
+    defined_at: dict[str, int] = {}  # Name -> position of its first definition
+    waves: list[list[int]] = []
+    wave_of: list[int] = []
+    for position, (_, line) in enumerate(statements):
+        found = [
+            name for name in _identifier_regex.findall(line) if name not in _keywords
+        ]
+        definition = _definition_regex.match(line)
+        body = found[1:] if definition else found
+        wave = 1 + max(
+            (wave_of[defined_at[name]] for name in body if name in defined_at),
+            default=-1,
+        )
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append(position)
+        wave_of.append(wave)
+        identifiers.append(body)
+        if definition and definition.group(2) not in defined_at:
+            defined_at[definition.group(2)] = position
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(workers)
+    workers = workers or os.cpu_count() or 1
+    results: list[Optional[Statement]] = [None] * len(statements)
+    used_names: list[set[str]] = [set()] * len(statements)
+    set_defs: dict[str, SetExpr] = {}
+    rel_defs: dict[str, Relation] = {}
+    failed = False
+    try:
+        for wave in waves:
+            batch = []
+            for position in wave:
+                needed = [
+                    name
+                    for name in identifiers[position]
+                    if defined_at.get(name, position) < position
+                ]
+                if any(
+                    name not in set_defs and name not in rel_defs for name in needed
+                ):
+                    # A definition it depends on failed
+                    failed = True
+                    continue
+                batch.append(
+                    (
+                        position,
+                        statements[position][1],
+                        {name: set_defs[name] for name in needed if name in set_defs},
+                        {name: rel_defs[name] for name in needed if name in rel_defs},
+                    )
+                )
+            chunk = max(1, -(-len(batch) // (workers * 4)))
+            tasks = [batch[i : i + chunk] for i in range(0, len(batch), chunk)]
+            for task_results in pool.map(_check_statements, tasks):
+                for position, statement, used in task_results:
+                    if statement is None:
+                        failed = True
+                        continue
+                    results[position] = statement
+                    used_names[position] = used
+                    expr = statement_body(statement)
+                    if (
+                        isinstance(expr, Definition)
+                        and defined_at[expr.name] == position
+                    ):
+                        if expr.expr_type == "set":
+                            set_defs[expr.name] = expr.def_body
+                        else:
+                            rel_defs[expr.name] = expr.def_body
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    # A definition clashes with any earlier use or definition of its name
+    used: set[str] = set()
+    for position, statement in enumerate(results):
+        if statement is None:
+            break
+        expr = statement_body(statement)
+        if isinstance(expr, Definition):
+            if expr.name in used:
+                failed = True
+                break
+            used.add(expr.name)
+        used.update(identifiers[position])
+
+    names = NamesContext()
+    if failed:
+        return parse(text, names), names
+    for position, statement in enumerate(results):
+        expr = statement_body(statement)
+        if isinstance(expr, Definition):
+            if expr.expr_type == "set":
+                names.define_set(expr.name, expr.def_body)
+            else:
+                names.define_rel(expr.name, expr.def_body)
+        names.used_names.update(used_names[position])
+    return Program(tuple(results)), names
+
+
+def main() -> None:
+    """python -m rellang.batch, kept as another name for rellang check."""
+    from rellang.main import main as rellang_main
+
+    rellang_main(["check", *sys.argv[1:]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import sys
+
+import pytest
+
+from rellang.batch import check_files, main, parse_files, parse_parallel
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+
+PROGRAM = """
+set X := A * B
+rel R := S: X -> C
+rel T := R;(U: C -> D)
+(V: E -> F)
+rel W := T;(Y: D -> E);(V: E -> F)
+W: X -> F
+"""
+
+
+def test_parallel_matches_parse():
+    assert parse_parallel(PROGRAM, workers=2) == parse(PROGRAM)
+
+
+def test_parallel_handles_exports():
+    program = PROGRAM + "export rel Z := W;(V: E -> F)^\nexport Z\n"
+    assert parse_parallel(program, workers=2) == parse(program)
+
+
+@pytest.mark.parametrize(
+    "program, message",
+    [
+        (PROGRAM.replace("U: C -> D", "U: Q -> D"), "Type mismatch in composition"),
+        (PROGRAM + "rel V := S: X -> C\n", "Name V already defined"),
+        (PROGRAM + "rel X := S: X -> C\n", "Name X already defined"),
+        ("R: A -> B\nrel R := S: A -> B", "Name R already defined"),
+        ("rel R := R: A -> B", "Name R already defined"),
+    ],
+)
+def test_parallel_errors_match_parse(program, message):
+    with pytest.raises(ValueError, match=message):
+        parse(program)
+    with pytest.raises(ValueError, match=message):
+        parse_parallel(program, workers=2)
+
+
+def test_parse_files_merges_definitions(tmp_path):
+    first = tmp_path / "first.rel"
+    second = tmp_path / "second.rel"
+    first.write_text("rel R := S: A -> B\n")
+    second.write_text("set X := A * B\nrel Q := S: X -> C\n")
+
+    result = parse_files([str(first), str(second)], workers=2)
+    assert list(result.programs) == [str(first), str(second)]
+    assert result.programs[str(second)] == parse(second.read_text())
+    assert list(result.names.rel_definitions) == ["R", "Q"]
+    assert list(result.names.set_definitions) == ["X"]
+
+    second.write_text("rel R := S: A -> C\n")
+    with pytest.raises(ValueError, match="Name R already defined"):
+        parse_files([str(first), str(second)], workers=2)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_single_file_keeps_the_parse_context(tmp_path, workers):
+    """A single file is split by statements when workers > 1, and its context is still the one parse() builds"""
+    path = tmp_path / "program.rel"
+    path.write_text(PROGRAM + "(Z : F -> A)\n")
+    names = NamesContext()
+    program = parse(path.read_text(), names)
+    result = parse_files([str(path)], workers=workers)
+    assert result.programs[str(path)] == program
+    assert result.names.used_names == names.used_names
+    assert result.names.rel_definitions == names.rel_definitions
+    assert result.names.set_definitions == names.set_definitions
+
+
+def test_check_files_collects_errors(tmp_path):
+    paths = []
+    for i, text in enumerate([PROGRAM, "rel R := S: A -> B\nR;(T: C -> D)\nR"]):
+        path = tmp_path / f"file{i}.rel"
+        path.write_text(text)
+        paths.append(str(path))
+    good, bad = check_files(paths, workers=1)
+    assert good.ok and good.program == parse(PROGRAM)
+    assert not bad.ok and len(bad.program.expr) == 2
+    ((index, start, end, message),) = bad.errors
+    assert (index, start, end) == (1, 0, 13)
+    assert message.startswith("Type mismatch in composition")
+    results = list(check_files(paths * 2, workers=2))
+    assert [r.program for r in results] == [good.program, bad.program] * 2
+    assert [r.errors for r in results] == [[], bad.errors] * 2
+
+
+def test_batch_main_is_check(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "bad.rel"
+    path.write_text("(R: A -> B);(S: C -> D)\n")
+    monkeypatch.setattr(sys, "argv", ["rellang.batch", "--json", str(path)])
+    with pytest.raises(SystemExit) as exit:
+        main()
+    assert exit.value.code == 1
+    assert json.loads(capsys.readouterr().out)["errors"][0]["line"] == 1
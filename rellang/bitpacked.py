@@ -0,0 +1,271 @@
+import numpy as np
+
+from rellang.closure import warshall_closure
+from rellang.evaluator import DenseBackend
+
+# Rows of the left operand of a product unpacked to booleans at once
+_product_chunk_bits = 1 << 24
+
+
+def _words(columns: int) -> int:
+    return (columns + 63) // 64
+
+
+# Masks of the low half of each group of 2 * size bits
+_swap_masks = [
+    (
+        size,
+        np.uint64(sum(((1 << size) - 1) << start for start in range(0, 64, 2 * size))),
+    )
+    for size in (32, 16, 8, 4, 2, 1)
+]
+
+
+def _transpose_blocks(blocks: np.ndarray):
+    """Transposes in place each 64 x 64 bit matrix in the last axis of blocks, bit j of word i going to bit i of word j."""
+    for size, mask in _swap_masks:
+        pairs = blocks.reshape(*blocks.shape[:-1], 64 // (2 * size), 2, size)
+        low, high = pairs[..., 0, :], pairs[..., 1, :]
+        # Swap the high halves of the low words with the low halves of the high words
+        swapped = ((low >> np.uint64(size)) ^ high) & mask
+        high ^= swapped
+        low ^= swapped << np.uint64(size)
+
+
+class BitRelation:
+    """
+    A boolean matrix with each row packed into uint64 words, one bit per entry.
+
+    Column j of a row is bit j % 64 of word j // 64, and the bits past the last column are zero. Element order is that of DenseBackend.
+    """
+
+    __slots__ = ("shape", "words")
+
+    def __init__(self, shape: tuple[int, int], words: np.ndarray):
+        self.shape = shape
+        self.words = words
+
+    @classmethod
+    def from_dense(cls, matrix) -> "BitRelation":
+        matrix = np.asarray(matrix, dtype=bool)
+        rows, columns = matrix.shape
+        packed = np.zeros((rows, _words(columns) * 8), dtype=np.uint8)
+        packed[:, : (columns + 7) // 8] = np.packbits(matrix, axis=1, bitorder="little")
+        return cls(matrix.shape, packed.view("<u8"))
+
+    @classmethod
+    def function(cls, index: np.ndarray, columns: int) -> "BitRelation":
+        """The relation of each row i to column index[i] only."""
+        result = cls.zeros((index.size, columns))
+        result.words[np.arange(index.size), index // 64] = np.left_shift(
+            np.uint64(1), (index % 64).astype(np.uint64)
+        )
+        return result
+
+    @classmethod
+    def outer(cls, rows: np.ndarray, columns: np.ndarray) -> "BitRelation":
+        """The relation of every row in the rows mask to every column in the columns mask."""
+        row = cls.from_dense(columns[None, :]).words[0]
+        words = np.where(rows[:, None], row[None, :], np.uint64(0))
+        return cls((rows.size, columns.size), words)
+
+    @classmethod
+    def zeros(cls, shape: tuple[int, int]) -> "BitRelation":
+        return cls(shape, np.zeros((shape[0], _words(shape[1])), dtype=np.uint64))
+
+    def to_dense(self) -> np.ndarray:
+        bits = np.unpackbits(
+            self.words.astype("<u8", copy=False).view(np.uint8),
+            axis=1,
+            bitorder="little",
+        )
+        return bits[:, : self.shape[1]].astype(bool)
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes
+
+    @property
+    def nnz(self) -> int:
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    def transpose(self) -> "BitRelation":
+        """The converse, transposing 64 x 64 blocks of bits word-parallel without unpacking."""
+        rows, columns = self.shape
+        row_words, column_words = _words(rows), self.words.shape[1]
+        # tiles[b, w, i] is word w of row 64 * b + i, padded with zero rows
+        tiles = np.zeros((row_words * 64, column_words), dtype=np.uint64)
+        tiles[:rows] = self.words
+        tiles = tiles.reshape(row_words, 64, column_words).transpose(0, 2, 1).copy()
+        _transpose_blocks(tiles)
+        # Now tiles[b, w, j] is word b of row 64 * w + j of the converse
+        words = tiles.transpose(1, 2, 0).reshape(column_words * 64, row_words)
+        return BitRelation((columns, rows), np.ascontiguousarray(words[:columns]))
+
+    def complement(self) -> "BitRelation":
+        words = ~self.words
+        padding = self.shape[1] % 64
+        if padding and words.shape[1]:
+            # Bits past the last column stay zero
+            words[:, -1] &= np.uint64((1 << padding) - 1)
+        return BitRelation(self.shape, words)
+
+    def closure(self) -> "BitRelation":
+        """The transitive closure of a square relation, by Warshall's algorithm on whole packed rows."""
+        return BitRelation(self.shape, warshall_closure(self.words))
+
+    def compose(self, other: "BitRelation") -> "BitRelation":
+        """
+        self;other by the method of four Russians.
+
+        Row i of the result is the OR of the rows k of other with self[i, k] set. The inner dimension is taken eight columns of self at a time: the 256 ORs of the corresponding eight rows of other are tabulated, and each row of the result ORs in the entry selected by its byte of self, so the work is word-parallel OR over whole rows.
+        """
+        rows, inner = self.shape
+        result = np.zeros((rows, other.words.shape[1]), dtype=np.uint64)
+        self_bytes = self.words.view(np.uint8)
+        table = np.zeros((256, other.words.shape[1]), dtype=np.uint64)
+        for group in range((inner + 7) // 8):
+            block = other.words[group * 8 : group * 8 + 8]
+            for bit in range(block.shape[0]):
+                np.bitwise_or(
+                    table[: 1 << bit], block[bit], out=table[1 << bit : 2 << bit]
+                )
+            # Rows of other past the last column of self are never selected
+            selected = self_bytes[:, group]
+            result |= table[selected]
+        return BitRelation((rows, other.shape[1]), result)
+
+    def gather_rows(self, index: np.ndarray) -> "BitRelation":
+        """Row i of the result is row index[i] of self."""
+        return BitRelation((index.size, self.shape[1]), self.words[index])
+
+    def scatter_columns(self, index: np.ndarray, columns: int) -> "BitRelation":
+        """Column c of the result is the OR of the columns j of self with index[j] == c, over chunks of unpacked rows."""
+        result = BitRelation.zeros((self.shape[0], columns))
+        dense = DenseBackend()
+        chunk = max(1, _product_chunk_bits // max(1, self.shape[1]))
+        for start in range(0, self.shape[0], chunk):
+            rows = BitRelation(
+                (min(chunk, self.shape[0] - start), self.shape[1]),
+                self.words[start : start + chunk],
+            ).to_dense()
+            result.words[start : start + rows.shape[0]] = BitRelation.from_dense(
+                dense.scatter_columns(rows, index, columns)
+            ).words
+        return result
+
+    def rows_meeting(self, columns: np.ndarray) -> np.ndarray:
+        """Mask of the rows related to some column in the columns mask."""
+        mask = BitRelation.from_dense(columns[None, :]).words[0]
+        return np.any(self.words & mask, axis=1)
+
+    def columns_meeting(self, rows: np.ndarray) -> np.ndarray:
+        """Mask of the columns related to some row in the rows mask."""
+        words = np.bitwise_or.reduce(
+            self.words[rows], axis=0, initial=np.uint64(0)
+        ).reshape(1, -1)
+        return BitRelation((1, self.shape[1]), words).to_dense()[0]
+
+    def product(self, other: "BitRelation") -> "BitRelation":
+        """The Kronecker product, built from chunks of unpacked rows of self."""
+        shape = (self.shape[0] * other.shape[0], self.shape[1] * other.shape[1])
+        result = BitRelation.zeros(shape)
+        other_dense = other.to_dense()
+        chunk = max(1, _product_chunk_bits // max(1, shape[1] * other.shape[0]))
+        for start in range(0, self.shape[0], chunk):
+            left = BitRelation(
+                (min(chunk, self.shape[0] - start), self.shape[1]),
+                self.words[start : start + chunk],
+            ).to_dense()
+            block = np.logical_and(
+                left[:, None, :, None], other_dense[None, :, None, :]
+            ).reshape(left.shape[0] * other.shape[0], shape[1])
+            result.words[
+                start * other.shape[0] : (start + left.shape[0]) * other.shape[0]
+            ] = BitRelation.from_dense(block).words
+        return result
+
+    def coproduct(self, other: "BitRelation") -> "BitRelation":
+        """The block-diagonal relation. The rows of other are shifted past the columns of self word-parallel."""
+        rows = self.shape[0] + other.shape[0]
+        columns = self.shape[1] + other.shape[1]
+        words = np.zeros((rows, _words(columns)), dtype=np.uint64)
+        words[: self.shape[0], : self.words.shape[1]] = self.words
+        word_offset, bit_offset = divmod(self.shape[1], 64)
+        right = other.words
+        end = word_offset + right.shape[1]
+        if bit_offset == 0:
+            words[self.shape[0] :, word_offset:end] = right
+        else:
+            shift = np.uint64(bit_offset)
+            words[self.shape[0] :, word_offset:end] |= right << shift
+            # Bits carried into the next word. A carry past the last word holds only padding, which is zero
+            carry = right >> np.uint64(64 - bit_offset)
+            width = min(right.shape[1], words.shape[1] - word_offset - 1)
+            words[self.shape[0] :, word_offset + 1 : word_offset + 1 + width] |= carry[
+                :, :width
+            ]
+        return BitRelation((rows, columns), words)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BitRelation):
+            return NotImplemented
+        return self.shape == other.shape and np.array_equal(self.words, other.words)
+
+    def __repr__(self) -> str:
+        return f"BitRelation(shape={self.shape}, {self.nbytes} bytes)"
+
+
+class BitPackedBackend:
+    """Evaluator backend keeping every value as a BitRelation, eight times smaller than a boolean matrix."""
+
+    name = "bitpacked"
+
+    def atomic(self, matrix) -> BitRelation:
+        if isinstance(matrix, BitRelation):
+            return matrix
+        return BitRelation.from_dense(matrix)
+
+    def shape(self, value: BitRelation) -> tuple[int, int]:
+        return value.shape
+
+    def compose(self, left: BitRelation, right: BitRelation) -> BitRelation:
+        return left.compose(right)
+
+    def product(self, left: BitRelation, right: BitRelation) -> BitRelation:
+        return left.product(right)
+
+    def coproduct(self, left: BitRelation, right: BitRelation) -> BitRelation:
+        return left.coproduct(right)
+
+    def gather_rows(self, value: BitRelation, index: np.ndarray) -> BitRelation:
+        return value.gather_rows(index)
+
+    def scatter_columns(
+        self, value: BitRelation, index: np.ndarray, columns: int
+    ) -> BitRelation:
+        return value.scatter_columns(index, columns)
+
+    def rows_meeting(self, value: BitRelation, columns: np.ndarray) -> np.ndarray:
+        return value.rows_meeting(columns)
+
+    def columns_meeting(self, value: BitRelation, rows: np.ndarray) -> np.ndarray:
+        return value.columns_meeting(rows)
+
+    def transpose(self, value: BitRelation) -> BitRelation:
+        return value.transpose()
+
+    def complement(self, value: BitRelation) -> BitRelation:
+        return value.complement()
+
+    def closure(self, value: BitRelation) -> BitRelation:
+        return value.closure()
+
+    def function(self, index: np.ndarray, columns: int) -> BitRelation:
+        return BitRelation.function(index, columns)
+
+    def outer(self, rows: np.ndarray, columns: np.ndarray) -> BitRelation:
+        return BitRelation.outer(rows, columns)
+
+    def to_dense(self, value: BitRelation) -> np.ndarray:
+        return value.to_dense()
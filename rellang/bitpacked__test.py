@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from rellang.bitpacked import BitPackedBackend, BitRelation
+from rellang.evaluator import Evaluator
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+from rellang.testing import random_relations
+
+
+@pytest.mark.parametrize(
+    "shape", [(1, 1), (5, 63), (3, 64), (7, 130), (130, 7), (200, 129), (0, 5)]
+)
+def test_round_trip_and_transpose(shape):
+    matrix = np.random.default_rng(shape[1]).random(shape) < 0.4
+    relation = BitRelation.from_dense(matrix)
+    assert relation.words.dtype == np.uint64
+    assert np.array_equal(relation.to_dense(), matrix)
+    assert np.array_equal(relation.transpose().to_dense(), matrix.T)
+    # The bits past the last column of the converse stay zero
+    assert relation.transpose() == BitRelation.from_dense(matrix.T)
+    assert relation.nnz == matrix.sum()
+
+
+@pytest.mark.parametrize("sizes", [(3, 5, 4), (70, 67, 129), (9, 64, 1)])
+def test_operations_match_dense(sizes):
+    a, b, c = sizes
+    carriers = {"A": a, "B": b, "C": c}
+    relations = random_relations({"R": (a, b), "S": (b, c)}, 0.3, a)
+    for text in (
+        "(R : A -> B);(S : B -> C)",
+        "(R : A -> B) * (S : B -> C)",
+        "(R : A -> B) + (S : B -> C)",
+        "(S : B -> C) + (R : A -> B) + (S : B -> C)",
+    ):
+        expr = parse(text).expr[0].expr
+        dense = Evaluator(carriers, relations).evaluate(expr)
+        packed = Evaluator(carriers, relations, backend=BitPackedBackend()).evaluate(
+            expr
+        )
+        assert isinstance(packed, BitRelation)
+        assert np.array_equal(packed.to_dense(), dense)
+
+
+def test_program_with_definitions():
+    names = NamesContext()
+    program = parse("rel D := (R : A -> A);(R : A -> A)\n(D;D) + (R : A -> A)", names)
+    matrix = np.eye(100, k=1, dtype=bool)
+    value = Evaluator(
+        {"A": 100}, {"R": matrix}, names, BitPackedBackend()
+    ).evaluate_program(program)[0]
+    expected = np.zeros((200, 200), dtype=bool)
+    expected[:100, :100] = np.linalg.matrix_power(matrix.astype(int), 4) > 0
+    expected[100:, 100:] = matrix
+    assert np.array_equal(value.to_dense(), expected)
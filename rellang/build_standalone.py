@@ -0,0 +1,41 @@
+import io
+import os
+
+from rellang.grammar import grammar, grammar_hash
+
+standalone_path = os.path.join(os.path.dirname(__file__), "standalone_parser.py")
+
+_header = """# Generated by python -m rellang.build_standalone from rellang.grammar. Do not edit: regenerate it when the grammar changes.
+# The grammar_hash below is checked by rellang.parser, which falls back to building the parser with lark while it is stale.
+grammar_hash = "{hash}"
+
+# Lark's generator leaves out this import, which Transformer_NonRecursive uses
+from typing import cast
+
+"""
+
+
+def generate() -> str:
+    """
+    The source of a module holding the LALR tables for the grammar together with the parts of the Lark runtime needed to use them.
+
+    The module defines Lark_StandAlone(), which loads the tables without analysing the grammar, and its own Tree, Token, Transformer and exception classes, so importing it does not import lark.
+    """
+    # Imported here, lark is only needed to generate the module
+    from lark import Lark
+    from lark.tools.standalone import gen_standalone
+
+    out = io.StringIO()
+    # Same options as rellang.parser.build_parser
+    gen_standalone(Lark(grammar, parser="lalr"), out=out)
+    return _header.format(hash=grammar_hash) + out.getvalue()
+
+
+def main() -> None:
+    with open(standalone_path, "w", encoding="utf-8") as f:
+        f.write(generate())
+    print(f"Wrote {standalone_path} for grammar {grammar_hash[:16]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from rellang import standalone_parser
+from rellang.grammar import grammar_hash
+from rellang.parser import UnexpectedToken, build_parser, get_parser, parse
+
+PROGRAM = """
+set X := A * B
+rel R := (S: X -> C);(T: C -> C)^+
+export ~R^;(S: X -> C)
+(Copy : X -> X * X);(First : X * X -> X);(Left : X -> X + X);(Collapse : X + X -> X)
+"""
+
+
+def test_standalone_parser_is_current():
+    assert (
+        standalone_parser.grammar_hash == grammar_hash
+    ), "The grammar changed: run python -m rellang.build_standalone"
+
+
+def test_standalone_parser_is_the_default():
+    assert isinstance(get_parser(), standalone_parser.Lark)
+
+
+def test_same_ast_as_lark():
+    assert parse(PROGRAM) == parse(PROGRAM, parser=build_parser())
+    for parser in (get_parser(), build_parser()):
+        with pytest.raises(ValueError, match="Type mismatch in composition"):
+            parse("(R: A -> B);(S: C -> D)", parser=parser)
+    with pytest.raises(UnexpectedToken):
+        parse("(R: A -> B);;")
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "from rellang.parser import parse; parse('(R : A -> B)')",
+        "from rellang.parser import parse_file; parse_file(path)",
+        "from rellang.incremental import IncrementalParser; IncrementalParser().parse('(R : A -> B)')",
+        "import rellang.server",
+    ],
+)
+def test_parsing_does_not_import_lark(tmp_path, code):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    path = tmp_path / "program.rel"
+    path.write_text(PROGRAM)
+    code = f"import sys; path = {str(path)!r}; {code}; print('lark' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
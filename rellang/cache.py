@@ -0,0 +1,157 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from typing import Optional
+
+from rellang import __version__
+from rellang.grammar import grammar_hash
+from rellang.names_context import NamesContext
+from rellang.nodes import Program
+from rellang.parser import parse
+
+# Bumped when the layout of an entry changes
+_format = 2
+_magic = b"rellang-ast\x01"
+_suffix = ".ast"
+_temporary_prefix = ".tmp-"
+# Temporary files older than this were left by a writer that died before renaming them
+_stale_temporary_age = 3600.0
+
+
+def default_cache_dir() -> str:
+    """$RELLANG_CACHE_DIR, or a directory in the system's temporary directory."""
+    return os.environ.get("RELLANG_CACHE_DIR") or os.path.join(
+        tempfile.gettempdir(), "rellang-ast-cache"
+    )
+
+
+class ParseCache:
+    """
+    An on-disk cache of parsed and type checked programs, addressed by content.
+
+    An entry holds the Program parsed from a source text in a fresh NamesContext together with that context, pickled and compressed with zlib (set expressions are re-interned on loading). Its key is the sha256 of the source with the grammar hash and the package version, so editing a file, the grammar or upgrading rellang never returns a stale AST, and unchanged files are shared between checkouts and builds.
+
+    Several processes can use one directory at once. Entries are written to a temporary file and renamed into place, so a reader sees a whole entry or none, and an entry that cannot be loaded (truncated, or written by an incompatible Python) counts as a miss and is deleted. When the directory grows past max_bytes the least recently used entries are deleted until it is back to three quarters of that; a hit refreshes its entry's modification time. Entries are pickles, so the directory must only be writable by users trusted to run code.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 << 20):
+        self.directory = directory if directory is not None else default_cache_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._prefix = f"{_format}\0{grammar_hash}\0{__version__}\0".encode("utf-8")
+        # Bytes in the directory as of the last scan plus what this process wrote since. Other processes' writes are only seen by the next scan.
+        self._size: Optional[int] = None
+
+    def key(self, source: str | bytes) -> str:
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        return hashlib.sha256(self._prefix + source).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _suffix)
+
+    def get(self, key: str) -> Optional[tuple[Program, NamesContext]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            if not data.startswith(_magic):
+                raise ValueError("Not a rellang AST cache entry")
+            program, names = pickle.loads(
+                zlib.decompress(memoryview(data)[len(_magic) :])
+            )
+        except Exception:
+            _remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return program, names
+
+    def put(self, key: str, program: Program, names: NamesContext):
+        """Stores an entry. Failing to write (a full disk, a read-only directory) only leaves it uncached."""
+        # The fastest zlib level already shrinks the pickle about four times, and decompressing costs a few percent of loading
+        pickled = pickle.dumps((program, names), pickle.HIGHEST_PROTOCOL)
+        data = _magic + zlib.compress(pickled, 1)
+        try:
+            fd, temporary = tempfile.mkstemp(
+                dir=self.directory, prefix=_temporary_prefix
+            )
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temporary, self._path(key))
+        except OSError:
+            _remove(temporary)
+            return
+        if self._size is None or self._size + len(data) > self.max_bytes:
+            self.evict()
+        else:
+            self._size += len(data)
+
+    def evict(self):
+        """Scans the directory, and if it holds more than max_bytes deletes the least recently used entries down to three quarters of that."""
+        entries = []
+        total = 0
+        now = time.time()
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(_temporary_prefix):
+                    if now - stat.st_mtime > _stale_temporary_age:
+                        _remove(entry.path)
+                elif entry.name.endswith(_suffix):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            target = self.max_bytes * 3 // 4
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                # Another process may have removed it already, which frees the space all the same
+                _remove(path)
+                total -= size
+        self._size = total
+
+    def parse(self, source: str | bytes) -> tuple[Program, NamesContext]:
+        """Parses a program in a fresh NamesContext, returning it with the context, as stored or after storing it. Errors are raised as by parse() and nothing is cached for them."""
+        key = self.key(source)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        if isinstance(source, bytes):
+            source = source.decode("utf-8")
+        names = NamesContext()
+        program = parse(source, names)
+        self.put(key, program, names)
+        return program, names
+
+    def parse_file(self, path: str) -> tuple[Program, NamesContext]:
+        # The key is taken from the bytes, so a hit never decodes the file
+        with open(path, "rb") as f:
+            return self.parse(f.read())
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
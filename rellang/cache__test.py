@@ -0,0 +1,143 @@
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import rellang.cache
+from rellang.batch import parse_files
+from rellang.cache import ParseCache
+from rellang.main import run
+from rellang.names_context import NamesContext
+from rellang.nodes import atomic_set, product_set
+from rellang.parser import parse
+
+PROGRAM = """set X := A * B
+rel R := (S: X -> C);(T: C -> C)^+
+export R;(U: C -> X)
+"""
+
+
+def entries(cache: ParseCache) -> list[str]:
+    return sorted(name for name in os.listdir(cache.directory) if name.endswith(".ast"))
+
+
+def test_round_trip(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    names = NamesContext()
+    expected = parse(PROGRAM, names)
+    for _ in range(2):
+        program, cached_names = cache.parse(PROGRAM)
+        assert program == expected
+        assert cached_names.set_definitions == names.set_definitions
+        assert cached_names.rel_definitions == names.rel_definitions
+        assert cached_names.used_names == names.used_names
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Loaded set expressions are the interned ones
+    assert program.expr[0].expr.def_body is product_set(
+        atomic_set("A"), atomic_set("B")
+    )
+    # The text and its bytes are the same entry
+    assert cache.parse(PROGRAM.encode())[0] == expected
+    assert cache.hits == 2 and len(entries(cache)) == 1
+
+
+def test_key(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path))
+    key = cache.key(PROGRAM)
+    assert cache.key(PROGRAM + "\n") != key
+    monkeypatch.setattr(rellang.cache, "__version__", "0.0.0-other")
+    assert ParseCache(str(tmp_path)).key(PROGRAM) != key
+    monkeypatch.undo()
+    monkeypatch.setattr(rellang.cache, "grammar_hash", "0" * 64)
+    assert ParseCache(str(tmp_path)).key(PROGRAM) != key
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    with pytest.raises(ValueError, match="Type mismatch"):
+        cache.parse("(R: A -> B);(S: C -> D)")
+    assert entries(cache) == []
+
+
+@pytest.mark.parametrize(
+    "content", [b"", b"rellang-ast\x01\x80\x05", b"not a cache entry"]
+)
+def test_corrupt_entries_are_misses(tmp_path, content):
+    cache = ParseCache(str(tmp_path))
+    cache.parse(PROGRAM)
+    (name,) = entries(cache)
+    (tmp_path / name).write_bytes(content)
+    assert cache.get(cache.key(PROGRAM)) is None
+    assert entries(cache) == []
+    assert cache.parse(PROGRAM)[0] == parse(PROGRAM)
+
+
+def test_eviction_is_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    programs = [f"(R{i}: A -> B)" for i in range(6)]
+    for i, program in enumerate(programs):
+        cache.parse(program)
+        os.utime(cache._path(cache.key(program)), (1000 + i, 1000 + i))
+    # Using the oldest entry makes it the most recent
+    assert cache.get(cache.key(programs[0])) is not None
+    # Three quarters of the limit is the size of three entries, so the three least recently used go
+    kept = sum(os.path.getsize(cache._path(cache.key(programs[i]))) for i in (0, 4, 5))
+    cache.max_bytes = (kept * 4 + 3) // 3
+    cache.evict()
+    remaining = [p for p in programs if os.path.exists(cache._path(cache.key(p)))]
+    assert remaining == [programs[0], programs[4], programs[5]]
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    stale = tmp_path / ".tmp-crashed"
+    fresh = tmp_path / ".tmp-writing"
+    stale.write_bytes(b"x")
+    fresh.write_bytes(b"x")
+    os.utime(stale, (0, 0))
+    cache.evict()
+    assert not stale.exists() and fresh.exists()
+
+
+def _parse_many(directory: str, programs: list[str]) -> list:
+    # Small enough that entries are evicted while other processes read them
+    cache = ParseCache(directory, max_bytes=4096)
+    return [cache.parse(program)[0] for program in programs * 5]
+
+
+def test_concurrent_processes(tmp_path):
+    programs = [PROGRAM.replace("U", f"U{i}") for i in range(20)]
+    with ProcessPoolExecutor(4) as pool:
+        futures = [
+            pool.submit(_parse_many, str(tmp_path), programs[i:] + programs[:i])
+            for i in range(0, 20, 5)
+        ]
+        results = [future.result() for future in futures]
+    expected = {program: parse(program) for program in programs}
+    for i, result in zip(range(0, 20, 5), results):
+        assert result == [expected[p] for p in (programs[i:] + programs[:i]) * 5]
+    assert not any(name.startswith(".tmp-") for name in os.listdir(tmp_path))
+
+
+def test_batch_and_command_line(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"file{i}.rel"
+        path.write_text(PROGRAM.replace("R", f"R{i}").replace("X", f"X{i}"))
+        paths.append(str(path))
+    cache = ParseCache(str(tmp_path / "cache"))
+    first = parse_files(paths, workers=1, cache=cache)
+    second = parse_files(paths, workers=1, cache=cache)
+    assert second.programs == first.programs
+    assert second.names.rel_definitions == first.names.rel_definitions
+    assert cache.hits == 3
+
+    out = io.StringIO()
+    assert run("parse", paths, json_lines=True, out=out, cache=cache) == 0
+    assert cache.hits == 6
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["program"] for r in records] == [
+        first.programs[path].to_dict() for path in paths
+    ]
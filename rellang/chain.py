@@ -0,0 +1,371 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from rellang.nodes import (
+    AtomicRelation,
+    ClosureRelation,
+    BinaryRelation,
+    ComplementRelation,
+    ComposedRelation,
+    ConverseRelation,
+    CoproductRelation,
+    DefinedRelation,
+    ProductRelation,
+    Relation,
+    StructuralRelation,
+    UnaryRelation,
+    dom_cod,
+)
+
+if TYPE_CHECKING:
+    from rellang.evaluator import Evaluator
+
+# Longer chains are ordered greedily, the dynamic program is cubic in the chain length
+_max_dynamic_chain = 128
+# Path lengths summed when estimating the density of a transitive closure
+_max_closure_steps = 64
+
+
+def composition_factors(expr: Relation) -> list[Relation]:
+    """The relations composed by a tree of compositions, left to right, whatever its association."""
+    factors = []
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ComposedRelation):
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            factors.append(node)
+    return factors
+
+
+def _label(expr: Relation) -> str:
+    if isinstance(expr, AtomicRelation):
+        return expr.rel_name
+    if isinstance(expr, (DefinedRelation, StructuralRelation)):
+        return expr.name
+    return f"<{expr.operation} : {expr.dom_cod.domain} -> {expr.dom_cod.codomain}>"
+
+
+class ChainPlan:
+    """The evaluation order chosen for one composition chain."""
+
+    def __init__(
+        self,
+        factors: list[Relation],
+        sizes: list[int],
+        densities: list[float],
+        order,
+        cost: float,
+        written_cost: float,
+    ):
+        self.factors = factors
+        self.sizes = sizes  # sizes[i] x sizes[i + 1] is the shape of factors[i]
+        self.densities = densities
+        self.order = order  # A factor index, or a (left, right) pair of orders
+        self.cost = cost
+        self.written_cost = written_cost  # Cost of the left-deep order as written
+
+    def format_order(self, order=None) -> str:
+        parts = []
+        # Orders still to write, and the brackets and semicolons between them
+        stack = [self.order if order is None else order]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+            elif isinstance(item, int):
+                parts.append(_label(self.factors[item]))
+            else:
+                stack.extend((")", item[1], ";", item[0], "("))
+        return "".join(parts)
+
+    def explain(self) -> str:
+        shapes = ", ".join(
+            f"{_label(factor)} {self.sizes[i]}x{self.sizes[i + 1]} ({self.densities[i]:.3g})"
+            for i, factor in enumerate(self.factors)
+        )
+        first = self.factors[0].dom_cod.domain
+        last = self.factors[-1].dom_cod.codomain
+        return (
+            f"chain of {len(self.factors)} : {first} -> {last}\n"
+            f"  factors (shape, density): {shapes}\n"
+            f"  order: {self.format_order()}\n"
+            f"  estimated cost {self.cost:.4g} (as written {self.written_cost:.4g})"
+        )
+
+
+class ChainOptimizer:
+    """
+    Chooses the order in which long composition chains are evaluated.
+
+    R1;R2;...;Rn parses into a left-deep tree, but composition is associative, so any bracketing gives the same relation. The cost of composing a p x q value of density a with a q x r value of density b is estimated as the p q r a b pairs of entries that meet (the classic matrix-chain cost when densities are unknown), and the order minimizing the total is found by matrix-chain dynamic programming, or greedily for chains of more than 128 relations. Shapes come from the evaluator's carriers and densities from its atomic relations, propagated through the expression. The rewritten chain has the original chain's dom_cod.
+    """
+
+    def __init__(self, evaluator: "Evaluator"):
+        self.evaluator = evaluator
+        self.plans: list[ChainPlan] = (
+            []
+        )  # Plans of the chains rewritten by the last optimize()
+        self._densities: dict[int, tuple[Relation, float]] = {}
+
+    def optimize(self, expr: Relation) -> Relation:
+        """expr with every composition chain of three or more relations reordered."""
+        self.plans = []
+        self._densities = {}
+        return self._optimize(expr)
+
+    def _optimize(self, expr: Relation) -> Relation:
+        # Post-order over an explicit stack: a node is rewritten once its operands (the factors of a chain) are
+        results = []
+        stack = [(expr, None)]
+        while stack:
+            node, operands = stack.pop()
+            if operands is None:
+                if isinstance(node, ComposedRelation):
+                    operands = composition_factors(node)
+                elif isinstance(node, BinaryRelation):
+                    operands = [node.left, node.right]
+                elif isinstance(node, UnaryRelation):
+                    operands = [node.expr]
+                else:
+                    results.append(node)
+                    continue
+                stack.append((node, operands))
+                stack.extend((operand, None) for operand in reversed(operands))
+                continue
+            rewritten = results[len(results) - len(operands) :]
+            del results[len(results) - len(operands) :]
+            results.append(self._rewrite(node, rewritten))
+        return results[0]
+
+    def _rewrite(self, expr: Relation, operands: list[Relation]) -> Relation:
+        if isinstance(expr, ComposedRelation):
+            if len(operands) < 3:
+                return ComposedRelation(operands[0], operands[1], expr.dom_cod)
+            plan = self.plan(operands)
+            self.plans.append(plan)
+            return self._build(plan, expr)
+        return type(expr)(*operands, expr.dom_cod)
+
+    def explain(self, expr: Relation) -> str:
+        """The plans optimize() chooses for the chains in expr."""
+        self.optimize(expr)
+        if not self.plans:
+            return "no composition chains of three or more relations"
+        return "\n".join(plan.explain() for plan in self.plans)
+
+    def plan(self, factors: list[Relation]) -> ChainPlan:
+        set_size = self.evaluator.set_size
+        sizes = [set_size(factors[0].dom_cod.domain)] + [
+            set_size(factor.dom_cod.codomain) for factor in factors
+        ]
+        densities = [self.density(factor) for factor in factors]
+        if len(factors) <= _max_dynamic_chain:
+            order, cost = _dynamic_order(sizes, densities)
+        else:
+            order, cost = _greedy_order(sizes, densities)
+        written_cost = 0.0
+        density = densities[0]
+        for i in range(1, len(factors)):
+            written_cost += _step_cost(
+                sizes[0], sizes[i], sizes[i + 1], density, densities[i]
+            )
+            density = _composed_density(sizes[i], density, densities[i])
+        return ChainPlan(factors, sizes, densities, order, cost, written_cost)
+
+    def density(self, expr: Relation) -> float:
+        """Estimated fraction of pairs in the value of expr, 1.0 when nothing is known."""
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if id(node) in self._densities:
+                continue
+            operands = self._density_operands(node)
+            if operands and not ready:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in operands)
+                continue
+            density = self._combined_density(
+                node, [self._densities[id(operand)][1] for operand in operands]
+            )
+            self._densities[id(node)] = (node, density)
+        return self._densities[id(expr)][1]
+
+    def _density_operands(self, expr: Relation) -> list[Relation]:
+        # The relations whose densities the density of expr is estimated from
+        if isinstance(expr, DefinedRelation):
+            names = self.evaluator.names
+            if expr.name in names.rel_definitions:
+                return [names.get_rel(expr.name)]
+            return []
+        if isinstance(expr, (ConverseRelation, ComplementRelation, ClosureRelation)):
+            return [expr.expr]
+        if isinstance(expr, (ComposedRelation, ProductRelation, CoproductRelation)):
+            return [expr.left, expr.right]
+        return []
+
+    def _combined_density(self, expr: Relation, operands: list[float]) -> float:
+        size = self.evaluator.set_size
+        if isinstance(expr, AtomicRelation):
+            return _input_density(self.evaluator.relations.get(expr.rel_name))
+        if isinstance(expr, DefinedRelation):
+            return operands[0] if operands else 1.0
+        if isinstance(expr, StructuralRelation):
+            return _structural_density(expr.name, size(expr.dom_cod.codomain))
+        if isinstance(expr, ConverseRelation):
+            return operands[0]
+        if isinstance(expr, ComplementRelation):
+            return 1.0 - operands[0]
+        if isinstance(expr, ClosureRelation):
+            return _closure_density(size(expr.dom_cod.domain), operands[0])
+        if isinstance(expr, ComposedRelation):
+            inner = size(expr.left.dom_cod.codomain)
+            return _composed_density(inner, *operands)
+        if isinstance(expr, ProductRelation):
+            return operands[0] * operands[1]
+        if isinstance(expr, CoproductRelation):
+            left_cells = size(expr.left.dom_cod.domain) * size(
+                expr.left.dom_cod.codomain
+            )
+            right_cells = size(expr.right.dom_cod.domain) * size(
+                expr.right.dom_cod.codomain
+            )
+            cells = size(expr.dom_cod.domain) * size(expr.dom_cod.codomain)
+            return (
+                (left_cells * operands[0] + right_cells * operands[1]) / cells
+                if cells
+                else 0.0
+            )
+        return 1.0
+
+    def _build(self, plan: ChainPlan, root: Relation) -> Relation:
+        results = []
+        stack = [(plan.order, False)]
+        while stack:
+            order, ready = stack.pop()
+            if isinstance(order, int):
+                results.append(plan.factors[order])
+            elif not ready:
+                stack.extend(((order, True), (order[1], False), (order[0], False)))
+            else:
+                right = results.pop()
+                left = results.pop()
+                if order is plan.order:
+                    # The whole chain keeps the declared type
+                    types = root.dom_cod
+                else:
+                    types = dom_cod(left.dom_cod.domain, right.dom_cod.codomain)
+                results.append(ComposedRelation(left, right, types))
+        return results[0]
+
+
+def _input_density(value) -> float:
+    if value is None:
+        return 1.0
+    if hasattr(value, "nnz"):
+        # SparseRelation and BitRelation
+        cells = value.shape[0] * value.shape[1]
+        return value.nnz / cells if cells else 0.0
+    value = np.asarray(value)
+    return float(np.count_nonzero(value)) / value.size if value.size else 0.0
+
+
+def _structural_density(name: str, columns: int) -> float:
+    if name == "Full":
+        return 1.0
+    if name == "Empty":
+        return 0.0
+    # The others are functions, one pair per row
+    return 1.0 / columns if columns else 0.0
+
+
+def _composed_density(inner: int, left: float, right: float) -> float:
+    # Chance that some element of the inner set links a pair, with independent entries
+    return 1.0 - (1.0 - left * right) ** inner
+
+
+def _closure_density(size: int, density: float) -> float:
+    # Paths of length k have density power, the closure holds a pair linked by a path of any length
+    closure = power = density
+    for _ in range(min(size, _max_closure_steps)):
+        power = _composed_density(size, power, density)
+        closure = 1.0 - (1.0 - closure) * (1.0 - power)
+        if power < 1e-9 or closure > 1.0 - 1e-9:
+            break
+    return closure
+
+
+def _step_cost(rows: int, inner: int, columns: int, left: float, right: float) -> float:
+    return rows * inner * columns * left * right
+
+
+def _dynamic_order(sizes: list[int], densities: list[float]):
+    n = len(densities)
+    cost = [[0.0] * n for _ in range(n)]
+    density = [[0.0] * n for _ in range(n)]
+    split = [[0] * n for _ in range(n)]
+    for i in range(n):
+        density[i][i] = densities[i]
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = i + length - 1
+            best = None
+            for k in range(i, j):
+                candidate = (
+                    cost[i][k]
+                    + cost[k + 1][j]
+                    + _step_cost(
+                        sizes[i],
+                        sizes[k + 1],
+                        sizes[j + 1],
+                        density[i][k],
+                        density[k + 1][j],
+                    )
+                )
+                if best is None or candidate < best:
+                    best = candidate
+                    split[i][j] = k
+            cost[i][j] = best
+            k = split[i][j]
+            density[i][j] = _composed_density(
+                sizes[k + 1], density[i][k], density[k + 1][j]
+            )
+
+    def order(i: int, j: int):
+        if i == j:
+            return i
+        k = split[i][j]
+        return (order(i, k), order(k + 1, j))
+
+    return order(0, n - 1), cost[0][n - 1]
+
+
+def _greedy_order(sizes: list[int], densities: list[float]):
+    # Repeatedly compose the adjacent pair that is cheapest to compose
+    items = [(i, densities[i]) for i in range(len(densities))]
+    bounds = list(sizes)
+    total = 0.0
+    while len(items) > 1:
+        best = min(
+            range(len(items) - 1),
+            key=lambda i: _step_cost(
+                bounds[i], bounds[i + 1], bounds[i + 2], items[i][1], items[i + 1][1]
+            ),
+        )
+        total += _step_cost(
+            bounds[best],
+            bounds[best + 1],
+            bounds[best + 2],
+            items[best][1],
+            items[best + 1][1],
+        )
+        merged = (
+            (items[best][0], items[best + 1][0]),
+            _composed_density(bounds[best + 1], items[best][1], items[best + 1][1]),
+        )
+        items[best : best + 2] = [merged]
+        del bounds[best + 1]
+    return items[0][0], total
@@ -0,0 +1,83 @@
+import numpy as np
+
+from rellang.chain import ChainOptimizer, composition_factors
+from rellang.evaluator import Evaluator
+from rellang.names_context import NamesContext
+from rellang.nodes import ComposedRelation
+from rellang.parser import parse
+from rellang.testing import random_relations
+
+CARRIERS = {"A": 200, "B": 4, "C": 200, "D": 3, "E": 50}
+SHAPES = {"R": (200, 4), "S": (4, 200), "T": (200, 3), "U": (3, 50)}
+
+
+CHAIN = "(R : A -> B);(S : B -> C);(T : C -> D);(U : D -> E)"
+
+
+def test_reordering_keeps_type_and_value():
+    expr = parse(CHAIN).expr[0].expr
+    evaluator = Evaluator(CARRIERS, random_relations(SHAPES, 0.5), reorder_chains=True)
+    optimized = evaluator.chains.optimize(expr)
+    assert optimized.dom_cod is expr.dom_cod
+    assert [f.rel_name for f in composition_factors(optimized)] == ["R", "S", "T", "U"]
+    # The narrow B is contracted first instead of building the 200 x 200 R;S
+    assert evaluator.chains.plans[0].format_order() == "((R;(S;T));U)"
+    assert evaluator.chains.plans[0].cost < evaluator.chains.plans[0].written_cost
+    assert np.array_equal(
+        evaluator.evaluate(expr),
+        Evaluator(CARRIERS, random_relations(SHAPES, 0.5)).evaluate(expr),
+    )
+
+
+def test_nested_and_defined_chains():
+    text = (
+        "rel P := (R : A -> B);(S : B -> C);(T : C -> D)\n"
+        "((R : A -> B);(S : B -> C);(T : C -> D)) * (U : D -> E) + P * (U : D -> E)"
+    )
+    names = NamesContext()
+    expr = parse(text, names).expr[1].expr
+    evaluator = Evaluator(
+        CARRIERS, random_relations(SHAPES, 0.5, 1), names, reorder_chains=True
+    )
+    assert "chain of 3" in evaluator.chains.explain(expr)
+    assert np.array_equal(
+        evaluator.evaluate(expr),
+        Evaluator(CARRIERS, random_relations(SHAPES, 0.5, 1), names).evaluate(expr),
+    )
+
+
+def test_long_chains_are_ordered_greedily():
+    text = ";".join(f"(R{i} : S{i} -> S{i + 1})" for i in range(150))
+    carriers = {f"S{i}": 2 + (i * 7) % 5 for i in range(151)}
+    rels = random_relations(
+        {f"R{i}": (carriers[f"S{i}"], carriers[f"S{i + 1}"]) for i in range(150)},
+        0.6,
+        2,
+    )
+    expr = parse(text).expr[0].expr
+    evaluator = Evaluator(carriers, rels, reorder_chains=True)
+    optimized = evaluator.chains.optimize(expr)
+    assert isinstance(optimized, ComposedRelation)
+    assert len(composition_factors(optimized)) == 150
+    assert np.array_equal(
+        evaluator.evaluate(expr), Evaluator(carriers, rels).evaluate(expr)
+    )
+
+
+def test_chains_longer_than_the_recursion_limit():
+    """A single-row first factor makes the greedy order left-deep, 1500 compositions deep"""
+    n = 1500
+    text = "(P : I -> A);" + ";".join(f"(R{i % 3} : A -> A)" for i in range(n - 1))
+    rels = random_relations({f"R{i}": (4, 4) for i in range(3)}, 0.3, 3)
+    rels["P"] = np.array([[True, False, True, False]])
+    carriers = {"I": 1, "A": 4}
+    expr = parse(text).expr[0].expr
+    evaluator = Evaluator(carriers, rels, reorder_chains=True)
+    plan = evaluator.chains.explain(expr)
+    assert plan.count(";") == n - 1 and plan.count("(") == plan.count(")")
+    optimized = evaluator.chains.optimize(expr)
+    assert len(composition_factors(optimized)) == n
+    assert optimized.dom_cod is expr.dom_cod
+    assert np.array_equal(
+        evaluator.evaluate(expr), Evaluator(carriers, rels).evaluate(expr)
+    )
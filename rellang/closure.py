@@ -0,0 +1,115 @@
+import numpy as np
+
+from rellang.complement import Complemented
+from rellang.structural import ImplicitRelation
+
+# Up to this many elements a few BLAS squarings beat Warshall's loop over the elements
+_squaring_max_size = 256
+# Semi-naive iteration hands over to a dense algorithm when the closure grows denser than this
+_semi_naive_max_density = 0.02
+
+
+def closure(backend, value):
+    """
+    value^+, for a value of any kind the evaluator produces.
+
+    An outer relation is its own closure (R;R is R or empty), so Full and Empty stay implicit. Other lazy values are materialized and closed by the backend.
+    """
+    if isinstance(value, ImplicitRelation):
+        if value.is_outer:
+            return value
+        value = value.materialize(backend)
+    elif isinstance(value, Complemented):
+        value = value.materialize(backend)
+    return backend.closure(value)
+
+
+def squaring_closure(matrix: np.ndarray) -> np.ndarray:
+    """
+    The transitive closure of a square boolean matrix by repeated squaring.
+
+    C becomes C or C;C until it stops changing. After k steps C holds the paths of length up to 2**k, so there are at most about log2(n) matrix products, each through BLAS.
+    """
+    # Imported here, rellang.evaluator imports this module
+    from rellang.evaluator import path_counts
+
+    result = np.asarray(matrix, dtype=bool)
+    while True:
+        squared = result | (path_counts(result, result) > 0)
+        if np.array_equal(squared, result):
+            return result
+        result = squared
+
+
+def warshall_closure(words: np.ndarray) -> np.ndarray:
+    """
+    The transitive closure of a square matrix of bit-packed rows (as in rellang.bitpacked.BitRelation) by Warshall's algorithm.
+
+    For each element k, every row with bit k set ORs in row k, a word-parallel update of whole rows. Returns new words.
+    """
+    words = words.copy()
+    one = np.uint64(1)
+    for k in range(words.shape[0]):
+        row = words[k]
+        if not row.any():
+            continue
+        rows = ((words[:, k // 64] >> np.uint64(k % 64)) & one).astype(bool)
+        words[rows] |= row
+    return words
+
+
+def semi_naive_closure(
+    relation: "SparseRelation", max_density: float = _semi_naive_max_density
+):
+    """
+    The transitive closure of a square SparseRelation by semi-naive iteration.
+
+    Only the pairs found in the last step are composed with the relation again, and the new pairs among the results are the next step, so every path is extended once. This suits relations whose closure stays sparse: when the closure grows past max_density, what has been found so far is closed by dense_closure and a dense matrix is returned, otherwise a SparseRelation.
+    """
+    # Imported here, rellang.sparse imports this module
+    from rellang.sparse import SparseRelation, _sorted_unique
+
+    shape = relation.shape
+    cells = shape[0] * shape[1]
+    keys = _keys(relation)
+    delta = relation
+    while delta.nnz:
+        if keys.size > max_density * cells:
+            matrix = np.zeros(shape, dtype=bool)
+            matrix.flat[keys] = True
+            return dense_closure(matrix)
+        found = _keys(delta.compose(relation))
+        positions = np.minimum(np.searchsorted(keys, found), max(keys.size - 1, 0))
+        new = found[keys[positions] != found] if keys.size else found
+        keys = _sorted_unique(np.concatenate((keys, new)))
+        delta = SparseRelation._from_keys(shape, new)
+    return SparseRelation._from_keys(shape, keys)
+
+
+def dense_closure(matrix: np.ndarray) -> np.ndarray:
+    """The transitive closure of a square boolean matrix, by repeated squaring for small matrices and by Warshall's algorithm on packed rows otherwise."""
+    if matrix.shape[0] <= _squaring_max_size:
+        return squaring_closure(matrix)
+    # Imported here, rellang.bitpacked imports rellang.evaluator, which imports this module
+    from rellang.bitpacked import BitRelation
+
+    packed = BitRelation.from_dense(matrix)
+    return BitRelation(packed.shape, warshall_closure(packed.words)).to_dense()
+
+
+def matrix_closure(matrix: np.ndarray) -> np.ndarray:
+    """
+    The transitive closure of a square boolean matrix, with the algorithm chosen by size and density.
+
+    With fewer pairs than elements (an average out-degree below one) the closure usually stays sparse and semi-naive iteration does the least work, otherwise dense_closure does.
+    """
+    if np.count_nonzero(matrix) < matrix.shape[0]:
+        from rellang.sparse import SparseRelation, as_dense
+
+        return as_dense(semi_naive_closure(SparseRelation.from_dense(matrix)))
+    return dense_closure(matrix)
+
+
+def _keys(relation: "SparseRelation") -> np.ndarray:
+    # Sorted keys row * columns + column of the stored pairs
+    return relation.row_indices() * relation.shape[1] + relation.indices
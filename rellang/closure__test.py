@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+
+from rellang.bitpacked import BitPackedBackend, BitRelation
+from rellang.closure import (
+    dense_closure,
+    matrix_closure,
+    semi_naive_closure,
+    squaring_closure,
+    warshall_closure,
+)
+from rellang.evaluator import DenseBackend, Evaluator
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+from rellang.query import Query
+from rellang.sparse import AutoBackend, SparseBackend, SparseRelation, as_dense
+from rellang.structural import ImplicitRelation
+from rellang.testing import materialized, random_relations
+
+
+def reachable(matrix: np.ndarray) -> np.ndarray:
+    """The closure by a search from every element, one step at a time."""
+    size = matrix.shape[0]
+    result = np.zeros_like(matrix)
+    for start in range(size):
+        frontier = [start]
+        while frontier:
+            step = np.flatnonzero(matrix[frontier].any(axis=0) & ~result[start])
+            result[start, step] = True
+            frontier = list(step)
+    return result
+
+
+def graphs():
+    rng = np.random.default_rng(0)
+    path = np.eye(300, k=1, dtype=bool)
+    cycle = np.roll(np.eye(70, dtype=bool), 1, axis=1)
+    yield "empty", np.zeros((5, 5), dtype=bool)
+    yield "path", path
+    yield "cycle", cycle
+    for size in (1, 63, 64, 65, 300):
+        for degree in (0.5, 2.0):
+            yield f"random {size} {degree}", rng.random((size, size)) < degree / size
+
+
+GRAPHS = dict(graphs())
+
+
+@pytest.mark.parametrize("name", GRAPHS)
+def test_algorithms_agree(name):
+    matrix = GRAPHS[name]
+    expected = reachable(matrix)
+    assert np.array_equal(squaring_closure(matrix), expected)
+    packed = BitRelation.from_dense(matrix)
+    assert np.array_equal(
+        BitRelation(packed.shape, warshall_closure(packed.words)).to_dense(), expected
+    )
+    assert np.array_equal(dense_closure(matrix), expected)
+    assert np.array_equal(matrix_closure(matrix), expected)
+    sparse = SparseRelation.from_dense(matrix)
+    assert semi_naive_closure(sparse, max_density=1.0) == SparseRelation.from_dense(
+        expected
+    )
+    # Handing over to a dense algorithm part way gives the same closure
+    handed_over = semi_naive_closure(sparse, max_density=0.0)
+    assert np.array_equal(as_dense(handed_over), expected)
+    # The input is not modified
+    assert np.array_equal(packed.to_dense(), matrix)
+
+
+@pytest.mark.parametrize(
+    "backend", [DenseBackend(), SparseBackend(), AutoBackend(), BitPackedBackend()]
+)
+def test_evaluation(backend):
+    values = (
+        random_relations({"R": (6, 6)}, 0.2, 1)
+        | random_relations({"S": (6, 4)}, 0.3, 1)
+        | random_relations({"T": (24, 24)}, 0.05, 1)
+    )
+    names = NamesContext()
+    program = parse(
+        """
+        (R : A -> A)^+;(S : A -> B)
+        (R : A -> A)^^+
+        ~((R : A -> A)^+);(R : A -> A)^+
+        ((R : A -> A)^+ + (R : A -> A))^+
+        (T : A * B -> A * B)^+;(First : A * B -> A);(R : A -> A)^+
+        (Copy : A -> A * A);((First : A * A -> A);(Copy : A -> A * A))^+;(Second : A * A -> A)
+        """,
+        names,
+    )
+    evaluator = Evaluator({"A": 6, "B": 4}, values, names, backend)
+    r = reachable(values["R"])
+    t = reachable(values["T"])
+    dense = DenseBackend()
+    rows = np.arange(6)
+    first = np.zeros((24, 6), dtype=bool)
+    first[np.arange(24), np.arange(24) // 4] = True
+    pairs = np.arange(36)
+    first_of_pairs = np.zeros((36, 6), dtype=bool)
+    first_of_pairs[pairs, pairs // 6] = True
+    second_of_pairs = np.zeros((36, 6), dtype=bool)
+    second_of_pairs[pairs, pairs % 6] = True
+    copy = np.zeros((6, 36), dtype=bool)
+    copy[rows, rows * 7] = True
+    expected = [
+        dense.compose(r, values["S"]),
+        reachable(values["R"].T),
+        dense.compose(~r, r),
+        reachable(dense.coproduct(r, values["R"])),
+        dense.compose(dense.compose(t, first), r),
+        dense.compose(
+            dense.compose(copy, reachable(dense.compose(first_of_pairs, copy))),
+            second_of_pairs,
+        ),
+    ]
+    results = evaluator.evaluate_program(program)
+    assert len(results) == len(expected)
+    for value, matrix in zip(results, expected):
+        assert np.array_equal(backend.to_dense(value), matrix)
+
+
+@pytest.mark.parametrize(
+    "backend", [DenseBackend(), SparseBackend(), AutoBackend(), BitPackedBackend()]
+)
+@pytest.mark.parametrize(
+    "text",
+    [
+        "(R : A -> A)^+;(S : A -> B)",
+        "~(R : A -> A)^+ * (R : A -> A)^^+",
+        "rel D := (R : A -> A)^+\n((Copy : A -> A * A);(D * D);(First : A * A -> A))^+",
+    ],
+)
+def test_evaluation_matches_materialized(text, backend):
+    values = random_relations({"R": (6, 6), "S": (6, 4)}, 0.2, 3)
+    names = NamesContext()
+    expr = parse(text, names).expr[-1].expr
+    evaluator = Evaluator({"A": 6, "B": 4}, values, names, backend)
+    expected = materialized(expr, evaluator, values)
+    assert np.array_equal(backend.to_dense(evaluator.evaluate(expr)), expected)
+
+
+def test_closure_of_full_stays_implicit():
+    expr = parse("(Full : A -> A)^+").expr[0].expr
+    evaluator = Evaluator({"A": 100000}, {})
+    value = evaluator._value(expr)
+    assert isinstance(value, ImplicitRelation) and value.is_outer
+
+
+def test_query_searches_the_closure():
+    values = random_relations({"R": (200, 200)}, 0.008, 2)
+    expr = parse("(R : A -> A)^+").expr[0].expr
+    query = Query({"A": 200}, values)
+    expected = reachable(values["R"])
+    for start in range(0, 200, 17):
+        assert np.array_equal(
+            query.image(expr, [start]), np.flatnonzero(expected[start])
+        )
+        assert np.array_equal(
+            query.preimage(expr, [start]), np.flatnonzero(expected[:, start])
+        )
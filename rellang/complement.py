@@ -0,0 +1,90 @@
+import numpy as np
+
+from rellang.structural import ImplicitRelation
+
+
+class Complemented:
+    """
+    The complement of value, kept as a flag instead of a negated matrix.
+
+    Complements are dense whatever the density of value, so they are only built when needed: a double complement cancels, converse commutes with complement, and a composition with a complemented operand is computed from path counts of the operands as given.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.value.shape
+
+    def materialize(self, backend):
+        return backend.complement(self.value)
+
+    def __repr__(self) -> str:
+        return f"Complemented({self.value!r})"
+
+
+def complement(backend, value):
+    """~value, for a value of any kind the evaluator produces."""
+    if isinstance(value, Complemented):
+        return value.value
+    if isinstance(value, ImplicitRelation):
+        if value.is_outer:
+            rows, columns = value.rows, value.columns
+            if not (rows.any() and columns.any()):
+                # ~Empty is Full
+                return ImplicitRelation.outer(np.ones_like(rows), np.ones_like(columns))
+            if rows.all() and columns.all():
+                return ImplicitRelation.outer(
+                    np.zeros_like(rows), np.zeros_like(columns)
+                )
+        value = value.materialize(backend)
+    return Complemented(value)
+
+
+def converse(backend, value):
+    """value^, a transposed view where the backend has them."""
+    if isinstance(value, Complemented):
+        return Complemented(converse(backend, value.value))
+    if isinstance(value, ImplicitRelation):
+        return value.converse()
+    return backend.transpose(value)
+
+
+def compose(backend, left, right):
+    """
+    left;right where either side may be Complemented.
+
+    With counts of the paths through R and S, (~R);S relates i to k when column k of S has more entries than the paths from i to k, R;(~S) when row i of R has more entries than those paths, and (~R);(~S) by inclusion and exclusion over the inner set. No negated matrix is allocated.
+    """
+    negate_left = isinstance(left, Complemented)
+    negate_right = isinstance(right, Complemented)
+    if negate_left:
+        left = left.value
+    if negate_right:
+        right = right.value
+    if isinstance(left, ImplicitRelation):
+        left = left.materialize(backend)
+    if isinstance(right, ImplicitRelation):
+        right = right.materialize(backend)
+    # Imported here, rellang.evaluator imports this module
+    from rellang.evaluator import path_counts
+
+    left = backend.to_dense(left)
+    right = backend.to_dense(right)
+    counts = path_counts(left, right)
+    if negate_left and negate_right:
+        # Some j is in neither row i of R nor column k of S
+        bound = (
+            np.count_nonzero(left, axis=1)[:, None]
+            + np.count_nonzero(right, axis=0)[None, :]
+            - left.shape[1]
+        )
+        result = counts > bound
+    elif negate_left:
+        result = counts < np.count_nonzero(right, axis=0)[None, :]
+    else:
+        result = counts < np.count_nonzero(left, axis=1)[:, None]
+    return backend.atomic(result)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from rellang.bitpacked import BitPackedBackend
+from rellang.complement import Complemented
+from rellang.evaluator import DenseBackend, Evaluator
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+from rellang.sparse import AutoBackend, SparseBackend
+from rellang.testing import materialized, random_relations
+
+CARRIERS = {"A": 5, "B": 3, "C": 4}
+SHAPES = {"R": (5, 3), "S": (3, 4), "T": (4, 15)}
+
+EXPRESSIONS = [
+    "(R : A -> B)^",
+    "~(R : A -> B)",
+    "~(R : A -> B);(S : B -> C)",
+    "(R : A -> B);~(S : B -> C)",
+    "~(R : A -> B);~(S : B -> C)",
+    "~(R : A -> B)^;(R : A -> B)",
+    "(~(R : A -> B))^^",
+    "~~(R : A -> B)",
+    "~(Empty : A -> B);(S : B -> C)",
+    "(First : A * B -> A)^;(T : C -> A * B)^",
+    "(T : C -> A * B);(Second : A * B -> B);(Second : A * B -> B)^",
+    "(Copy : B -> B * B)^;(S : B -> C)",
+    "(First : A * B -> A)^;(First : A * B -> A)",
+    "(Full : C -> A + B);(Left : A -> A + B)^",
+    "(Copy : A -> A * A);(Copy : A -> A * A)^",
+    "~(R : A -> B) * (S : B -> C)^",
+    "~((R : A -> B);(S : B -> C))^ + (R : A -> B)",
+    "rel D := ~(R : A -> B)\n(D;(S : B -> C))^;D",
+]
+
+
+@pytest.mark.parametrize(
+    "backend", [DenseBackend(), SparseBackend(), AutoBackend(), BitPackedBackend()]
+)
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_lazy_evaluation_matches_materialized(text, backend):
+    names = NamesContext()
+    program = parse(text, names)
+    expr = program.expr[-1].expr
+    evaluator = Evaluator(CARRIERS, random_relations(SHAPES, 0.4), names, backend)
+    expected = materialized(expr, evaluator, random_relations(SHAPES, 0.4))
+    assert np.array_equal(backend.to_dense(evaluator.evaluate(expr)), expected)
+
+
+def test_converse_is_a_view():
+    values = random_relations(SHAPES, 0.4)
+    evaluator = Evaluator(CARRIERS, values)
+    value = evaluator.evaluate(parse("(R : A -> B)^^^").expr[0].expr)
+    assert np.shares_memory(value, evaluator._atomic["R"])
+    assert np.array_equal(value, values["R"].T)
+
+
+def test_complement_is_not_materialized_in_compositions(monkeypatch):
+    def fail(self, value):
+        raise AssertionError("complement materialized")
+
+    monkeypatch.setattr(DenseBackend, "complement", fail)
+    names = NamesContext()
+    expr = parse("~(R : A -> B)^^;~(S : B -> C);(T : C -> A * B)", names).expr[0].expr
+    evaluator = Evaluator(CARRIERS, random_relations(SHAPES, 0.4), names)
+    assert isinstance(evaluator._value(expr.left.left), Complemented)
+    assert np.array_equal(
+        evaluator.evaluate(expr),
+        materialized(expr, evaluator, random_relations(SHAPES, 0.4)),
+    )
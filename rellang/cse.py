@@ -0,0 +1,292 @@
+from collections import Counter, OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Optional
+
+import numpy as np
+
+from rellang.evaluator import Evaluator
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    BinaryRelation,
+    DefinedRelation,
+    Definition,
+    Program,
+    Relation,
+    StructuralRelation,
+    UnaryRelation,
+    statement_body,
+)
+
+
+class Fingerprints:
+    """
+    Structural fingerprints of relation expressions.
+
+    Structurally identical subtrees get the same small integer, wherever they occur: fingerprints are hash-consed bottom-up, so a node's fingerprint is looked up from its operation and its children's fingerprints without walking the subtree again. A defined relation has the fingerprint of its body, so a definition and the expression it names are recognised as the same subexpression. Each fingerprint also records the atomic relations its value depends on.
+    """
+
+    def __init__(self, names: NamesContext):
+        self.names = names
+        self._table: dict[tuple, int] = {}
+        self._deps: list[frozenset[str]] = []
+        self._defined: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._deps)
+
+    def fingerprint(self, expr: Relation, memo: Optional[dict] = None) -> int:
+        """memo (by node id) lets the caller keep fingerprints of nodes it visits again."""
+        if memo is None:
+            memo = {}
+        # Post-order over an explicit stack, so deep expressions do not recurse
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if id(node) in memo:
+                continue
+            operands = self._operands(node)
+            if operands and not ready:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in reversed(operands))
+                continue
+            fingerprint = self._combine(
+                node, [memo[id(operand)][1] for operand in operands]
+            )
+            memo[id(node)] = (node, fingerprint)
+        return memo[id(expr)][1]
+
+    def _operands(self, expr: Relation) -> list[Relation]:
+        if isinstance(expr, DefinedRelation):
+            if expr.name in self._defined:
+                return []
+            if expr.name not in self.names.rel_definitions:
+                raise ValueError(f"Undefined relation: {expr.name}")
+            return [self.names.get_rel(expr.name)]
+        if isinstance(expr, BinaryRelation):
+            return [expr.left, expr.right]
+        if isinstance(expr, UnaryRelation):
+            return [expr.expr]
+        return []
+
+    def _combine(self, expr: Relation, operands: list[int]) -> int:
+        # The fingerprint of expr from those of its operands
+        if isinstance(expr, AtomicRelation):
+            return self._intern(
+                ("atomic", expr.rel_name, expr.dom_cod), frozenset((expr.rel_name,))
+            )
+        if isinstance(expr, StructuralRelation):
+            return self._intern(("structural", expr.name, expr.dom_cod), frozenset())
+        if isinstance(expr, DefinedRelation):
+            if operands:
+                self._defined[expr.name] = operands[0]
+            return self._defined[expr.name]
+        if isinstance(expr, BinaryRelation):
+            left, right = operands
+            return self._intern(
+                (expr.operation, left, right), self._deps[left] | self._deps[right]
+            )
+        if isinstance(expr, UnaryRelation):
+            (inner,) = operands
+            return self._intern((expr.operation, inner), self._deps[inner])
+        raise TypeError(f"Cannot fingerprint {type(expr).__name__}")
+
+    def dependencies(self, fingerprint: int) -> frozenset[str]:
+        """Names of the atomic relations the value depends on."""
+        return self._deps[fingerprint]
+
+    def _intern(self, key: tuple, deps: frozenset[str]) -> int:
+        fingerprint = self._table.get(key)
+        if fingerprint is None:
+            fingerprint = len(self._deps)
+            self._table[key] = fingerprint
+            self._deps.append(deps)
+        return fingerprint
+
+
+class ResultCache:
+    """
+    A bounded LRU mapping of (fingerprint, data version) keys to evaluated values, with hit and miss counts.
+
+    Fingerprints and data versions are numbered by the CachingEvaluator the cache belongs to, so a cache serves a single evaluator, and it refuses a second one. The arrays of the values put in the cache are made read-only: a value is handed out to every later lookup, and changing it in place would change theirs too.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._owner = None  # The CachingEvaluator using the cache
+        self._entries: OrderedDict[tuple, object] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value):
+        _make_read_only(value)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _make_read_only(value):
+    # The arrays of a value: an ndarray, or the slots of a SparseRelation, BitRelation, ImplicitRelation or Complemented
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, np.ndarray):
+            item.flags.writeable = False
+        else:
+            slots = getattr(type(item), "__slots__", ())
+            stack.extend(getattr(item, slot, None) for slot in slots)
+
+
+class CachingEvaluator(Evaluator):
+    """
+    Evaluator that reuses the values of structurally identical subexpressions.
+
+    Every composite value is stored in a ResultCache under its structural fingerprint and the data version of the atomic relations it depends on, so identical fragments in different statements, or in later evaluations, are computed once. update_relation() replaces an atomic relation's matrix and bumps its version: only cached values depending on it become unreachable, and the LRU evicts them in time.
+
+    evaluate_program() first runs a common subexpression pass over the whole program and holds the values of subexpressions that occur more than once for the length of the call, so each is evaluated once however small the cache.
+    """
+
+    def __init__(
+        self,
+        carriers: Mapping[str, int | Sequence],
+        relations: Mapping[str, object],
+        names: Optional[NamesContext] = None,
+        backend=None,
+        reorder_chains: bool = False,
+        cache: Optional[ResultCache] = None,
+    ):
+        super().__init__(carriers, dict(relations), names, backend, reorder_chains)
+        self.cache = cache if cache is not None else ResultCache()
+        if self.cache._owner is not None:
+            raise ValueError(
+                "The ResultCache is used by another CachingEvaluator, its keys are only meaningful to that evaluator"
+            )
+        self.cache._owner = self
+        self.fingerprints = Fingerprints(self.names)
+        self.data_version = 0
+        # Atomic relation -> data_version of its last update
+        self._changed_at: dict[str, int] = {}
+        # Node id -> (node, fingerprint), during a top-level call
+        self._fingerprint_memo: dict = {}
+        self._calls = 0  # Nesting of evaluate() and evaluate_program() calls
+        # During evaluate_program(), the fingerprints occurring more than once and their values
+        self._shared: set[int] = set()
+        self._pinned: dict[tuple, object] = {}
+
+    def update_relation(self, name: str, matrix):
+        """Replaces the matrix of an atomic relation."""
+        self.relations[name] = matrix
+        self.data_version += 1
+        self._changed_at[name] = self.data_version
+        self._atomic.pop(name, None)
+        self._defined.clear()
+
+    def key(self, expr: Relation) -> tuple:
+        """The cache key of expr: its fingerprint and the last update to any relation it depends on."""
+        fingerprint = self.fingerprints.fingerprint(expr, self._fingerprint_memo)
+        version = max(
+            (
+                self._changed_at.get(name, 0)
+                for name in self.fingerprints.dependencies(fingerprint)
+            ),
+            default=0,
+        )
+        return (fingerprint, version)
+
+    def common_subexpressions(self, program: Program) -> Counter:
+        """Occurrences of each fingerprint among the composite relation subtrees of program."""
+        counts: Counter[int] = Counter()
+        memo: dict = {}
+        for statement in program.expr:
+            expr = statement_body(statement)
+            if isinstance(expr, Definition):
+                if expr.expr_type == "set":
+                    continue
+                expr = expr.def_body
+            stack = [expr]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, (AtomicRelation, StructuralRelation)):
+                    continue
+                counts[self.fingerprints.fingerprint(node, memo)] += 1
+                if isinstance(node, BinaryRelation):
+                    stack.append(node.left)
+                    stack.append(node.right)
+                elif isinstance(node, UnaryRelation):
+                    stack.append(node.expr)
+        return counts
+
+    def evaluate(self, expr: Relation):
+        self._calls += 1
+        try:
+            return super().evaluate(expr)
+        finally:
+            self._end_call()
+
+    def evaluate_program(self, program: Program) -> list:
+        counts = self.common_subexpressions(program)
+        self._shared = {
+            fingerprint for fingerprint, count in counts.items() if count > 1
+        }
+        self._calls += 1
+        try:
+            return super().evaluate_program(program)
+        finally:
+            self._shared = set()
+            self._pinned = {}
+            self._end_call()
+
+    def _end_call(self):
+        self._calls -= 1
+        if not self._calls:
+            self._fingerprint_memo = {}
+
+    def _cached(self, expr: Relation):
+        if isinstance(expr, (AtomicRelation, StructuralRelation, DefinedRelation)):
+            # A definition's body is evaluated and cached under the same fingerprint
+            return super()._cached(expr)
+        key = self.key(expr)
+        value = self._pinned.get(key)
+        if value is None:
+            value = self.cache.get(key)
+            if value is not None and key[0] in self._shared:
+                self._pinned[key] = value
+        return value
+
+    def _store(self, expr: Relation, value):
+        if isinstance(expr, DefinedRelation):
+            super()._store(expr, value)
+            return
+        key = self.key(expr)
+        self.cache.put(key, value)
+        if key[0] in self._shared:
+            self._pinned[key] = value
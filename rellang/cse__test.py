@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from rellang.cse import CachingEvaluator, Fingerprints, ResultCache
+from rellang.evaluator import Evaluator
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+from rellang.sparse import SparseBackend
+from rellang.testing import random_relations
+
+CARRIERS = {"A": 30, "B": 20}
+SHAPES = {"R": (30, 20), "S": (20, 30)}
+
+
+PROGRAM = """rel D := (R : A -> B);(S : B -> A)
+D;D
+((R : A -> B);(S : B -> A));(R : A -> B)
+D * D"""
+
+
+def test_matches_plain_evaluator():
+    names = NamesContext()
+    program = parse(PROGRAM, names)
+    expected = Evaluator(
+        CARRIERS, random_relations(SHAPES, 0.3), names
+    ).evaluate_program(program)
+    values = CachingEvaluator(
+        CARRIERS, random_relations(SHAPES, 0.3), names
+    ).evaluate_program(program)
+    assert len(values) == len(expected)
+    for value, reference in zip(values, expected):
+        assert np.array_equal(value, reference)
+
+
+def test_definition_shares_fingerprint_of_body():
+    names = NamesContext()
+    program = parse(PROGRAM, names)
+    fingerprints = Fingerprints(names)
+    body = program.expr[0].expr.def_body
+    written = program.expr[2].expr.left
+    defined = program.expr[1].expr.left
+    assert fingerprints.fingerprint(body) == fingerprints.fingerprint(written)
+    assert fingerprints.fingerprint(defined) == fingerprints.fingerprint(body)
+    assert fingerprints.dependencies(fingerprints.fingerprint(body)) == {"R", "S"}
+
+
+def test_shared_subexpressions_evaluated_once():
+    names = NamesContext()
+    program = parse(PROGRAM, names)
+    # A cache too small to hold anything across statements
+    evaluator = CachingEvaluator(
+        CARRIERS, random_relations(SHAPES, 0.3), names, cache=ResultCache(1)
+    )
+    counts = evaluator.common_subexpressions(program)
+    # R;S: the definition, two uses in D;D, one written, two in D * D
+    assert max(counts.values()) == 6
+    evaluator.evaluate_program(program)
+    # R;S, D;D, (R;S);R and D * D
+    assert evaluator.cache.misses == 4
+
+    evaluator.evaluate_program(program)
+    assert evaluator.cache.misses == 8
+
+
+def test_cache_reused_across_calls_and_invalidated_by_update():
+    names = NamesContext()
+    program = parse(PROGRAM, names)
+    evaluator = CachingEvaluator(CARRIERS, random_relations(SHAPES, 0.3), names)
+    evaluator.evaluate_program(program)
+    assert evaluator.cache.stats()["misses"] == 4
+    evaluator.evaluate_program(program)
+    assert evaluator.cache.stats()["misses"] == 4
+    assert evaluator.cache.stats()["hits"] > 0
+
+    # Only S changes: R alone is atomic and everything else depends on S
+    evaluator.update_relation("S", random_relations(SHAPES, 0.3, 1)["S"])
+    values = evaluator.evaluate_program(program)
+    assert evaluator.cache.stats()["misses"] == 8
+    expected = Evaluator(
+        CARRIERS,
+        random_relations(SHAPES, 0.3, 0) | {"S": random_relations(SHAPES, 0.3, 1)["S"]},
+        names,
+    )
+    for value, reference in zip(values, expected.evaluate_program(program)):
+        assert np.array_equal(value, reference)
+
+
+def test_lru_eviction():
+    cache = ResultCache(2)
+    cache.put((0, 0), "a")
+    cache.put((1, 0), "b")
+    assert cache.get((0, 0)) == "a"
+    cache.put((2, 0), "c")
+    assert cache.get((1, 0)) is None
+    assert cache.get((0, 0)) == "a"
+    assert cache.stats() == {
+        "entries": 2,
+        "max_entries": 2,
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "hit_rate": 2 / 3,
+    }
+
+
+def test_cache_serves_one_evaluator():
+    """Fingerprints are numbered per evaluator, so another evaluator cannot use the cache"""
+    names = NamesContext()
+    parse(PROGRAM, names)
+    cache = ResultCache()
+    CachingEvaluator(CARRIERS, random_relations(SHAPES, 0.3), names, cache=cache)
+    with pytest.raises(ValueError, match="used by another CachingEvaluator"):
+        CachingEvaluator(CARRIERS, random_relations(SHAPES, 0.3), names, cache=cache)
+
+
+@pytest.mark.parametrize("backend", [None, SparseBackend()])
+def test_cached_values_are_read_only(backend):
+    names = NamesContext()
+    program = parse(PROGRAM, names)
+    evaluator = CachingEvaluator(
+        CARRIERS, random_relations(SHAPES, 0.3), names, backend
+    )
+    expr = program.expr[1].expr
+    value = evaluator.evaluate(expr)
+    arrays = [value] if backend is None else [value.indptr, value.indices]
+    for array in arrays:
+        with pytest.raises(ValueError, match="read-only"):
+            array[0] = 0
+    assert evaluator.evaluate(expr) is value
+
+
+def test_deep_expressions_do_not_recurse():
+    shift = np.array([[0, 1, 0], [0, 0, 1], [1, 0, 0]], dtype=bool)
+    names = NamesContext()
+    program = parse(";".join(["(T : A -> A)"] * 3001), names)
+    value = CachingEvaluator({"A": 3}, {"T": shift}, names).evaluate_program(program)
+    assert np.array_equal(value[0], np.linalg.matrix_power(shift.astype(int), 3001) > 0)
@@ -0,0 +1,305 @@
+from collections.abc import Mapping, Sequence
+from typing import Optional
+
+import numpy as np
+
+from rellang.closure import closure, matrix_closure
+from rellang.complement import Complemented, complement, converse
+from rellang.complement import compose as compose_complemented
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    ClosureRelation,
+    ComplementRelation,
+    ComposedRelation,
+    ConverseRelation,
+    CoproductRelation,
+    DefinedRelation,
+    Definition,
+    ProductRelation,
+    Program,
+    Relation,
+    SetExpr,
+    StructuralRelation,
+    statement_body,
+)
+from rellang.structural import ImplicitRelation, compose, structural_value
+
+# Integer sums of 0/1 products are exact in float32 up to 2**24, and float32 matrix products use BLAS
+_exact_float32_limit = 2**24
+
+
+def path_counts(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Number of paths from each row of left to each column of right, as a float32 or int64 matrix."""
+    if left.shape[1] < _exact_float32_limit:
+        return left.astype(np.float32) @ right.astype(np.float32)
+    return left.astype(np.int64) @ right.astype(np.int64)
+
+
+class DenseBackend:
+    """
+    Relation values as dense boolean matrices, one row per domain element and one column per codomain element.
+
+    Elements of a product A * B are ordered pairwise, (a, b) at index a * |B| + b, and the elements of a coproduct A + B are those of A followed by those of B. With these layouts the product of relations is the Kronecker product and the coproduct is the block-diagonal matrix.
+
+    gather_rows, scatter_columns, rows_meeting and columns_meeting compose values with the implicit structural relations of rellang.structural, and function and outer materialize those. transpose, complement and closure give converses, complements and transitive closures.
+    """
+
+    name = "dense"
+
+    def atomic(self, matrix) -> np.ndarray:
+        return np.asarray(matrix, dtype=bool)
+
+    def shape(self, value: np.ndarray) -> tuple[int, int]:
+        return value.shape
+
+    def compose(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        return path_counts(left, right) > 0
+
+    def product(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        # The Kronecker product, as one broadcast AND (np.kron multiplies and is several times slower on booleans)
+        rows, columns = left.shape
+        right_rows, right_columns = right.shape
+        return np.logical_and(left[:, None, :, None], right[None, :, None, :]).reshape(
+            rows * right_rows, columns * right_columns
+        )
+
+    def coproduct(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        rows, columns = left.shape
+        result = np.zeros((rows + right.shape[0], columns + right.shape[1]), dtype=bool)
+        result[:rows, :columns] = left
+        result[rows:, columns:] = right
+        return result
+
+    def gather_rows(self, value: np.ndarray, index: np.ndarray) -> np.ndarray:
+        """Row i of the result is row index[i] of value."""
+        return value[index]
+
+    def scatter_columns(
+        self, value: np.ndarray, index: np.ndarray, columns: int
+    ) -> np.ndarray:
+        """Column c of the result is the OR of the columns j of value with index[j] == c."""
+        result = np.zeros((value.shape[0], columns), dtype=bool)
+        if not index.size:
+            return result
+        if (
+            columns
+            and index.size % columns == 0
+            and index.size > columns
+            and np.array_equal(index, np.arange(index.size) % columns)
+        ):
+            # Periodic, as for Second and Collapse: OR the blocks of columns together
+            return value.reshape(value.shape[0], -1, columns).any(axis=1)
+        order = None
+        if np.any(index[1:] < index[:-1]):
+            order = np.argsort(index, kind="stable")
+            index = index[order]
+        starts = np.flatnonzero(np.concatenate(([True], index[1:] != index[:-1])))
+        if starts.size == index.size:
+            # Injective: each column moves to its image
+            result[:, index] = value if order is None else value[:, order]
+        else:
+            # OR together the runs of columns with the same image
+            value = value if order is None else value[:, order]
+            result[:, index[starts]] = np.logical_or.reduceat(value, starts, axis=1)
+        return result
+
+    def rows_meeting(self, value: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """Mask of the rows of value related to some column in the columns mask."""
+        return value[:, columns].any(axis=1)
+
+    def columns_meeting(self, value: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Mask of the columns of value related to some row in the rows mask."""
+        return value[rows].any(axis=0)
+
+    def transpose(self, value: np.ndarray) -> np.ndarray:
+        """The converse, as a view of value."""
+        return value.T
+
+    def complement(self, value: np.ndarray) -> np.ndarray:
+        return np.logical_not(value)
+
+    def closure(self, value: np.ndarray) -> np.ndarray:
+        return matrix_closure(value)
+
+    def function(self, index: np.ndarray, columns: int) -> np.ndarray:
+        """The matrix relating each row i to column index[i] only."""
+        result = np.zeros((index.size, columns), dtype=bool)
+        result[np.arange(index.size), index] = True
+        return result
+
+    def outer(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """The matrix relating every row in the rows mask to every column in the columns mask."""
+        return np.logical_and(rows[:, None], columns[None, :])
+
+    def to_dense(self, value: np.ndarray) -> np.ndarray:
+        return value
+
+
+class Evaluator:
+    """
+    Computes the values of relation expressions over finite carriers.
+
+    carriers gives each atomic set as its number of elements or a sequence of its elements, and relations gives each atomic relation as a boolean matrix (anything np.asarray accepts) of shape (|domain|, |codomain|). The sizes of other sets follow from the set expressions in the dom_cods: products multiply sizes and coproducts add them. Defined sets and relations are looked up in names and each definition is evaluated once.
+
+    Values are in the representation of the backend, dense boolean matrices by default (see DenseBackend for the element order of products and coproducts). R;S composes in diagrammatic order, R first. With reorder_chains, long composition chains are evaluated in the order chosen by rellang.chain.ChainOptimizer.
+
+    Structural relations are never built as matrices while they are only composed: they evaluate to rellang.structural.ImplicitRelation values, and compositions with them are done by index arithmetic. Converses are transposed views in the dense backend, and complements are rellang.complement.Complemented flags pushed through converses, complements and compositions. Such lazy values are materialized when they are an operand of a product, coproduct or closure, or the value of the whole expression. Transitive closures are computed by the backend with an algorithm chosen by size and density (see rellang.closure).
+    """
+
+    def __init__(
+        self,
+        carriers: Mapping[str, int | Sequence],
+        relations: Mapping[str, object],
+        names: Optional[NamesContext] = None,
+        backend=None,
+        reorder_chains: bool = False,
+    ):
+        self.carriers = carriers
+        self.relations = relations
+        self.names = names if names is not None else NamesContext()
+        self.backend = backend if backend is not None else DenseBackend()
+        self._sizes: dict[SetExpr, int] = {}
+        self._atomic: dict[str, object] = {}
+        self._defined: dict[str, object] = {}
+        self.chains = None
+        if reorder_chains:
+            from rellang.chain import ChainOptimizer
+
+            self.chains = ChainOptimizer(self)
+
+    def set_size(self, expr: SetExpr) -> int:
+        size = self._sizes.get(expr)
+        if size is not None:
+            return size
+        if expr.operation == "atomic":
+            if expr.name not in self.carriers:
+                raise ValueError(f"No carrier for set {expr.name}")
+            carrier = self.carriers[expr.name]
+            size = carrier if isinstance(carrier, int) else len(carrier)
+        elif expr.operation == "defined":
+            if expr.name not in self.names.set_definitions:
+                raise ValueError(f"Undefined set: {expr.name}")
+            size = self.set_size(self.names.get_set(expr.name))
+        elif expr.operation == "product":
+            size = self.set_size(expr.left) * self.set_size(expr.right)
+        else:
+            size = self.set_size(expr.left) + self.set_size(expr.right)
+        self._sizes[expr] = size
+        return size
+
+    def evaluate(self, expr: Relation):
+        """The value of a relation expression. Subtrees shared within expr are evaluated once."""
+        return self._materialize(self._value(expr))
+
+    def _value(self, expr: Relation):
+        # The value of expr, which may still be an ImplicitRelation
+        if self.chains is not None:
+            expr = self.chains.optimize(expr)
+        return self._evaluate(expr, {})
+
+    def _materialize(self, value):
+        if isinstance(value, (ImplicitRelation, Complemented)):
+            return value.materialize(self.backend)
+        return value
+
+    def evaluate_program(self, program: Program) -> list:
+        """Values of the relation statements of a program, exported or not, in order. Definitions only extend names."""
+        bodies = (statement_body(statement) for statement in program.expr)
+        return [
+            self.evaluate(body) for body in bodies if not isinstance(body, Definition)
+        ]
+
+    def _evaluate(self, expr: Relation, memo: dict[int, tuple[Relation, object]]):
+        # Post-order over an explicit stack, so deep expressions and long chains of definitions evaluate without recursing. A node is pushed with its operands once it misses the caches, and its value is computed from theirs when it comes back to the top.
+        # Keeping each node in the memo keeps its id from being reused during this evaluation
+        stack = [(expr, None)]
+        while stack:
+            node, operands = stack.pop()
+            if id(node) in memo:
+                continue
+            if operands is None:
+                value = self._cached(node)
+                if value is None:
+                    operands = self._operands(node)
+                    stack.append((node, operands))
+                    stack.extend((operand, None) for operand in reversed(operands))
+                    continue
+            else:
+                value = self._apply(
+                    node, [memo[id(operand)][1] for operand in operands]
+                )
+                self._store(node, value)
+            memo[id(node)] = (node, value)
+        return memo[id(expr)][1]
+
+    def _cached(self, expr: Relation):
+        """The value of expr if it is known without evaluating its operands, otherwise None."""
+        if isinstance(expr, AtomicRelation):
+            return self._atomic_value(expr)
+        if isinstance(expr, StructuralRelation):
+            return structural_value(expr, self.set_size, self.names)
+        if isinstance(expr, DefinedRelation):
+            return self._defined.get(expr.name)
+        return None
+
+    def _store(self, expr: Relation, value):
+        """Called with each value computed from the values of operands."""
+        if isinstance(expr, DefinedRelation):
+            self._defined[expr.name] = value
+
+    def _operands(self, expr: Relation) -> tuple:
+        if isinstance(expr, DefinedRelation):
+            # The body, evaluated once for all uses of the name
+            if expr.name not in self.names.rel_definitions:
+                raise ValueError(f"Undefined relation: {expr.name}")
+            body = self.names.get_rel(expr.name)
+            return (body if self.chains is None else self.chains.optimize(body),)
+        if isinstance(expr, (ComposedRelation, ProductRelation, CoproductRelation)):
+            return (expr.left, expr.right)
+        if isinstance(expr, (ConverseRelation, ComplementRelation, ClosureRelation)):
+            return (expr.expr,)
+        raise TypeError(f"Cannot evaluate {type(expr).__name__}")
+
+    def _apply(self, expr: Relation, operands: list):
+        # The value of expr from the values of its operands
+        backend = self.backend
+        if isinstance(expr, DefinedRelation):
+            return operands[0]
+        if isinstance(expr, ComposedRelation):
+            left, right = operands
+            if isinstance(left, Complemented) or isinstance(right, Complemented):
+                return compose_complemented(backend, left, right)
+            if isinstance(left, ImplicitRelation) or isinstance(
+                right, ImplicitRelation
+            ):
+                return compose(backend, left, right)
+            return backend.compose(left, right)
+        if isinstance(expr, ConverseRelation):
+            return converse(backend, operands[0])
+        if isinstance(expr, ComplementRelation):
+            return complement(backend, operands[0])
+        if isinstance(expr, ClosureRelation):
+            return closure(backend, operands[0])
+        left, right = (self._materialize(operand) for operand in operands)
+        if isinstance(expr, ProductRelation):
+            return backend.product(left, right)
+        return backend.coproduct(left, right)
+
+    def _atomic_value(self, expr: AtomicRelation):
+        value = self._atomic.get(expr.rel_name)
+        if value is None:
+            if expr.rel_name not in self.relations:
+                raise ValueError(f"No matrix for relation {expr.rel_name}")
+            value = self.backend.atomic(self.relations[expr.rel_name])
+            self._atomic[expr.rel_name] = value
+        expected = (
+            self.set_size(expr.dom_cod.domain),
+            self.set_size(expr.dom_cod.codomain),
+        )
+        if self.backend.shape(value) != expected:
+            raise ValueError(
+                f"Relation {expr.rel_name} has shape {self.backend.shape(value)}, "
+                f"but its type {expr.dom_cod.domain} -> {expr.dom_cod.codomain} needs {expected}"
+            )
+        return value
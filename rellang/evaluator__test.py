@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from rellang.bitpacked import BitPackedBackend
+from rellang.sparse import SparseBackend
+from rellang.testing import evaluate
+
+R = np.array([[1, 0, 1], [0, 1, 0]], dtype=bool)  # A (2) -> B (3)
+S = np.array([[1, 0], [0, 0], [0, 1]], dtype=bool)  # B (3) -> C (2)
+carriers = {"A": 2, "B": ["x", "y", "z"], "C": 2}
+
+
+def test_composition_is_boolean_matrix_product():
+    value = evaluate("(R : A -> B);(S : B -> C)", carriers, {"R": R, "S": S})
+    assert value.dtype == bool
+    assert value.tolist() == [[True, True], [False, False]]
+
+
+def test_product_and_coproduct_layouts():
+    relations = {"R": R, "S": S}
+    product = evaluate("(R : A -> B) * (S : B -> C)", carriers, relations)
+    assert product.shape == (6, 6)
+    # ((a, b), (b', c)) is at row a * 3 + b and column b' * 2 + c
+    assert product[1 * 3 + 2, 1 * 2 + 1] == (R[1, 1] and S[2, 1])
+    assert np.array_equal(product, np.kron(R, S))
+
+    coproduct = evaluate("(R : A -> B) + (S : B -> C)", carriers, relations)
+    assert coproduct.shape == (5, 5)
+    assert np.array_equal(coproduct[:2, :3], R)
+    assert np.array_equal(coproduct[2:, 3:], S)
+    assert not coproduct[:2, 3:].any() and not coproduct[2:, :3].any()
+
+
+def test_definitions_and_defined_sets():
+    value = evaluate(
+        "rel D := (R : A -> B);(S : B -> C)\nD * D",
+        carriers,
+        {"R": R, "S": S},
+    )
+    composed = evaluate("(R : A -> B);(S : B -> C)", carriers, {"R": R, "S": S})
+    assert np.array_equal(value, np.kron(composed, composed))
+
+    doubled = evaluate("set X := A + A\n(T : X -> B)", carriers, {"T": np.ones((4, 3))})
+    assert doubled.shape == (4, 3)
+
+    # Exported statements are evaluated like the others
+    exported = evaluate(
+        "export rel E := (R : A -> B)\nexport E;(S : B -> C)",
+        carriers,
+        {"R": R, "S": S},
+    )
+    assert np.array_equal(exported, composed)
+
+
+def test_shape_and_missing_inputs():
+    with pytest.raises(ValueError, match="has shape"):
+        evaluate("(R : B -> A)", carriers, {"R": R})
+    with pytest.raises(ValueError, match="No matrix for relation S"):
+        evaluate("(S : A -> B)", carriers, {"R": R})
+    with pytest.raises(ValueError, match="No carrier for set D"):
+        evaluate("(R : A -> D)", carriers, {"R": R})
+
+
+@pytest.mark.parametrize("backend", [None, SparseBackend(), BitPackedBackend()])
+def test_deep_expressions_do_not_recurse(backend):
+    """Chains and definition chains far past the recursion limit evaluate on every backend"""
+    shift = np.array([[0, 1, 0], [0, 0, 1], [1, 0, 0]], dtype=bool)  # A (3) -> A
+    chain = ";".join(["(T : A -> A)"] * 3001)
+    value = evaluate(chain, {"A": 3}, {"T": shift}, backend)
+    assert np.array_equal(value, np.linalg.matrix_power(shift.astype(int), 3001) > 0)
+
+    lines = ["rel D0 := T : A -> A"]
+    lines += [f"rel D{i} := D{i - 1};(T : A -> A)" for i in range(1, 3000)]
+    value = evaluate("\n".join(lines) + "\nD2999", {"A": 3}, {"T": shift}, backend)
+    assert np.array_equal(value, np.linalg.matrix_power(shift.astype(int), 3000) > 0)
@@ -0,0 +1,186 @@
+from typing import Optional
+
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    BinaryRelation,
+    DefinedRelation,
+    Definition,
+    DomCod,
+    Export,
+    Program,
+    Relation,
+    SetExpr,
+    Statement,
+    StructuralRelation,
+    UnaryRelation,
+    coproduct_set,
+    dom_cod,
+    product_set,
+)
+
+
+class Expander:
+    """
+    Replaces references to definitions with their bodies.
+
+    Each definition is expanded once and the result is reused wherever the name appears, so the expansion of a program is a DAG: a definition used many times is one shared subtree rather than a copy per use, and chains of definitions that each use the previous one several times expand in linear time and memory. Expanded set expressions (and so types) are interned as usual.
+
+    depth limits how many levels of definitions are unfolded: with depth=1 the names in an expression are replaced by their bodies as written, with depth=2 the names in those bodies are replaced too, and so on. depth=None expands completely. A type is expanded to the same depth as the relation carrying it.
+
+    The expansion is for the NamesContext as it is now, create a new Expander after adding definitions with the same names (e.g. in a new context).
+    """
+
+    def __init__(self, names: NamesContext):
+        self.names = names
+        # (definition name, depth) -> expanded body
+        self._sets: dict[tuple[str, Optional[int]], SetExpr] = {}
+        self._rels: dict[tuple[str, Optional[int]], Relation] = {}
+        # Structural nodes rebuilt for each (node id, depth), keeping the node alive so its id stays unique
+        self._nodes: dict[tuple[int, Optional[int]], tuple[object, object]] = {}
+
+    def expand(self, node, depth: Optional[int] = None):
+        """Expands a set expression, relation, dom_cod, definition, export, statement or program."""
+        if isinstance(node, SetExpr):
+            return self.expand_set(node, depth)
+        if isinstance(node, Relation):
+            return self.expand_rel(node, depth)
+        if isinstance(node, DomCod):
+            return dom_cod(
+                self.expand_set(node.domain, depth),
+                self.expand_set(node.codomain, depth),
+            )
+        if isinstance(node, Definition):
+            return Definition(
+                node.expr_type, node.name, self.expand(node.def_body, depth)
+            )
+        if isinstance(node, Export):
+            return Export(self.expand(node.expr, depth))
+        if isinstance(node, Statement):
+            return Statement(self.expand(node.expr, depth))
+        if isinstance(node, Program):
+            return Program(
+                tuple(self.expand(statement, depth) for statement in node.expr)
+            )
+        raise TypeError(f"Cannot expand {type(node).__name__}")
+
+    def expand_definition(self, name: str, depth: Optional[int] = None):
+        """The body of the set or relation definition name, expanded."""
+        if name in self.names.set_definitions:
+            return self._defined_set(name, depth)
+        if name in self.names.rel_definitions:
+            return self._defined_rel(name, depth)
+        raise ValueError(f"Undefined name: {name}")
+
+    def expand_set(self, expr: SetExpr, depth: Optional[int] = None) -> SetExpr:
+        return self._expand(expr, depth)
+
+    def expand_rel(self, expr: Relation, depth: Optional[int] = None) -> Relation:
+        return self._expand(expr, depth)
+
+    def _defined_set(self, name: str, depth: Optional[int]) -> SetExpr:
+        expanded = self._sets.get((name, depth))
+        if expanded is None:
+            if name not in self.names.set_definitions:
+                raise ValueError(f"Undefined set: {name}")
+            expanded = self._expand(self.names.get_set(name), _shallower(depth))
+            self._sets[(name, depth)] = expanded
+        return expanded
+
+    def _defined_rel(self, name: str, depth: Optional[int]) -> Relation:
+        expanded = self._rels.get((name, depth))
+        if expanded is None:
+            if name not in self.names.rel_definitions:
+                raise ValueError(f"Undefined relation: {name}")
+            expanded = self._expand(self.names.get_rel(name), _shallower(depth))
+            self._rels[(name, depth)] = expanded
+        return expanded
+
+    # Expansion walks the expression with an explicit stack rather than recursing, so deeply nested expressions and long chains of definitions expand without reaching the recursion limit. A node is looked up when it is popped and rebuilt once the expansions of its parts are on the results stack.
+
+    def _expand(self, root, depth: Optional[int]):
+        results = []
+        # (node, depth, number of parts once they are pushed)
+        stack = [(root, depth, None)]
+        while stack:
+            node, depth, count = stack.pop()
+            if count is not None:
+                parts = results[len(results) - count :]
+                del results[len(results) - count :]
+                results.append(self._rebuild(node, depth, parts))
+                continue
+            expanded = self._lookup(node, depth)
+            if expanded is not None:
+                results.append(expanded)
+                continue
+            parts = self._parts(node, depth)
+            stack.append((node, depth, len(parts)))
+            stack.extend(
+                (part, part_depth, None) for part, part_depth in reversed(parts)
+            )
+        return results[0]
+
+    def _lookup(self, node, depth: Optional[int]):
+        """The expansion of node if it needs no work or is already memoized, otherwise None."""
+        if depth == 0:
+            return node
+        if isinstance(node, SetExpr):
+            if node.operation == "atomic":
+                return node
+            if node.operation == "defined":
+                if node.name not in self.names.set_definitions:
+                    raise ValueError(f"Undefined set: {node.name}")
+                return self._sets.get((node.name, depth))
+        elif isinstance(node, DefinedRelation):
+            if node.name not in self.names.rel_definitions:
+                raise ValueError(f"Undefined relation: {node.name}")
+            return self._rels.get((node.name, depth))
+        elif not isinstance(node, Relation):
+            raise TypeError(f"Cannot expand {type(node).__name__}")
+        cached = self._nodes.get((id(node), depth))
+        return None if cached is None else cached[1]
+
+    def _parts(self, node, depth: Optional[int]) -> list:
+        """The (expression, depth) pairs whose expansions node is rebuilt from."""
+        if isinstance(node, SetExpr):
+            if node.operation == "defined":
+                return [(self.names.get_set(node.name), _shallower(depth))]
+            return [(node.left, depth), (node.right, depth)]
+        if isinstance(node, DefinedRelation):
+            return [(self.names.get_rel(node.name), _shallower(depth))]
+        if isinstance(node, (AtomicRelation, StructuralRelation)):
+            operands = []
+        elif isinstance(node, BinaryRelation):
+            operands = [node.left, node.right]
+        elif isinstance(node, UnaryRelation):
+            operands = [node.expr]
+        else:
+            raise TypeError(f"Cannot expand {type(node).__name__}")
+        operands += [node.dom_cod.domain, node.dom_cod.codomain]
+        return [(operand, depth) for operand in operands]
+
+    def _rebuild(self, node, depth: Optional[int], parts: list):
+        if isinstance(node, SetExpr):
+            if node.operation == "defined":
+                self._sets[(node.name, depth)] = parts[0]
+                return parts[0]
+            if node.operation == "product":
+                expanded = product_set(*parts)
+            else:
+                expanded = coproduct_set(*parts)
+        elif isinstance(node, DefinedRelation):
+            self._rels[(node.name, depth)] = parts[0]
+            return parts[0]
+        else:
+            *operands, domain, codomain = parts
+            if isinstance(node, AtomicRelation):
+                operands = [node.rel_name]
+            elif isinstance(node, StructuralRelation):
+                operands = [node.name]
+            expanded = type(node)(*operands, dom_cod(domain, codomain))
+        self._nodes[(id(node), depth)] = (node, expanded)
+        return expanded
+
+
+def _shallower(depth: Optional[int]) -> Optional[int]:
+    return None if depth is None else depth - 1
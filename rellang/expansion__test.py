@@ -0,0 +1,107 @@
+import pytest
+
+from rellang.expansion import Expander
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    ComposedRelation,
+    DefinedRelation,
+    atomic_set,
+    defined_set,
+    dom_cod,
+    product_set,
+)
+from rellang.parser import parse
+
+
+def parse_with_names(text: str) -> tuple:
+    names = NamesContext()
+    return parse(text, names), names
+
+
+def test_expands_chained_definitions():
+    program, names = parse_with_names(
+        "set A := B * C\nset D := A\nrel R := S : D -> A\nrel R2 := R\nR2;(T : A -> E)"
+    )
+    expanded = Expander(names).expand(program)
+    bc = product_set(atomic_set("B"), atomic_set("C"))
+    last = expanded.expr[-1].expr
+    assert last.left == AtomicRelation("S", dom_cod(bc, bc))
+    assert last.dom_cod is dom_cod(bc, atomic_set("E"))
+    assert expanded.expr[1].expr.def_body is bc
+
+
+def test_definitions_are_shared_not_copied():
+    """Each definition uses the previous one twice; the expansion stays linear"""
+    lines = ["rel D0 := F : A -> A"]
+    lines += [f"rel D{i} := D{i - 1};D{i - 1}" for i in range(1, 80)]
+    _, names = parse_with_names("\n".join(lines))
+    expander = Expander(names)
+    expanded = expander.expand_definition("D79")
+    assert expanded.left is expanded.right
+    assert expanded.left is expander.expand_definition("D78")
+
+
+def test_long_definition_chain_does_not_recurse_per_link():
+    lines = ["rel D0 := F : A -> A"]
+    lines += [f"rel D{i} := D{i - 1};(G{i} : A -> A)" for i in range(1, 3000)]
+    _, names = parse_with_names("\n".join(lines))
+    assert Expander(names).expand_definition("D2999").right.rel_name == "G2999"
+
+
+def test_deep_expressions_do_not_recurse():
+    """Nesting and depth-limited chains far past the recursion limit expand"""
+    _, names = parse_with_names("set S := A * A\nrel R := F : S -> S")
+    s = defined_set("S")
+    relation = DefinedRelation("R", dom_cod(s, s))
+    nested = s
+    for _ in range(5000):
+        relation = ComposedRelation(
+            relation, DefinedRelation("R", dom_cod(s, s)), dom_cod(s, s)
+        )
+        nested = product_set(atomic_set("B"), nested)
+    expander = Expander(names)
+    expanded = expander.expand_rel(relation)
+    aa = product_set(atomic_set("A"), atomic_set("A"))
+    assert expanded.right == AtomicRelation("F", dom_cod(aa, aa))
+    for _ in range(5000):
+        expanded = expanded.left
+    assert expanded is expander.expand_definition("R")
+    expanded = expander.expand_set(nested)
+    for _ in range(5000):
+        expanded = expanded.right
+    assert expanded is aa
+
+    lines = ["rel D0 := F : A -> A"]
+    lines += [f"rel D{i} := D{i - 1};(G{i} : A -> A)" for i in range(1, 3000)]
+    _, names = parse_with_names("\n".join(lines))
+    expanded = Expander(names).expand_definition("D2999", depth=3000)
+    for _ in range(2999):
+        expanded = expanded.left
+    assert expanded.rel_name == "F"
+
+
+def test_depth_limit():
+    program, names = parse_with_names(
+        "rel R := S : A -> B\nrel R2 := R;(T : B -> C)\nR2;(U : C -> D)"
+    )
+    expander = Expander(names)
+    statement = program.expr[-1].expr
+    assert expander.expand(statement, depth=0) is statement
+
+    one_level = expander.expand(statement, depth=1)
+    assert one_level.left.left == DefinedRelation(
+        "R", dom_cod(atomic_set("A"), atomic_set("B"))
+    )
+
+    full = expander.expand(statement)
+    assert full.left.left == AtomicRelation(
+        "S", dom_cod(atomic_set("A"), atomic_set("B"))
+    )
+    assert expander.expand(statement, depth=2) == full
+
+
+def test_undefined_name():
+    _, names = parse_with_names("rel R := S : A -> B")
+    with pytest.raises(ValueError, match="Undefined name: X"):
+        Expander(names).expand_definition("X")
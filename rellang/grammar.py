@@ -1,3 +1,5 @@
+import hashlib
+
 grammar = """
     ?start: statements
     statements: NEWLINE* terminated_statement* last_statement? -> statements_trans
@@ -9,6 +11,10 @@ grammar = """
     ?statement: rel_expr
             | set_definition
             | rel_definition
+            | export_statement
+
+    // An exported statement means the same, and is also compiled to LaTeX by rellang.latex
+    export_statement: "export" (rel_expr | set_definition | rel_definition)  -> export_trans
 
     set_definition: "set" IDENTIFIER ":=" set_expr  -> set_def_trans
     rel_definition:  "rel" IDENTIFIER ":=" rel_expr -> rel_def_trans
@@ -23,8 +29,17 @@ grammar = """
     ?rel_coproduct_level: rel_product_level
                         | rel_coproduct_level "+" rel_product_level  -> rel_coproduct_trans
 
-    ?rel_product_level: rel_atomic_level
-                    | rel_product_level "*" rel_atomic_level  -> rel_product_trans
+    ?rel_product_level: rel_complement_level
+                    | rel_product_level "*" rel_complement_level  -> rel_product_trans
+
+    // ~R^ is the complement of the converse
+    ?rel_complement_level: rel_converse_level
+                    | "~" rel_complement_level  -> rel_complement_trans
+
+    // R^+ is the transitive closure, lexed as one token, so R^ + S needs the space
+    ?rel_converse_level: rel_atomic_level
+                    | rel_converse_level "^"  -> rel_converse_trans
+                    | rel_converse_level "^+"  -> rel_closure_trans
 
     ?rel_atomic_level: rel_atomic
                     | rel_parens
@@ -33,6 +48,9 @@ grammar = """
 
     rel_atomic: IDENTIFIER ":" dom_cod   -> rel_atomic_trans
             | IDENTIFIER -> rel_defined_trans
+            | structural_name ":" dom_cod -> rel_structural_trans
+
+    !?structural_name: "Full" | "Empty" | "Copy" | "First" | "Second" | "Collapse" | "Left" | "Right"
 
     dom_cod: set_expr "->" set_expr    -> dom_cod_trans
 
@@ -58,3 +76,6 @@ grammar = """
     %ignore WS
 
 """
+
+# Identifies the grammar text, used to key cached parser tables.
+grammar_hash = hashlib.sha256(grammar.encode("utf-8")).hexdigest()
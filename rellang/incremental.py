@@ -0,0 +1,139 @@
+from typing import Optional
+
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    DefinedRelation,
+    Definition,
+    Program,
+    SetExpr,
+    Statement,
+    statement_body,
+    walk,
+)
+from rellang.parser import Lark, parse_statement, split_statements
+
+
+class CachedStatement:
+    """
+    The parsed form of one statement together with the parts of the NamesContext it was checked against.
+
+    A statement only depends on the names it mentions: whether each was a definition or a primitive when it was parsed, and the bodies of the definitions it referenced. If all of those are unchanged the parsed statement is still valid and its effect on the context can be replayed without parsing it again.
+    """
+
+    __slots__ = (
+        "statement",
+        "rel_deps",
+        "set_deps",
+        "primitive_rels",
+        "primitive_sets",
+        "definition",
+    )
+
+    def __init__(self, statement: Statement, names: NamesContext):
+        self.statement = statement
+        self.rel_deps: dict[str, object] = {}  # Defined relation name -> body
+        self.set_deps: dict[str, object] = {}  # Defined set name -> body
+        self.primitive_rels: set[str] = set()
+        self.primitive_sets: set[str] = set()
+
+        expr = statement_body(statement)
+        self.definition: Optional[Definition] = (
+            expr if isinstance(expr, Definition) else None
+        )
+        # The defined name itself is not a dependency, only the body is
+        body = expr.def_body if isinstance(expr, Definition) else expr
+        for node in walk(body):
+            if isinstance(node, AtomicRelation):
+                self.primitive_rels.add(node.rel_name)
+            elif isinstance(node, DefinedRelation):
+                self.rel_deps[node.name] = names.get_rel(node.name)
+            elif isinstance(node, SetExpr):
+                if node.operation == "atomic":
+                    self.primitive_sets.add(node.name)
+                elif node.operation == "defined":
+                    self.set_deps[node.name] = names.get_set(node.name)
+
+    def is_valid_in(self, names: NamesContext) -> bool:
+        """Would parsing the statement against names give the same result?"""
+        definition = self.definition
+        if definition is not None and definition.name in names.used_names:
+            # Parsing again raises the "already defined" error
+            return False
+        # A replayed definition keeps its body object, so the identity check settles most dependencies
+        for name, body in self.rel_deps.items():
+            current = names.rel_definitions.get(name)
+            if current is not body and current != body:
+                return False
+        for name, body in self.set_deps.items():
+            current = names.set_definitions.get(name)
+            if current is not body and current != body:
+                return False
+        # Set operations on the key views run in C, looking up the smaller side
+        return names.rel_definitions.keys().isdisjoint(
+            self.primitive_rels
+        ) and names.set_definitions.keys().isdisjoint(self.primitive_sets)
+
+    def replay(self, names: NamesContext):
+        """Applies the statement's effect on the context, as parsing it would."""
+        names.used_names.update(self.primitive_rels, self.primitive_sets)
+        definition = self.definition
+        if definition is None:
+            return
+        if definition.expr_type == "set":
+            names.define_set(definition.name, definition.def_body)
+        else:
+            names.define_rel(definition.name, definition.def_body)
+
+
+class IncrementalParser:
+    """
+    Parses successive versions of a program, reusing the results for unchanged statements.
+
+    Results are cached per statement text. On each call a statement is parsed again only if its text is new or a name it depends on changed meaning (see CachedStatement), so editing one line re-checks that line plus the statements that use a definition whose body changed.
+    """
+
+    def __init__(self, parser: Optional[Lark] = None):
+        self.parser = parser
+        self.names = NamesContext()  # Context after the last successful parse
+        self._cache: dict[str, CachedStatement] = {}
+        self.reused = 0  # Statements taken from the cache by the last call
+        self.reparsed = 0  # Statements parsed by the last call
+
+    def parse(
+        self, text: str, errors: Optional[list[tuple[int, Exception]]] = None
+    ) -> Program:
+        """
+        Parses text, raising the first error as parse() does.
+
+        With an errors list, a statement that fails to parse or type check is appended to it as (line_index, exception) and left out of the result, and the statements after it are still checked against the definitions that did succeed. This is how an editor gets every error of a document at once.
+        """
+        names = NamesContext()
+        entries: dict[str, CachedStatement] = {}
+        statements = []
+        self.reused = self.reparsed = 0
+        for index, line in split_statements(text):
+            entry = entries.get(line) or self._cache.get(line)
+            if entry is not None and entry.is_valid_in(names):
+                entry.replay(names)
+                self.reused += 1
+            else:
+                self.reparsed += 1
+                try:
+                    entry = CachedStatement(
+                        parse_statement(line, names, self.parser), names
+                    )
+                except Exception as e:
+                    if errors is None:
+                        # Keep what was parsed so far for the next attempt
+                        self._cache.update(entries)
+                        raise
+                    errors.append((index, e))
+                    continue
+            entries[line] = entry
+            statements.append(entry.statement)
+
+        # Only statements of the current version stay cached
+        self._cache = entries
+        self.names = names
+        return Program(tuple(statements))
@@ -0,0 +1,60 @@
+import pytest
+
+from rellang.incremental import IncrementalParser
+from rellang.parser import parse
+
+PROGRAM = """
+set X := A * B
+rel R := S: X -> C
+rel T := R;(U: C -> D)
+(V: E -> F)
+T: X -> D
+"""
+
+
+def test_matches_full_parse():
+    """The incremental result is the same AST that parse() gives"""
+    parser = IncrementalParser()
+    assert parser.parse(PROGRAM) == parse(PROGRAM)
+    assert parser.reparsed == 5
+
+
+def test_unchanged_program_is_reused():
+    parser = IncrementalParser()
+    parser.parse(PROGRAM)
+    assert parser.parse(PROGRAM) == parse(PROGRAM)
+    assert parser.reused == 5
+    assert parser.reparsed == 0
+
+
+def test_edit_reparses_dependents_only():
+    """Changing a definition body re-checks the statements that use it"""
+    parser = IncrementalParser()
+    parser.parse(PROGRAM)
+
+    edited = PROGRAM.replace("rel R := S: X -> C", "rel R := S2: X -> C")
+    assert parser.parse(edited) == parse(edited)
+    # R itself and T which uses R. T's body comes out unchanged, so the last line which uses T is reused.
+    assert parser.reparsed == 2
+    assert parser.reused == 3
+
+
+def test_primitive_becoming_defined():
+    """A statement is re-checked when a name it used as primitive gets defined earlier"""
+    parser = IncrementalParser()
+    parser.parse("R: A -> B")
+    program = "rel R := S: A -> B\nR: A -> B"
+    result = parser.parse(program)
+    assert result == parse(program)
+    assert result["expr"][1]["expr"]["operation"] == "defined"
+
+
+def test_errors_match_full_parse():
+    parser = IncrementalParser()
+    parser.parse(PROGRAM)
+    with pytest.raises(ValueError, match="Type mismatch in composition"):
+        parser.parse(PROGRAM.replace("U: C -> D", "U: Q -> D"))
+    with pytest.raises(ValueError, match="already defined"):
+        parser.parse(PROGRAM + "rel V := S: X -> C\n")
+    # The parser recovers once the error is fixed
+    assert parser.parse(PROGRAM) == parse(PROGRAM)
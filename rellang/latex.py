@@ -0,0 +1,307 @@
+from collections import Counter
+from collections.abc import Iterable
+from typing import Optional, TextIO
+
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    BinaryRelation,
+    ClosureRelation,
+    ComplementRelation,
+    ConverseRelation,
+    DefinedRelation,
+    Definition,
+    DomCod,
+    Export,
+    Relation,
+    SetExpr,
+    Statement,
+    StructuralRelation,
+    UnaryRelation,
+    statement_body,
+    walk,
+)
+
+_relation_symbols = {
+    "composition": r" \mathbin{;} ",
+    "coproduct": " + ",
+    "product": r" \times ",
+}
+# Binding strength of each kind of relation expression. Binary operators are left associative, as in the grammar
+_relation_levels = {"composition": 1, "coproduct": 2, "product": 3}
+_postfix_level = 4
+_atom_level = 5
+_postfix_symbols = {"converse": r"^{\smile}", "closure": "^{+}"}
+
+
+def identifier(name: str) -> str:
+    """A name in math mode: single letters as they are, longer names in \\mathit so they are set as one word."""
+    escaped = name.replace("_", r"\_")
+    return escaped if len(name) == 1 else rf"\mathit{{{escaped}}}"
+
+
+class LatexRenderer:
+    """
+    Renders statements as lines of a LaTeX align* environment.
+
+    A relation statement becomes its expression followed by its type, R \\mathbin{;} S \\colon A \\to C, and a definition becomes name := body. Defined relations and sets are written by name. Structural relations carry their type as a subscript, converses and closures are superscripts and complements are overlines, and parentheses are only added where the grammar's precedence needs them.
+
+    Rendering is linear in the size of a statement: pieces are appended to one list rather than concatenated at every level. A subtree that occurs more than once in a statement (the same object or a structurally equal one) is rendered once and its fragment reused, and set expressions, which are interned, are rendered once per renderer.
+    """
+
+    def __init__(self, names: Optional[NamesContext] = None):
+        self.names = names if names is not None else NamesContext()
+        self._sets: dict[SetExpr, str] = {}
+
+    def set_expr(self, expr: SetExpr) -> str:
+        # Post-order over an explicit stack, so deeply nested sets render without recursing
+        stack = [expr]
+        while stack:
+            node = stack[-1]
+            if node in self._sets:
+                stack.pop()
+                continue
+            if node.operation in ("atomic", "defined"):
+                self._sets[node] = identifier(node.name)
+                stack.pop()
+                continue
+            pending = [
+                part for part in (node.right, node.left) if part not in self._sets
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            left, right = self._sets[node.left], self._sets[node.right]
+            # \times binds tighter than +, and both are left associative
+            if node.operation == "product" and node.left.operation == "coproduct":
+                left = rf"\left({left}\right)"
+            if node.right.operation in ("product", "coproduct") and (
+                node.operation == "product" or node.right.operation == "coproduct"
+            ):
+                right = rf"\left({right}\right)"
+            symbol = r" \times " if node.operation == "product" else " + "
+            self._sets[node] = left + symbol + right
+        return self._sets[expr]
+
+    def dom_cod(self, expr: DomCod) -> str:
+        return rf"{self.set_expr(expr.domain)} \to {self.set_expr(expr.codomain)}"
+
+    def relation(self, expr: Relation) -> str:
+        pieces: list[str] = []
+        self._write_relation(expr, pieces)
+        return "".join(pieces)
+
+    def statement(self, statement: Statement | Relation | Definition | Export) -> str:
+        """The align* line of a statement, without the line break."""
+        if isinstance(statement, Statement):
+            statement = statement_body(statement)
+        elif isinstance(statement, Export):
+            statement = statement.expr
+        pieces: list[str] = []
+        if isinstance(statement, Definition):
+            pieces.append(identifier(statement.name) + " &:= ")
+            if statement.expr_type == "set":
+                pieces.append(self.set_expr(statement.def_body))
+                return "".join(pieces)
+            statement = statement.def_body
+        else:
+            pieces.append("& ")
+        self._write_relation(statement, pieces)
+        pieces.append(r" \colon " + self.dom_cod(statement.dom_cod))
+        return "".join(pieces)
+
+    def _write_relation(self, expr: Relation, pieces: list[str]):
+        keys: dict[int, tuple[Relation, int]] = {}
+        counts: Counter[int] = Counter()
+        self._count(expr, keys, {}, counts)
+        self._write(expr, pieces, keys, counts)
+
+    # Both passes over a statement use explicit stacks rather than recursion, so deeply nested expressions render
+
+    def _count(self, expr: Relation, keys: dict, table: dict, counts: Counter):
+        # Hash-conses the subtrees of one statement, counting the occurrences of each
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            known = keys.get(id(node))
+            if known is not None:
+                counts[known[1]] += 1
+                continue
+            if isinstance(node, AtomicRelation):
+                shape = ("atomic", node.rel_name)
+            elif isinstance(node, DefinedRelation):
+                shape = ("defined", node.name)
+            elif isinstance(node, StructuralRelation):
+                shape = ("structural", node.name, node.dom_cod)
+            elif isinstance(node, BinaryRelation):
+                if not ready:
+                    stack.extend(
+                        ((node, True), (node.right, False), (node.left, False))
+                    )
+                    continue
+                shape = (
+                    node.operation,
+                    keys[id(node.left)][1],
+                    keys[id(node.right)][1],
+                )
+            elif isinstance(node, UnaryRelation):
+                if not ready:
+                    stack.extend(((node, True), (node.expr, False)))
+                    continue
+                shape = (node.operation, keys[id(node.expr)][1])
+            else:
+                raise TypeError(f"Cannot render {type(node).__name__}")
+            key = table.setdefault(shape, len(table))
+            keys[id(node)] = (node, key)
+            counts[key] += 1
+
+    def _write(self, expr: Relation, pieces: list[str], keys, counts):
+        # The stack holds relations still to write, text to append, and the keys of repeated subtrees whose fragment is complete
+        fragments: dict[int, str] = {}
+        outputs = [pieces]
+        stack: list = [expr]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                outputs[-1].append(item)
+                continue
+            if isinstance(item, int):
+                fragment = "".join(outputs.pop())
+                fragments[item] = fragment
+                outputs[-1].append(fragment)
+                continue
+            key = keys[id(item)][1]
+            fragment = fragments.get(key)
+            if fragment is not None:
+                outputs[-1].append(fragment)
+                continue
+            if counts[key] > 1 and not isinstance(
+                item, (AtomicRelation, DefinedRelation)
+            ):
+                # Rendered into its own list, to be reused
+                outputs.append([])
+                stack.append(key)
+            stack.extend(reversed(self._write_node(item)))
+
+    def _write_node(self, expr) -> list:
+        """The text and operands expr is written as, in order."""
+        if isinstance(expr, AtomicRelation):
+            return [identifier(expr.rel_name)]
+        if isinstance(expr, DefinedRelation):
+            return [identifier(expr.name)]
+        if isinstance(expr, StructuralRelation):
+            return [rf"\mathsf{{{expr.name}}}_{{{self.dom_cod(expr.dom_cod)}}}"]
+        if isinstance(expr, ComplementRelation):
+            return [r"\overline{", expr.expr, "}"]
+        if isinstance(expr, (ConverseRelation, ClosureRelation)):
+            if _level(expr.expr) == _postfix_level:
+                # A second superscript needs the first one in a group
+                operand = ["{", expr.expr, "}"]
+            else:
+                operand = _write_operand(expr.expr, _atom_level)
+            return operand + [_postfix_symbols[expr.operation]]
+        level = _relation_levels[expr.operation]
+        return (
+            _write_operand(expr.left, level)
+            + [_relation_symbols[expr.operation]]
+            + _write_operand(expr.right, level + 1)
+        )
+
+
+def _write_operand(expr: Relation, level: int) -> list:
+    if _level(expr) < level:
+        return [r"\left(", expr, r"\right)"]
+    return [expr]
+
+
+def _level(expr: Relation) -> int:
+    if isinstance(expr, BinaryRelation):
+        return _relation_levels[expr.operation]
+    if isinstance(expr, (ConverseRelation, ClosureRelation)):
+        return _postfix_level
+    return _atom_level
+
+
+def export_latex(
+    statements: Iterable[Statement],
+    stream: TextIO,
+    names: Optional[NamesContext] = None,
+    exported_only: bool = True,
+) -> int:
+    """
+    Writes the exported statements (every statement when exported_only is false) to stream as one align* environment, returning the number of lines written.
+
+    A line is written as soon as its statement arrives, so statements can come from rellang.parser.iter_statements or iter_file_statements and a large program is exported in a single pass holding one statement at a time. Each definition a line refers to, directly or through other definitions or through the sets in its types, is written once before its first use, looked up in names (the context the statements were parsed with).
+    """
+    renderer = LatexRenderer(names)
+    written: set[tuple[str, str]] = (
+        set()
+    )  # Definitions already written, as (kind, name)
+    lines = 0
+
+    def write_line(line: str):
+        nonlocal lines
+        stream.write("\\begin{align*}\n" if not lines else " \\\\\n")
+        stream.write(line)
+        lines += 1
+
+    def definitions_used(node):
+        """The definitions node refers to, as (kind, name, body), in the order walk() meets them."""
+        for child in walk(node):
+            if isinstance(child, SetExpr) and child.operation == "defined":
+                kind, name = "set", child.name
+                body = renderer.names.set_definitions.get(name)
+            elif isinstance(child, DefinedRelation):
+                kind, name = "relation", child.name
+                body = renderer.names.rel_definitions.get(name)
+            else:
+                continue
+            if body is not None:
+                yield kind, name, body
+
+    def write_definitions(node):
+        # Depth first with an explicit stack rather than recursion, so a long chain of definitions each using the one before does not hit the recursion limit.
+        # Each entry is the uses still to visit and the definition to write once they are done.
+        stack = [(definitions_used(node), None)]
+        while stack:
+            uses, definition = stack[-1]
+            for kind, name, body in uses:
+                if (kind, name) not in written:
+                    written.add((kind, name))
+                    stack.append((definitions_used(body), Definition(kind, name, body)))
+                    break
+            else:
+                stack.pop()
+                if definition is not None:
+                    write_line(renderer.statement(definition))
+
+    for statement in statements:
+        if exported_only and not isinstance(statement.expr, Export):
+            continue
+        body = statement_body(statement)
+        if isinstance(body, Definition):
+            if (body.expr_type, body.name) in written:
+                continue
+            written.add((body.expr_type, body.name))
+            write_definitions(body.def_body)
+        else:
+            write_definitions(body)
+        write_line(renderer.statement(body))
+    if lines:
+        stream.write("\n\\end{align*}\n")
+    return lines
+
+
+def compile_latex(
+    source: Iterable[str] | str,
+    stream: TextIO,
+    names: Optional[NamesContext] = None,
+    exported_only: bool = True,
+) -> int:
+    """Parses source (program text, an open file or lines) one statement at a time and exports it with export_latex."""
+    from rellang.parser import iter_statements
+
+    if names is None:
+        names = NamesContext()
+    return export_latex(iter_statements(source, names), stream, names, exported_only)
@@ -0,0 +1,140 @@
+import io
+
+import pytest
+
+from rellang.latex import LatexRenderer, compile_latex, export_latex
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+
+
+@pytest.mark.parametrize(
+    "text, latex",
+    [
+        ("(R : A -> B);(S : B -> C)", r"R \mathbin{;} S"),
+        (
+            "(R : A -> B);((S : B -> C);(T : C -> D))",
+            r"R \mathbin{;} \left(S \mathbin{;} T\right)",
+        ),
+        (
+            "(R : A -> B) * ((S : C -> D) + (T : E -> F))",
+            r"R \times \left(S + T\right)",
+        ),
+        (
+            "((R : A -> B) + (S : C -> D)) * (T : E -> F)",
+            r"\left(R + S\right) \times T",
+        ),
+        ("~(R : A -> B)^", r"\overline{R^{\smile}}"),
+        ("(~(R : A -> B))^", r"\overline{R}^{\smile}"),
+        (
+            "((R : A -> B);(S : B -> A))^+^",
+            r"{\left(R \mathbin{;} S\right)^{+}}^{\smile}",
+        ),
+        (
+            "(Second : A * (B + C) -> B + C)",
+            r"\mathsf{Second}_{A \times \left(B + C\right) \to B + C}",
+        ),
+        ("(long_name : A -> A)", r"\mathit{long\_name}"),
+    ],
+)
+def test_relations(text, latex):
+    assert LatexRenderer().relation(parse(text).expr[0].expr) == latex
+
+
+def test_export_writes_definitions_before_first_use():
+    source = """
+    set P := A * B
+    rel D := (R : P -> C);(S : C -> C)^+
+    rel unused := (R : P -> C)
+    export D^;D
+    export rel E := D;(T : C -> P)
+    D;(S : C -> C)
+    export D
+    """
+    stream = io.StringIO()
+    assert compile_latex(source, stream) == 5
+    assert stream.getvalue() == (
+        "\\begin{align*}\n"
+        "P &:= A \\times B \\\\\n"
+        "D &:= R \\mathbin{;} S^{+} \\colon P \\to C \\\\\n"
+        "& D^{\\smile} \\mathbin{;} D \\colon C \\to C \\\\\n"
+        "E &:= D \\mathbin{;} T \\colon P \\to P \\\\\n"
+        "& D \\colon P \\to C\n"
+        "\\end{align*}\n"
+    )
+    stream = io.StringIO()
+    assert compile_latex(source, stream, exported_only=False) == 7
+    assert "\\mathit{unused} &:= R \\colon P \\to C" in stream.getvalue()
+    stream = io.StringIO()
+    assert compile_latex("(R : A -> B)", stream) == 0
+    assert stream.getvalue() == ""
+
+
+def test_export_long_chain_of_definitions():
+    """Each definition uses the one before, far more links than the recursion limit"""
+    n = 2000
+    source = "rel D0 := (R : A -> A)\n" + "".join(
+        f"rel D{i} := D{i - 1};(R : A -> A)\n" for i in range(1, n)
+    )
+    stream = io.StringIO()
+    assert compile_latex(source + f"export D{n - 1}", stream) == n + 1
+    lines = stream.getvalue().splitlines()
+    assert lines[1] == "\\mathit{D0} &:= R \\colon A \\to A \\\\"
+    assert lines[n].startswith(f"\\mathit{{D{n - 1}}} &:= \\mathit{{D{n - 2}}}")
+    assert lines[n + 1] == f"& \\mathit{{D{n - 1}}} \\colon A \\to A"
+
+
+def test_repeated_subtrees_are_rendered_once():
+    calls = []
+
+    class Counting(LatexRenderer):
+        def _write_node(self, expr, *args):
+            calls.append(expr)
+            return super()._write_node(expr, *args)
+
+    chain = "(R : A -> A);(S : A -> A)^+"
+    text = ";".join(f"(({chain}) * ({chain}))" for _ in range(4))
+    expr = parse(text).expr[0].expr
+    latex = Counting().relation(expr)
+    part = r"\left(R \mathbin{;} S^{+}\right) \times \left(R \mathbin{;} S^{+}\right)"
+    assert latex == r" \mathbin{;} ".join([part] * 4)
+    # The three compositions of the products, then one product and one chain R;S^+ (its composition, R, the closure and S)
+    assert len(calls) == 3 + 1 + 4
+
+
+def test_export_streams_statements():
+    names = NamesContext()
+    stream = io.StringIO()
+
+    def lines():
+        yield "export (R : A -> B)"
+        # The first line is written before the next statement is read
+        assert stream.getvalue() == "\\begin{align*}\n& R \\colon A \\to B"
+        yield "export (S : B -> B)^+"
+
+    from rellang.parser import iter_statements
+
+    assert export_latex(iter_statements(lines(), names), stream, names) == 2
+    assert stream.getvalue().endswith("& S^{+} \\colon B \\to B\n\\end{align*}\n")
+
+
+def test_deep_expressions_render():
+    """Nesting far past the recursion limit renders, in relations and in sets"""
+    depth = 3000
+    rel = "(R : A -> A)"
+    for _ in range(depth):
+        rel = f"(S : A -> A);({rel})^+"
+    nested_set = "A"
+    for _ in range(depth):
+        nested_set = f"(B + {nested_set})"
+    expr = parse(f"{rel}\n(T : {nested_set} -> A)").expr
+    renderer = LatexRenderer()
+    latex = renderer.relation(expr[0].expr)
+    assert latex.startswith(r"S \mathbin{;} \left(S \mathbin{;} \left(")
+    assert latex.count(r"\right)^{+}") == depth - 1
+    assert renderer.statement(expr[1]).endswith(
+        "B + "
+        + r"\left(B + " * (depth - 1)
+        + "A"
+        + r"\right)" * (depth - 1)
+        + r" \to A"
+    )
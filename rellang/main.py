@@ -1,6 +1,120 @@
+import argparse
+import sys
+from typing import TYPE_CHECKING, Optional, TextIO
+
+if TYPE_CHECKING:
+    from rellang.cache import ParseCache
+
+# Only argparse and sys are imported up front so that --help and argument errors return without loading the parser.
+# Everything else is imported where it is used.
+
+
+def _format_record(record: dict, json_lines: bool) -> str:
+    import json
+
+    if json_lines:
+        return json.dumps(record, ensure_ascii=False) + "\n"
+    lines = []
+    for error in record["errors"]:
+        location = record["path"]
+        if error["line"] is not None:
+            location += f":{error['line']}:{error['column']}"
+        lines.append(f"{location}: {error['message']}\n")
+    if "program" in record:
+        lines.append(json.dumps(record["program"], ensure_ascii=False) + "\n")
+    return "".join(lines)
+
+
+def run(
+    command: str,
+    paths: list[str],
+    json_lines: bool = False,
+    workers: int = 1,
+    out: TextIO = sys.stdout,
+    cache: Optional["ParseCache"] = None,
+) -> int:
+    """
+    Checks (command "check") or parses (command "parse") each of paths with rellang.batch.check_files and writes one result per file, in the order given. Returns the exit status: 0 when every file checked, 1 otherwise.
+
+    A file's record holds its path, ok, the number of statements that succeeded and its errors, with lines and columns counting from 1. For parse it also holds the program of the statements that succeeded, as to_dict() gives it. A program that cannot be exported, such as one nested too deeply for json, makes the file fail with an error without a line instead.
+    """
+    from rellang.batch import check_files
+
+    status = 0
+    for result in check_files(paths, workers, cache):
+        record = {
+            "path": result.path,
+            "ok": result.ok,
+            "statements": len(result.program.expr),
+            "errors": [_error_record(*error) for error in result.errors],
+        }
+        try:
+            if command == "parse":
+                record["program"] = result.program.to_dict()
+            text = _format_record(record, json_lines)
+        except (RecursionError, MemoryError) as error:
+            # json nests one call per level, so a very deep program can be checked but not printed
+            record.pop("program", None)
+            record["ok"] = False
+            record["errors"].append(
+                _error_record(None, 0, 0, f"Cannot export the program: {error}")
+            )
+            text = _format_record(record, json_lines)
+        out.write(text)
+        if not record["ok"]:
+            status = 1
+    return status
+
+
+def _error_record(index: Optional[int], start: int, end: int, message: str) -> dict:
+    if index is None:
+        return {"line": None, "column": None, "message": message}
+    return {
+        "line": index + 1,
+        "column": start + 1,
+        "end_column": end + 1,
+        "message": message,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    arg_parser = argparse.ArgumentParser(
+        prog="rellang", description="Type check and parse rellang files."
+    )
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    for name, help in (
+        ("check", "type check files, printing their errors"),
+        ("parse", "type check files and print their syntax trees"),
+    ):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("paths", nargs="+", metavar="path")
+        command.add_argument(
+            "--json",
+            action="store_true",
+            help="print one JSON object per file, with its path, ok, statements and errors (and program for parse)",
+        )
+        command.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="check files in this many processes (default 1)",
+        )
+        command.add_argument(
+            "--cache",
+            nargs="?",
+            const="",
+            metavar="DIR",
+            help="reuse ASTs of unchanged files from an on-disk cache, in DIR or the default cache directory",
+        )
+    args = arg_parser.parse_args(argv)
+    cache = None
+    if args.cache is not None:
+        from rellang.cache import ParseCache
+
+        cache = ParseCache(args.cache or None)
+    # sys.stdout as it is now, not as it was when run was defined
+    sys.exit(run(args.command, args.paths, args.json, args.workers, sys.stdout, cache))
 
-def main() -> None:
-    pass
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from rellang.main import main, run
+from rellang.parser import parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time of rellang.parser, as reported by python -X importtime, with its bytecode written.
+# It measures about 50 ms: the standalone parser's tables, nodes and the standard library modules they use.
+PARSER_IMPORT_BUDGET = 0.15
+
+GOOD = """set X := A * B
+rel R := (S: X -> C);(T: C -> C)^+
+R;(U: C -> X)
+"""
+
+BAD = """rel R := (S: A -> B)
+R;(T: C -> D)
+(R;;)
+R;(T: B -> D)
+"""
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name, text in (("good.rel", GOOD), ("bad.rel", BAD)):
+        path = tmp_path / name
+        path.write_text(text)
+        paths.append(str(path))
+    return paths
+
+
+def records(command, paths, **options):
+    out = io.StringIO()
+    status = run(command, paths, json_lines=True, out=out, **options)
+    return status, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_check_reports_every_error(files):
+    status, (good, bad) = records("check", files)
+    assert status == 1
+    assert good == {"path": files[0], "ok": True, "statements": 3, "errors": []}
+    assert not bad["ok"] and bad["statements"] == 2
+    assert [(e["line"], e["column"]) for e in bad["errors"]] == [(2, 1), (3, 4)]
+    assert bad["errors"][0]["message"].startswith("Type mismatch in composition")
+    assert bad["errors"][1]["message"].startswith("Unexpected token ';'")
+
+
+def test_text_output(files):
+    out = io.StringIO()
+    assert run("check", files[:1], out=out) == 0
+    assert out.getvalue() == ""
+    run("check", files, out=out)
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith(f"{files[1]}:2:1: Type mismatch in composition")
+
+
+def test_parse_prints_programs(files):
+    status, (good, _) = records("parse", files)
+    assert good["program"] == parse(GOOD).to_dict()
+
+
+def test_workers_keep_the_order(files):
+    assert records("check", files * 3, workers=2) == records("check", files * 3)
+
+
+def test_missing_file(tmp_path):
+    status, (record,) = records("check", [str(tmp_path / "missing.rel")])
+    assert status == 1 and record["errors"][0]["line"] is None
+
+
+def test_program_too_deep_to_print(files, tmp_path):
+    """A chain longer than json can nest is checked, and fails to parse with an error instead of stopping the run"""
+    path = tmp_path / "long.rel"
+    path.write_text(";".join(["(R : A -> A)"] * 10000) + "\n")
+    paths = [str(path), files[0]]
+    status, (long, good) = records("check", paths)
+    assert status == 0 and long["ok"] and long["statements"] == 1
+    status, (long, good) = records("parse", paths)
+    assert status == 1 and not long["ok"] and "program" not in long
+    assert long["statements"] == 1
+    assert long["errors"][0]["line"] is None
+    assert long["errors"][0]["message"].startswith("Cannot export the program")
+    assert good["program"] == parse(GOOD).to_dict()
+    out = io.StringIO()
+    assert run("parse", paths[:1], out=out) == 1
+    assert out.getvalue().startswith(f"{path}: Cannot export the program")
+
+
+def test_exit_status(files):
+    with pytest.raises(SystemExit) as exit:
+        main(["check", files[0]])
+    assert exit.value.code == 0
+    with pytest.raises(SystemExit) as exit:
+        main(["check", "--json", *files])
+    assert exit.value.code == 1
+
+
+def python(code: str, *options: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_help_does_not_load_the_parser():
+    code = """
+import sys
+from rellang.main import main
+try:
+    main(["check", "--help"])
+except SystemExit:
+    pass
+print(" ".join(sorted(name for name in sys.modules if name.startswith("rellang") or name in ("lark", "json"))))
+"""
+    assert python(code).stdout.splitlines()[-1] == "rellang rellang.main"
+
+
+def test_parser_import_time_budget():
+    python("import rellang.parser")  # Writes the bytecode
+    result = python("import rellang.parser", "-X", "importtime")
+    modules = {}
+    # Lines are "import time: self [us] | cumulative | name", after a header line
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    assert "lark" not in modules and "pprint" not in modules
+    assert modules["rellang.parser"] < PARSER_IMPORT_BUDGET * 1e6
@@ -1,8 +1,24 @@
+# Keywords of the grammar, which can't be used as names
+reserved_names = (
+    "set",
+    "rel",
+    "export",
+    "Full",
+    "Empty",
+    "Copy",
+    "First",
+    "Second",
+    "Collapse",
+    "Left",
+    "Right",
+)
+
+
 class NamesContext:
     def __init__(self):
         self.set_definitions = {}  # def_name -> set_expr
         self.rel_definitions = {}  # def_name -> rel_expr
-        self.used_names = set(["set", "rel"])  # all names (both defined and primitive)
+        self.used_names = set(reserved_names)  # all names (both defined and primitive)
 
     def define_set(self, name: str, expr: dict):
         if name in self.used_names:
@@ -26,3 +42,9 @@ class NamesContext:
 
     def get_rel(self, name: str) -> dict:
         return self.rel_definitions[name]
+
+    def unfold_set(self, expr):
+        """expr with definitions unfolded until its outermost operation is not a defined set."""
+        while expr.operation == "defined":
+            expr = self.set_definitions[expr.name]
+        return expr
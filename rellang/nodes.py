@@ -0,0 +1,472 @@
+from collections.abc import Iterator, Mapping
+from typing import Literal, Optional
+from weakref import WeakValueDictionary
+
+type SetOperation = Literal["atomic", "defined", "product", "coproduct"]
+
+# Dict keys exposed by each kind of set expression, in the order the dict AST used.
+_set_keys: dict[str, tuple[str, ...]] = {
+    "atomic": ("type", "operation", "name"),
+    "defined": ("type", "operation", "def_name"),
+    "product": ("type", "operation", "left", "right"),
+    "coproduct": ("type", "operation", "left", "right"),
+}
+
+
+class SetExpr(Mapping):
+    """
+    A set expression node.
+
+    Set expressions are interned: the constructor functions below return the existing node when a structurally equal one is alive, so two set expressions are equal exactly when they are the same object. Type checks in the transformer are therefore identity comparisons instead of walking both expressions.
+
+    A SetExpr is also a read-only Mapping with the same keys as the dict AST ({"type": "set", "operation": ..., ...}), and compares equal to that dict.
+    """
+
+    __slots__ = ("operation", "name", "left", "right", "_hash", "__weakref__")
+
+    operation: SetOperation
+    name: Optional[str]  # Set name for atomic sets, definition name for defined sets
+    left: Optional["SetExpr"]
+    right: Optional["SetExpr"]
+
+    def __init__(
+        self,
+        operation: SetOperation,
+        name: Optional[str] = None,
+        left: Optional["SetExpr"] = None,
+        right: Optional["SetExpr"] = None,
+    ):
+        object.__setattr__(self, "operation", operation)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "left", left)
+        object.__setattr__(self, "right", right)
+        # Children are interned, so hashing them is O(1) and this is computed once per node.
+        object.__setattr__(self, "_hash", hash((operation, name, left, right)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Set expressions are immutable")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, SetExpr):
+            # Interned: structurally equal set expressions are always the same object
+            return False
+        if isinstance(other, Mapping):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __reduce__(self):
+        # Re-intern on unpickling so identity comparison keeps working across processes
+        return (_intern, (self.operation, self.name, self.left, self.right))
+
+    def __getitem__(self, key: str):
+        if key not in _set_keys[self.operation]:
+            raise KeyError(key)
+        if key == "type":
+            return "set"
+        if key == "def_name":
+            return self.name
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_set_keys[self.operation])
+
+    def __len__(self) -> int:
+        return len(_set_keys[self.operation])
+
+    def to_dict(self) -> dict:
+        """Returns the expression as nested dicts, in the shape of the original AST."""
+        return _export(self)
+
+    def __str__(self) -> str:
+        if self.operation in ("atomic", "defined"):
+            return self.name
+        symbol = "*" if self.operation == "product" else "+"
+        left, right = str(self.left), str(self.right)
+        # * binds tighter than +, and both are left associative
+        if self.operation == "product" and self.left.operation == "coproduct":
+            left = f"({left})"
+        if self.right.operation in ("product", "coproduct") and (
+            self.operation == "product" or self.right.operation == "coproduct"
+        ):
+            right = f"({right})"
+        return f"{left} {symbol} {right}"
+
+    def __repr__(self) -> str:
+        return f"SetExpr({self})"
+
+
+# Live set expressions keyed by their structure. Entries disappear once nothing references the node.
+_interned: WeakValueDictionary[tuple, SetExpr] = WeakValueDictionary()
+
+
+def _intern(
+    operation: SetOperation,
+    name: Optional[str] = None,
+    left: Optional[SetExpr] = None,
+    right: Optional[SetExpr] = None,
+) -> SetExpr:
+    key = (operation, name, left, right)
+    node = _interned.get(key)
+    if node is None:
+        node = SetExpr(operation, name, left, right)
+        _interned[key] = node
+    return node
+
+
+def atomic_set(name: str) -> SetExpr:
+    return _intern("atomic", name=name)
+
+
+def defined_set(name: str) -> SetExpr:
+    return _intern("defined", name=name)
+
+
+def product_set(left: SetExpr, right: SetExpr) -> SetExpr:
+    return _intern("product", left=left, right=right)
+
+
+def coproduct_set(left: SetExpr, right: SetExpr) -> SetExpr:
+    return _intern("coproduct", left=left, right=right)
+
+
+def set_from_dict(expr: Mapping) -> SetExpr:
+    """Interns a set expression given in the dict AST shape."""
+    operation = expr["operation"]
+    if operation == "atomic":
+        return atomic_set(expr["name"])
+    if operation == "defined":
+        return defined_set(expr["def_name"])
+    left = set_from_dict(expr["left"])
+    right = set_from_dict(expr["right"])
+    return _intern(operation, left=left, right=right)
+
+
+class Node(Mapping):
+    """
+    Base class for the relation, dom_cod, definition, statement and program nodes produced by ASTTransformer.
+
+    Constant keys such as "type" and "operation" are class attributes, only the varying fields take space in each node. Like SetExpr, a node is a read-only Mapping over the keys of the dict AST, and to_dict() converts the whole subtree to plain dicts.
+    """
+
+    __slots__ = ()
+
+    type: str
+    _fields: tuple[str, ...] = ()  # Per-node attributes, in constructor order
+    _keys: tuple[str, ...] = ()  # Dict keys in the order the dict AST used
+    _infers_dom_cod = True  # Whether the node's dom_cod is inferred rather than written, which decides how to_dict() exports it
+
+    def __init__(self, *values):
+        for field, value in zip(self._fields, values, strict=True):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AST nodes are immutable")
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, field) for field in self._fields))
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, Node):
+            return type(self) is type(other) and all(
+                getattr(self, field) == getattr(other, field) for field in self._fields
+            )
+        if isinstance(other, Mapping):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(
+            (type(self),) + tuple(getattr(self, field) for field in self._fields)
+        )
+
+    def __getitem__(self, key: str):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def to_dict(self) -> dict:
+        """Returns the node as nested dicts, in the shape of the original AST."""
+        return _export(self)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{field}={getattr(self, field)!r}" for field in self._fields
+        )
+        return f"{type(self).__name__}({fields})"
+
+
+def _export(value):
+    """
+    to_dict() of a node or set expression, built with an explicit stack so that expressions nested deeper than the recursion limit export too.
+
+    As in the dict AST, a dom_cod written in the source (of an atomic or structural relation) has "type": "dom_cod", and one inferred for a compound relation has only its domain and codomain. A defined relation's dom_cod is exported like its body's.
+    """
+    root = [None]
+    # (container, key, value, whether value is an inferred dom_cod)
+    stack = [(root, 0, value, False)]
+    while stack:
+        container, key, value, inferred = stack.pop()
+        if isinstance(value, SetExpr):
+            if value.operation == "atomic":
+                exported = {"type": "set", "operation": "atomic", "name": value.name}
+            elif value.operation == "defined":
+                exported = {
+                    "type": "set",
+                    "operation": "defined",
+                    "def_name": value.name,
+                }
+            else:
+                exported = {"type": "set", "operation": value.operation}
+                exported["left"] = exported["right"] = None
+                stack.append((exported, "right", value.right, False))
+                stack.append((exported, "left", value.left, False))
+        elif isinstance(value, DomCod):
+            exported = {} if inferred else {"type": "dom_cod"}
+            exported["domain"] = exported["codomain"] = None
+            stack.append((exported, "codomain", value.codomain, False))
+            stack.append((exported, "domain", value.domain, False))
+        elif isinstance(value, Node):
+            # Keys are filled in the dict AST's order, children as they are popped
+            exported = dict.fromkeys(value._keys)
+            for item in reversed(value._keys):
+                child = getattr(value, item)
+                if isinstance(child, (Node, SetExpr, tuple)):
+                    stack.append((exported, item, child, value._infers_dom_cod))
+                else:
+                    exported[item] = child
+        elif isinstance(value, tuple):
+            exported = [None] * len(value)
+            for index in reversed(range(len(value))):
+                stack.append((exported, index, value[index], False))
+        else:
+            exported = value
+        container[key] = exported
+    return root[0]
+
+
+class DomCod(Node):
+    """Domain and codomain of a relation. Interned like SetExpr, so equal types are identical."""
+
+    __slots__ = ("domain", "codomain", "__weakref__")
+    _fields = ("domain", "codomain")
+    _keys = ("type", "domain", "codomain")
+    type = "dom_cod"
+
+    domain: SetExpr
+    codomain: SetExpr
+
+    def __init__(self, domain: SetExpr, codomain: SetExpr):
+        object.__setattr__(self, "domain", domain)
+        object.__setattr__(self, "codomain", codomain)
+
+    def __reduce__(self):
+        return (dom_cod, (self.domain, self.codomain))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DomCod):
+            return self is other
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        return hash((self.domain, self.codomain))
+
+    def __repr__(self) -> str:
+        return f"DomCod({self.domain} -> {self.codomain})"
+
+
+_interned_dom_cods: WeakValueDictionary[tuple, DomCod] = WeakValueDictionary()
+
+
+def dom_cod(domain: SetExpr, codomain: SetExpr) -> DomCod:
+    key = (domain, codomain)
+    node = _interned_dom_cods.get(key)
+    if node is None:
+        node = DomCod(domain, codomain)
+        _interned_dom_cods[key] = node
+    return node
+
+
+class Relation(Node):
+    __slots__ = ()
+    type = "relation"
+    operation: str
+    dom_cod: DomCod
+
+
+class AtomicRelation(Relation):
+    __slots__ = ("rel_name", "dom_cod")
+    _fields = ("rel_name", "dom_cod")
+    _keys = ("type", "operation", "rel_name", "dom_cod")
+    operation = "atomic"
+    _infers_dom_cod = False
+
+    rel_name: str
+
+
+class DefinedRelation(Relation):
+    """
+    Reference to a relation definition. The body is looked up in the NamesContext.
+
+    The dom_cod is the body's, and infers_dom_cod records whether the body's was inferred so that to_dict() exports it the same way. It is not part of the reference's identity: equal names are equal references.
+    """
+
+    __slots__ = ("name", "dom_cod", "_infers_dom_cod")
+    _fields = ("name", "dom_cod")
+    _keys = ("type", "operation", "name", "dom_cod")
+    operation = "defined"
+
+    name: str
+
+    def __init__(self, name: str, dom_cod: DomCod, infers_dom_cod: bool = False):
+        super().__init__(name, dom_cod)
+        object.__setattr__(self, "_infers_dom_cod", infers_dom_cod)
+
+    def __reduce__(self):
+        return (type(self), (self.name, self.dom_cod, self._infers_dom_cod))
+
+
+class StructuralRelation(Relation):
+    """
+    One of the structural relations, which relate elements by the structure of their sets alone.
+
+    Full and Empty relate every pair and no pair of any domain and codomain. Copy : X -> X * X sends x to (x, x), First : X * Y -> X and Second : X * Y -> Y project pairs, Collapse : X + X -> X merges the two copies of X, and Left : X -> X + Y and Right : Y -> X + Y inject into a coproduct.
+    """
+
+    __slots__ = ("name", "dom_cod")
+    _fields = ("name", "dom_cod")
+    _keys = ("type", "operation", "name", "dom_cod")
+    operation = "structural"
+    _infers_dom_cod = False
+
+    name: str
+
+
+class BinaryRelation(Relation):
+    __slots__ = ("left", "right", "dom_cod")
+    _fields = ("left", "right", "dom_cod")
+    _keys = ("type", "operation", "left", "right", "dom_cod")
+
+    left: Relation
+    right: Relation
+
+
+class ComposedRelation(BinaryRelation):
+    __slots__ = ()
+    operation = "composition"
+
+
+class ProductRelation(BinaryRelation):
+    __slots__ = ()
+    operation = "product"
+
+
+class CoproductRelation(BinaryRelation):
+    __slots__ = ()
+    operation = "coproduct"
+
+
+class UnaryRelation(Relation):
+    __slots__ = ("expr", "dom_cod")
+    _fields = ("expr", "dom_cod")
+    _keys = ("type", "operation", "expr", "dom_cod")
+
+    expr: Relation
+
+
+class ConverseRelation(UnaryRelation):
+    """R^, relating b to a whenever R relates a to b. Domain and codomain are swapped."""
+
+    __slots__ = ()
+    operation = "converse"
+
+
+class ComplementRelation(UnaryRelation):
+    """~R, relating exactly the pairs R does not relate, at the type of R."""
+
+    __slots__ = ()
+    operation = "complement"
+
+
+class ClosureRelation(UnaryRelation):
+    """R^+, the transitive closure of an endorelation R : A -> A, relating a to b when a chain of one or more R steps leads from a to b."""
+
+    __slots__ = ()
+    operation = "closure"
+
+
+class Definition(Node):
+    __slots__ = ("expr_type", "name", "def_body")
+    _fields = ("expr_type", "name", "def_body")
+    _keys = ("type", "expr_type", "name", "def_body")
+    type = "definition"
+
+    expr_type: Literal["set", "relation"]
+    name: str
+    def_body: SetExpr | Relation
+
+
+class Export(Node):
+    """A relation or definition marked with export, for rellang.latex. It means the same as the unmarked statement."""
+
+    __slots__ = ("expr",)
+    _fields = ("expr",)
+    _keys = ("type", "expr")
+    type = "export"
+
+    expr: Relation | Definition
+
+
+class Statement(Node):
+    __slots__ = ("expr",)
+    _fields = ("expr",)
+    _keys = ("type", "expr")
+    type = "statement"
+
+    expr: Relation | Definition | Export
+
+
+class Program(Node):
+    __slots__ = ("expr",)
+    _fields = ("expr",)
+    _keys = ("type", "expr")
+    type = "program"
+
+    expr: tuple[Statement, ...]
+
+
+def statement_body(statement: Statement) -> Relation | Definition:
+    """The relation or definition of a statement, through an export."""
+    expr = statement.expr
+    return expr.expr if isinstance(expr, Export) else expr
+
+
+def walk(node: Node | SetExpr) -> Iterator[Node | SetExpr]:
+    """Yields node and every node below it, parents before children."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, SetExpr):
+            if node.right is not None:
+                stack.append(node.right)
+                stack.append(node.left)
+            continue
+        for field in reversed(node._fields):
+            value = getattr(node, field)
+            if isinstance(value, (Node, SetExpr)):
+                stack.append(value)
+            elif isinstance(value, tuple):
+                stack.extend(reversed(value))
@@ -0,0 +1,137 @@
+import pickle
+
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    ComposedRelation,
+    Program,
+    Statement,
+    atomic_set,
+    coproduct_set,
+    defined_set,
+    dom_cod,
+    product_set,
+    set_from_dict,
+)
+from rellang.parser import parse
+
+
+def test_structurally_equal_sets_are_identical():
+    """Building the same set expression twice returns the same node"""
+    a = product_set(atomic_set("A"), coproduct_set(atomic_set("B"), atomic_set("C")))
+    b = product_set(atomic_set("A"), coproduct_set(atomic_set("B"), atomic_set("C")))
+    assert a is b
+    assert product_set(atomic_set("A"), atomic_set("B")) is not coproduct_set(
+        atomic_set("A"), atomic_set("B")
+    )
+    assert atomic_set("A") is not defined_set("A")
+
+
+def test_dict_view():
+    """Set expressions read like the dict AST and compare equal to it"""
+    expr = product_set(atomic_set("A"), defined_set("D"))
+    as_dict = {
+        "type": "set",
+        "operation": "product",
+        "left": {"type": "set", "operation": "atomic", "name": "A"},
+        "right": {"type": "set", "operation": "defined", "def_name": "D"},
+    }
+    assert expr["operation"] == "product"
+    assert expr["left"]["name"] == "A"
+    assert "name" not in expr
+    assert expr.to_dict() == as_dict
+    assert expr == as_dict
+    assert set_from_dict(as_dict) is expr
+
+
+def test_pickle_reinterns():
+    """Unpickled set expressions are the interned nodes"""
+    expr = coproduct_set(atomic_set("A"), product_set(atomic_set("B"), atomic_set("C")))
+    assert pickle.loads(pickle.dumps(expr)) is expr
+
+
+def test_str_precedence():
+    """Printing adds parentheses only where precedence needs them"""
+    a, b, c = atomic_set("A"), atomic_set("B"), atomic_set("C")
+    assert str(coproduct_set(product_set(a, b), c)) == "A * B + C"
+    assert str(product_set(coproduct_set(a, b), c)) == "(A + B) * C"
+    assert str(product_set(a, product_set(b, c))) == "A * (B * C)"
+
+
+def test_relation_nodes_export_dict_ast():
+    """to_dict() reproduces the nested dict AST"""
+    a, b, c = atomic_set("A"), atomic_set("B"), atomic_set("C")
+    r = AtomicRelation("R", dom_cod(a, b))
+    s = AtomicRelation("S", dom_cod(b, c))
+    program = Program((Statement(ComposedRelation(r, s, dom_cod(a, c))),))
+
+    exported = program.to_dict()
+    assert exported["expr"][0]["expr"]["left"] == {
+        "type": "relation",
+        "operation": "atomic",
+        "rel_name": "R",
+        "dom_cod": {
+            "type": "dom_cod",
+            "domain": {"type": "set", "operation": "atomic", "name": "A"},
+            "codomain": {"type": "set", "operation": "atomic", "name": "B"},
+        },
+    }
+    assert isinstance(exported["expr"], list)
+    assert program == exported
+    assert program["expr"][0]["expr"]["operation"] == "composition"
+
+
+def test_inferred_types_export_without_their_type_key():
+    """As in the dict AST, only a written dom_cod has "type": "dom_cod", and a defined relation's is exported like its body's"""
+    names = NamesContext()
+    program = parse(
+        "rel D := (R : A -> B);(S : B -> C)\nrel E := D\nD;(T : C -> A)", names
+    )
+    a, c = atomic_set("A").to_dict(), atomic_set("C").to_dict()
+    exported = program.to_dict()
+    assert exported["expr"][0]["expr"]["def_body"]["dom_cod"] == {
+        "domain": a,
+        "codomain": c,
+    }
+    assert exported["expr"][1]["expr"]["def_body"]["dom_cod"] == {
+        "domain": a,
+        "codomain": c,
+    }
+    composed = exported["expr"][2]["expr"]
+    assert composed["left"]["dom_cod"] == {"domain": a, "codomain": c}
+    assert composed["right"]["dom_cod"] == {
+        "type": "dom_cod",
+        "domain": c,
+        "codomain": a,
+    }
+    # Pickling keeps how a reference exports its type
+    assert pickle.loads(pickle.dumps(program)).to_dict() == exported
+
+
+def test_deep_expressions_export():
+    """to_dict() does not recurse, so nesting far past the recursion limit exports"""
+    a = atomic_set("A")
+    relation = AtomicRelation("R", dom_cod(a, a))
+    nested = a
+    for _ in range(5000):
+        relation = ComposedRelation(
+            AtomicRelation("R", dom_cod(a, a)), relation, dom_cod(a, a)
+        )
+        nested = product_set(a, nested)
+    exported = relation.to_dict()
+    for _ in range(5000):
+        exported = exported["right"]
+    assert exported["rel_name"] == "R"
+    exported = nested.to_dict()
+    for _ in range(5000):
+        exported = exported["right"]
+    assert exported == a.to_dict()
+
+
+def test_relation_nodes_are_compact_and_picklable():
+    """Nodes have no per-instance dict and survive pickling with interned types"""
+    r = AtomicRelation("R", dom_cod(atomic_set("A"), atomic_set("B")))
+    assert not hasattr(r, "__dict__")
+    copy = pickle.loads(pickle.dumps(r))
+    assert copy == r
+    assert copy.dom_cod is r.dom_cod
@@ -1,29 +1,99 @@
-from deepdiff import DeepDiff
-from pprint import pprint
-from rellang.grammar import grammar
+import os
+import re
+import time
+from collections.abc import Iterable, Iterator
+from rellang.grammar import grammar, grammar_hash
 from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    ClosureRelation,
+    ComplementRelation,
+    ComposedRelation,
+    ConverseRelation,
+    CoproductRelation,
+    DefinedRelation,
+    Definition,
+    Export,
+    ProductRelation,
+    Program,
+    Statement,
+    StructuralRelation,
+    atomic_set,
+    coproduct_set,
+    defined_set,
+    dom_cod,
+    product_set,
+    walk,
+)
+from rellang.stats import ParseStats
 
 
 def equals(a: dict, b: dict):
-    return DeepDiff(a, b) == {}
-
-
-from lark import Lark, Transformer
-
-
-class ASTTransformer(Transformer):
+    # Set expressions are interned and compare by identity, so plain equality no longer needs a deep diff.
+    return a == b
+
+
+# The generated standalone parser carries its own copy of the Lark runtime, so parsing with it needs neither the lark import nor an analysis of the grammar.
+# While it is missing or stale (generated from another grammar) everything falls back to lark. See rellang.build_standalone.
+try:
+    from rellang import standalone_parser
+
+    if standalone_parser.grammar_hash != grammar_hash:
+        standalone_parser = None
+except ImportError:
+    standalone_parser = None
+
+if standalone_parser is not None:
+    from rellang.standalone_parser import (
+        Lark,
+        Lexer,
+        LexerConf,
+        Token,
+        Transformer_NonRecursive,
+        Tree,
+        UnexpectedCharacters,
+        UnexpectedInput,
+        UnexpectedToken,
+        VisitError,
+    )
+else:
+    from lark import Lark, Token, Transformer_NonRecursive, Tree
+    from lark.common import LexerConf
+    from lark.exceptions import (
+        UnexpectedCharacters,
+        UnexpectedInput,
+        UnexpectedToken,
+        VisitError,
+    )
+    from lark.lexer import Lexer
+
+# The type forms structural relations accept, for error messages
+_structural_types = {
+    "Copy": "X -> X * X",
+    "First": "X * Y -> X",
+    "Second": "X * Y -> Y",
+    "Collapse": "X + X -> X",
+    "Left": "X -> X + Y",
+    "Right": "Y -> X + Y",
+}
+
+
+class ASTTransformer(Transformer_NonRecursive):
+    # Transforms the tree with an explicit stack, so deeply nested expressions do not hit the recursion limit
 
     def __init__(self, names_context: NamesContext):
         super().__init__()
         self.names = names_context  # Pass in the context
 
+    def same_type(self, a, b) -> bool:
+        # Sets and dom_cods are interned, so equal types are the same object
+        return a is b
+
     def statements_trans(self, args):
-        return {
-            "type": "program",
-            "expr": [
-                {"type": "statement", "expr": arg} for arg in args if str(arg) != "\n"
-            ],
-        }
+        # NEWLINE tokens before the first statement are passed through as tokens. Both Lark runtimes' tokens are str, which nodes are not.
+        return Program(
+            tuple(Statement(arg) for arg in args if not isinstance(arg, str))
+        )
 
     def default_trans(self, args):
         return args[0]
@@ -32,23 +102,17 @@ class ASTTransformer(Transformer):
         name, expr = args
         name = str(name)
         self.names.define_set(name, expr)
-        return {
-            "type": "definition",
-            "expr_type": "set",
-            "name": name,
-            "def_body": expr,
-        }
+        return Definition("set", name, expr)
 
     def rel_def_trans(self, args):
         name, expr = args
         name = str(name)
         self.names.define_rel(name, expr)
-        return {
-            "type": "definition",
-            "expr_type": "relation",
-            "name": name,
-            "def_body": expr,
-        }
+        return Definition("relation", name, expr)
+
+    def export_trans(self, args):
+        (expr,) = args
+        return Export(expr)
 
     def rel_expr_trans(self, args):
         if len(args) == 1:
@@ -57,14 +121,11 @@ class ASTTransformer(Transformer):
 
         else:
             rel, outer_dom_cod = args
-            if (
-                # This compares the domain and codomain which is calculated bottom up from components against the domain codomain explicitly annotating the composite expression.
-                not equals(rel["dom_cod"]["domain"], outer_dom_cod["domain"])
-                or not equals(rel["dom_cod"]["codomain"], outer_dom_cod["codomain"])
-            ):
+            # This compares the domain and codomain which is calculated bottom up from components against the domain codomain explicitly annotating the composite expression. dom_cods are interned so this is an identity check.
+            if not self.same_type(rel.dom_cod, outer_dom_cod):
                 raise ValueError(
-                    f"Type mismatch: expression has type {rel['dom_cod']['domain']} -> {rel['dom_cod']['codomain']}, "
-                    f"but was declared with type {outer_dom_cod['domain']} -> {outer_dom_cod['codomain']}"
+                    f"Type mismatch: expression has type {rel.dom_cod.domain} -> {rel.dom_cod.codomain}, "
+                    f"but was declared with type {outer_dom_cod.domain} -> {outer_dom_cod.codomain}"
                 )
             # Strip the outer level which is not necessary in the AST
             return rel
@@ -75,18 +136,13 @@ class ASTTransformer(Transformer):
         if name in self.names.rel_definitions:
             expr = self.names.get_rel(name)
 
-            if not equals(dom_cod, expr["dom_cod"]):
+            if not self.same_type(dom_cod, expr.dom_cod):
                 raise ValueError(
                     "Defined Relation has an explicit type annotation which does not match the definition."
                 )
-            return self.rel_defined_trans(name)
+            return self.rel_defined_trans([name])
         self.names.use_name(name)
-        return {
-            "type": "relation",
-            "operation": "atomic",
-            "rel_name": name,
-            "dom_cod": dom_cod,
-        }
+        return AtomicRelation(name, dom_cod)
 
     def rel_defined_trans(self, args):
         name = str(args[0])
@@ -95,80 +151,96 @@ class ASTTransformer(Transformer):
         expr = self.names.get_rel(name)
 
         # In the AST we store the dom_cod for type checking, but we don't store the definition since we can look it up as needed from the context.
-        return {
-            "type": "relation",
-            "operation": "defined",
-            "name": name,
-            "dom_cod": expr["dom_cod"],
-        }
+        return DefinedRelation(name, expr.dom_cod, expr._infers_dom_cod)
+
+    def rel_structural_trans(self, args):
+        name, rel_dom_cod = args
+        name = str(name)
+        # The set structure is read through definitions, so First : P -> A is accepted after set P := A * B
+        domain = self.names.unfold_set(rel_dom_cod.domain)
+        codomain = self.names.unfold_set(rel_dom_cod.codomain)
+        if name == "Copy":
+            valid = codomain.operation == "product" and (
+                self.same_type(codomain.left, rel_dom_cod.domain)
+                and self.same_type(codomain.right, rel_dom_cod.domain)
+            )
+        elif name in ("First", "Second"):
+            valid = domain.operation == "product" and self.same_type(
+                domain.left if name == "First" else domain.right, rel_dom_cod.codomain
+            )
+        elif name == "Collapse":
+            valid = domain.operation == "coproduct" and (
+                self.same_type(domain.left, rel_dom_cod.codomain)
+                and self.same_type(domain.right, rel_dom_cod.codomain)
+            )
+        elif name in ("Left", "Right"):
+            valid = codomain.operation == "coproduct" and self.same_type(
+                codomain.left if name == "Left" else codomain.right,
+                rel_dom_cod.domain,
+            )
+        else:
+            # Full and Empty exist at every type
+            valid = True
+        if not valid:
+            raise ValueError(
+                f"Type mismatch: {name} cannot have type {rel_dom_cod.domain} -> {rel_dom_cod.codomain}, "
+                f"it needs a type of the form {_structural_types[name]}"
+            )
+        return StructuralRelation(name, rel_dom_cod)
 
     def rel_composed_trans(self, args):
         left, right = args
         # Checks the required invariant for R;S that the codomain of R equals the domain of S.
-        if not equals(left["dom_cod"]["codomain"], right["dom_cod"]["domain"]):
+        if not self.same_type(left.dom_cod.codomain, right.dom_cod.domain):
             raise ValueError(
-                f"Type mismatch in composition: {left['dom_cod']['codomain']} ≠ {right['dom_cod']['domain']}"
+                f"Type mismatch in composition: {left.dom_cod.codomain} ≠ {right.dom_cod.domain}"
             )
-        return {
-            "type": "relation",
-            "operation": "composition",
-            "left": left,
-            "right": right,
-            "dom_cod": {
-                "domain": left["dom_cod"]["domain"],
-                "codomain": right["dom_cod"]["codomain"],
-            },
-        }
+        return ComposedRelation(
+            left, right, dom_cod(left.dom_cod.domain, right.dom_cod.codomain)
+        )
 
     def rel_coproduct_trans(self, args):
         left, right = args
-        return {
-            "type": "relation",
-            "operation": "coproduct",
-            "left": left,
-            "right": right,
-            "dom_cod": {
-                "domain": {
-                    "type": "set",
-                    "operation": "coproduct",
-                    "left": left["dom_cod"]["domain"],
-                    "right": right["dom_cod"]["domain"],
-                },
-                "codomain": {
-                    "type": "set",
-                    "operation": "coproduct",
-                    "left": left["dom_cod"]["codomain"],
-                    "right": right["dom_cod"]["codomain"],
-                },
-            },
-        }
+        return CoproductRelation(
+            left,
+            right,
+            dom_cod(
+                coproduct_set(left.dom_cod.domain, right.dom_cod.domain),
+                coproduct_set(left.dom_cod.codomain, right.dom_cod.codomain),
+            ),
+        )
 
     def rel_product_trans(self, args):
         left, right = args
-        return {
-            "type": "relation",
-            "operation": "product",
-            "left": left,
-            "right": right,
-            "dom_cod": {
-                "domain": {
-                    "type": "set",
-                    "operation": "product",
-                    "left": left["dom_cod"]["domain"],
-                    "right": right["dom_cod"]["domain"],
-                },
-                "codomain": {
-                    "type": "set",
-                    "operation": "product",
-                    "left": left["dom_cod"]["codomain"],
-                    "right": right["dom_cod"]["codomain"],
-                },
-            },
-        }
+        return ProductRelation(
+            left,
+            right,
+            dom_cod(
+                product_set(left.dom_cod.domain, right.dom_cod.domain),
+                product_set(left.dom_cod.codomain, right.dom_cod.codomain),
+            ),
+        )
+
+    def rel_converse_trans(self, args):
+        (rel,) = args
+        return ConverseRelation(rel, dom_cod(rel.dom_cod.codomain, rel.dom_cod.domain))
+
+    def rel_complement_trans(self, args):
+        (rel,) = args
+        return ComplementRelation(rel, rel.dom_cod)
+
+    def rel_closure_trans(self, args):
+        (rel,) = args
+        # The closure composes R with itself, so R must be an endorelation
+        if not self.same_type(rel.dom_cod.domain, rel.dom_cod.codomain):
+            raise ValueError(
+                f"Type mismatch in closure: {rel.dom_cod.domain} ≠ {rel.dom_cod.codomain}"
+            )
+        return ClosureRelation(rel, rel.dom_cod)
 
     def dom_cod_trans(self, args):
         domain, codomain = args
-        return {"type": "dom_cod", "domain": domain, "codomain": codomain}
+        return dom_cod(domain, codomain)
 
     def set_expr_trans(self, args):
         return args[0]
@@ -176,46 +248,298 @@ class ASTTransformer(Transformer):
     def set_atomic_trans(self, args):
         name = str(args[0])
         if name in self.names.set_definitions:
-            return {
-                "type": "set",
-                "operation": "defined",
-                "def_name": name,
-            }
+            return defined_set(name)
         else:
             # In futuer I might want to prevent primitive set names from overlappign with primitive relation names. But for now I won't rule it out.
             self.names.use_name(name)
-            return {"type": "set", "operation": "atomic", "name": str(args[0])}
+            return atomic_set(name)
 
     def set_coproduct_trans(self, args):
         left, right = args
-        return {"type": "set", "operation": "coproduct", "left": left, "right": right}
+        return coproduct_set(left, right)
 
     def set_product_trans(self, args):
         left, right = args
-        return {"type": "set", "operation": "product", "left": left, "right": right}
+        return product_set(left, right)
+
+
+class _InstrumentedTransformer(ASTTransformer):
+    """ASTTransformer that records rule and type check timings in a ParseStats."""
+
+    def __init__(self, names_context: NamesContext, stats: ParseStats):
+        super().__init__(names_context)
+        self.stats = stats
+
+    def _call_userfunc(self, tree, new_children=None):
+        start = time.perf_counter()
+        try:
+            return super()._call_userfunc(tree, new_children)
+        finally:
+            self.stats.record_rule(tree.data, time.perf_counter() - start)
+
+    def same_type(self, a, b) -> bool:
+        start = time.perf_counter()
+        result = a is b
+        self.stats.type_check_time += time.perf_counter() - start
+        self.stats.type_checks += 1
+        return result
+
+
+def default_cache_path() -> str:
+    """Path of the on-disk parser cache for the current grammar."""
+    # Imported here, it is only needed for the cache and costs several milliseconds of start up
+    import tempfile
+
+    return os.path.join(
+        tempfile.gettempdir(), f"rellang-parser-{grammar_hash[:16]}.lark"
+    )
+
+
+def build_parser(cache: bool | str = False, scanner: bool = False) -> Lark:
+    """
+    Builds the LALR parser for the rellang grammar.
+
+    The parser produces a parse tree and has no transformer attached, so a single instance can be shared by every call to parse(). When cache is True the analysed grammar is saved to (and later loaded from) default_cache_path(), or to the given path when cache is a string. Lark checks the stored grammar hash on load and rebuilds stale cache files.
+
+    With scanner=True tokens come from rellang's own Scanner instead of Lark's lexer.
+
+    This always analyses the grammar with lark. Its trees are built from the same Tree class as the standalone parser's, so ASTTransformer handles both.
+    """
+    # Imported here, with an up to date standalone parser lark is only needed to build parsers from the grammar
+    import lark
 
+    if cache is True:
+        cache = default_cache_path()
+    if scanner:
+        from rellang.scanner.lark_lexer import ScannerLexer
 
-def parse(text):
-    parser = Lark(grammar, parser="lalr", transformer=ASTTransformer(NamesContext()))
-    return parser.parse(text)
+        # With the standalone parser ScannerLexer derives from its Lexer, and lark only accepts subclasses of its own
+        lark.lexer.Lexer.register(ScannerLexer)
+        return lark.Lark(
+            grammar, parser="lalr", lexer=ScannerLexer, cache=cache, tree_class=Tree
+        )
+    return lark.Lark(grammar, parser="lalr", cache=cache, tree_class=Tree)
+
+
+_parser: Lark | None = None
+
+
+def get_parser() -> Lark:
+    """Returns the process-wide parser, creating it on first use: loaded from the standalone parser's tables when they match the grammar, otherwise built with build_parser()."""
+    global _parser
+    if _parser is None:
+        if standalone_parser is not None:
+            _parser = standalone_parser.Lark_StandAlone()
+        else:
+            _parser = build_parser()
+    return _parser
+
+
+def transform(
+    tree, names_context: NamesContext | None = None, stats: ParseStats | None = None
+):
+    """Runs ASTTransformer over a parse tree, raising type errors unwrapped. With stats, rule and type check timings are recorded in it."""
+    if names_context is None:
+        names_context = NamesContext()
+    if stats is None:
+        transformer = ASTTransformer(names_context)
+    else:
+        transformer = _InstrumentedTransformer(names_context, stats)
+    try:
+        return transformer.transform(tree)
+    except VisitError as e:
+        # Lark wraps exceptions raised inside transformer rules; callers expect the original ValueError.
+        raise e.orig_exc from None
+
+
+def parse(
+    text,
+    names_context: NamesContext | None = None,
+    parser: Lark | None = None,
+    stats: ParseStats | None = None,
+):
+    """
+    Parses and type checks a program.
+
+    Passing a ParseStats opts in to instrumentation: tokens are pulled from the parser's own lexer one at a time and fed to the parser, timing each pull, so lexer and parser time can be told apart, and transformer rules, type checks and the nodes of the result are counted.
+    """
+    if parser is None:
+        parser = get_parser()
+    if stats is None:
+        return transform(parser.parse(text), names_context)
+
+    start = time.perf_counter()
+    interactive = parser.parse_interactive(text)
+    # The same lexer parser.parse() uses. Lark's is contextual, matching only the terminals the parser state accepts, so it runs interleaved with the parser.
+    tokens = interactive.lexer_thread.lex(interactive.parser_state)
+    lex_time = 0.0
+    count = 0
+    token = None
+    while True:
+        before = time.perf_counter()
+        next_token = next(tokens, None)
+        lex_time += time.perf_counter() - before
+        if next_token is None:
+            break
+        token = next_token
+        interactive.feed_token(token)
+        count += 1
+    tree = interactive.feed_eof(token)
+    parsed = time.perf_counter()
+    stats.lex_time += lex_time
+    stats.parse_time += parsed - start - lex_time
+    stats.tokens += count
+    stats.parses += 1
+    try:
+        program = transform(tree, names_context, stats)
+    finally:
+        stats.transform_time += time.perf_counter() - parsed
+    stats.node_counts.update(type(node).__name__ for node in walk(program))
+    return program
+
+
+# Matches the NEWLINE terminal of the grammar, which is the only statement separator.
+_newline_regex = re.compile(r"\r?\n|\r")
+
+
+def split_statements(text: str) -> list[tuple[int, str]]:
+    """
+    Splits a program into its statements.
+
+    Every statement occupies exactly one line, so this returns (line_index, statement_text) for each line that is not blank.
+    """
+    return [
+        (index, line)
+        for index, line in enumerate(_newline_regex.split(text))
+        if line.strip()
+    ]
+
+
+def parse_statement(
+    text: str, names_context: NamesContext, parser: Lark | None = None
+) -> Statement:
+    """Parses a single statement, recording any definition in names_context."""
+    program = parse(text, names_context, parser)
+    if len(program.expr) != 1:
+        raise ValueError(f"Expected a single statement, got {len(program.expr)}")
+    return program.expr[0]
+
+
+def describe_error(line: str, error: Exception) -> tuple[int, int, str]:
+    """
+    Locates an error raised by parsing the statement line, returning (start, end, message) with start and end indices into line.
+
+    Syntax errors point at the unexpected token or character. Type errors are raised for a statement as a whole, so they span all of it.
+    """
+    if isinstance(error, UnexpectedInput):
+        start = max(min(error.column - 1, len(line)), 0) if error.column > 0 else 0
+        end = start + 1
+        if isinstance(error, UnexpectedToken):
+            if error.token.type == "$END":
+                message = "Unexpected end of statement"
+                start = end = len(line.rstrip())
+            else:
+                message = f"Unexpected token '{error.token}'"
+                end = start + len(error.token)
+            if error.expected:
+                message += f", expected one of {', '.join(sorted(error.expected))}"
+        elif isinstance(error, UnexpectedCharacters):
+            message = f"Unexpected character '{error.char}'"
+        else:
+            message = str(error).splitlines()[0]
+        end = min(end, len(line))
+    else:
+        # Type errors are raised for a whole statement
+        start = len(line) - len(line.lstrip())
+        end = len(line.rstrip())
+        message = str(error)
+    return start, end, message
+
+
+def iter_file_statements(
+    path: str,
+    names_context: NamesContext | None = None,
+    parser: Lark | None = None,
+) -> Iterator[Statement]:
+    """
+    Parses a file one statement at a time, scanning it through a memory map.
+
+    The file is never read into a Python string: tokens are offsets into the mapped bytes and only identifiers are decoded. Each statement's tokens are fed to the LALR parser as soon as its line ends, so memory holds one statement plus the NamesContext, while the mapped pages are backed by the file itself.
+    """
+    from rellang.scanner.lark_lexer import ScannerLexer
+    from rellang.scanner.scanner import Scanner
+
+    if names_context is None:
+        names_context = NamesContext()
+    if parser is None:
+        parser = get_parser()
+    lexer = ScannerLexer(parser.lexer_conf)
+    with Scanner.open(path) as scanner:
+        tokens = []
+        for token in lexer.lark_tokens(scanner):
+            if token.type != "NEWLINE":
+                tokens.append(token)
+            elif tokens:
+                yield _parse_tokens(tokens, names_context, parser)
+                tokens = []
+        if tokens:
+            yield _parse_tokens(tokens, names_context, parser)
+
+
+def _parse_tokens(tokens: list, names_context: NamesContext, parser: Lark) -> Statement:
+    interactive = parser.parse_interactive("")
+    for token in tokens:
+        interactive.feed_token(token)
+    program = transform(interactive.feed_eof(tokens[-1]), names_context)
+    return program.expr[0]
+
+
+def parse_file(
+    path: str, names_context: NamesContext | None = None, parser: Lark | None = None
+) -> Program:
+    """Parses a file like parse(), scanning it through a memory map (see iter_file_statements)."""
+    return Program(tuple(iter_file_statements(path, names_context, parser)))
+
+
+def iter_statements(
+    source: Iterable[str],
+    names_context: NamesContext | None = None,
+    parser: Lark | None = None,
+) -> Iterator[Statement]:
+    """
+    Parses a program one statement at a time.
+
+    source is an open text file or any iterable of lines (a str is treated as a whole program). Each statement is yielded as soon as its line has been read and type checked, so only the current line and the NamesContext are held in memory.
+    """
+    if names_context is None:
+        names_context = NamesContext()
+    if isinstance(source, str):
+        source = [source]
+    for chunk in source:
+        # A file opened with newline="" keeps "\r" inside lines, so split again on the grammar's separators
+        for line in _newline_regex.split(chunk):
+            if line.strip():
+                yield parse_statement(line, names_context, parser)
 
 
 # Tests
 if __name__ == "__main__":
+    from pprint import pprint
+
     # Test 1: Basic atomic relation (must have type)
     test1 = "R : A -> B * C"
     print("Test 1 (atomic relation):")
-    pprint(parse(test1))
+    pprint(parse(test1).to_dict())
 
     # Test 2: Composite relation with inferred type
     test2 = "(R : A -> C + B);(S : C+ B -> C)"
     print("\nTest 2 (composite with inferred type):")
-    pprint(parse(test2))
+    pprint(parse(test2).to_dict())
 
     # Test 3: Composite relation with explicit type (matching)
     test3 = "(R : A -> B);(S : B -> C):A -> C"
     print("\nTest 3 (composite with matching explicit type):")
-    pprint(parse(test3))
+    pprint(parse(test3).to_dict())
 
     # Test 4: Composite relation with wrong explicit type
     test4 = "(R : A -> B);(S : B -> C):A -> D"
@@ -234,17 +558,17 @@ if __name__ == "__main__":
     # Test 6: Complex set expressions
     test6 = "(R : A * B -> C);(S : C -> D + E)"
     print("\nTest 6 (complex set expressions):")
-    pprint(parse(test6))
+    pprint(parse(test6).to_dict())
 
     # Test 7 relation product
     test7 = "(R : A -> B) * (S : C -> D)"
     print("Test 7 (relation product with inferred type):")
-    pprint(parse(test7))
+    pprint(parse(test7).to_dict())
 
     # Test 8 relation product with explicit type
     test8 = "(R : A -> B) * (S : C -> D) : A * C -> B * D"
     print("\nTest 8 (relation product with explicit type):")
-    pprint(parse(test8))
+    pprint(parse(test8).to_dict())
 
     # Test 9 relation product with wrong explicit type
     test9 = "(R : A -> B) * (S : C -> D) : A * C -> B * E"
@@ -257,13 +581,13 @@ if __name__ == "__main__":
     test10a = "((R : A -> B) * (S : C -> D));(T : B * D -> E)"
     parse10a = parse(test10a)
     print("\nTest 10a (product and composition):")
-    pprint(parse10a)
+    pprint(parse10a.to_dict())
 
     # Test 10b mixed product and composition
     test10b = "(R : A -> B) * (S : C -> D);(T : B * D -> E)"
     parse10b = parse(test10b)
     print("\nTest 10b (product and composition):")
-    pprint(parse10b)
+    pprint(parse10b.to_dict())
 
     # Test basic relation coproduct
     test11 = "(R : A -> B) + (S : C -> D)"
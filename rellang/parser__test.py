@@ -124,6 +124,83 @@ def test_relation_definition():
     assert usage["left"]["name"] == "R"
 
 
+def test_structural_relations():
+    """Test typing of the structural relations"""
+    result = parse("(R : C -> A * B);(First : A * B -> A);(Left : A -> A + D)")
+    composition = result["expr"][0]["expr"]
+    first = composition["left"]["right"]
+    assert first["operation"] == "structural"
+    assert first["name"] == "First"
+    assert composition["dom_cod"]["codomain"]["operation"] == "coproduct"
+
+    # Full and Empty have any type, and the type of the others follows their set structure through definitions
+    parse("Full : A -> B * C\nEmpty : A + B -> C")
+    parse("set P := A * A\nCopy : A -> P\nSecond : P -> A")
+    with pytest.raises(ValueError, match=r"Copy cannot have type A -> A \* B"):
+        parse("Copy : A -> A * B")
+    with pytest.raises(ValueError, match="Collapse cannot have type"):
+        parse("Collapse : A + B -> A")
+    with pytest.raises(ValueError, match="already defined"):
+        parse("rel First := R : A -> B")
+
+    # Only the exact keywords are reserved
+    assert parse("Firsts : A -> B")["expr"][0]["expr"]["operation"] == "atomic"
+
+
+def test_converse_and_complement():
+    """Test converse swaps domain and codomain and complement keeps the type"""
+    result = parse("~(R : A -> B * C)^;(S : A -> D)")
+    composition = result["expr"][0]["expr"]
+    complement = composition["left"]
+    assert complement["operation"] == "complement"
+    assert complement["expr"]["operation"] == "converse"
+    assert complement["expr"]["expr"]["rel_name"] == "R"
+    assert complement["dom_cod"]["domain"]["operation"] == "product"
+    assert complement["dom_cod"]["codomain"]["name"] == "A"
+    assert composition["dom_cod"]["codomain"]["name"] == "D"
+
+    # Postfix ^ binds tighter than prefix ~, and both tighter than *
+    assert parse("~(R : A -> B)^") == parse("~((R : A -> B)^)")
+    assert parse("(R : A -> B)^ * (S : C -> D)") == parse(
+        "((R : A -> B)^) * (S : C -> D)"
+    )
+    with pytest.raises(ValueError, match="Type mismatch in composition"):
+        parse("(R : A -> B);(R : A -> B)^^")
+
+
+def test_closure():
+    """Test closure needs an endorelation and binds like converse"""
+    result = parse("set P := A * B\n~((R : P -> P)^+)^")
+    converse = result["expr"][1]["expr"]["expr"]
+    assert converse["expr"]["operation"] == "closure"
+    assert converse["expr"]["dom_cod"]["domain"]["def_name"] == "P"
+    assert parse("~(R : A -> A)^+") == parse("~((R : A -> A)^+)")
+    assert parse("(R : A -> A)^+^") == parse("((R : A -> A)^+)^")
+    # With a space, ^ + is a converse in a coproduct
+    coproduct = parse("(R : A -> B)^ + (S : C -> C)^+")["expr"][0]["expr"]
+    assert coproduct["operation"] == "coproduct"
+    assert coproduct["left"]["operation"] == "converse"
+    assert coproduct["right"]["operation"] == "closure"
+    with pytest.raises(ValueError, match="Type mismatch in closure: A ≠ B"):
+        parse("(R : A -> B)^+")
+
+
+def test_export_statement():
+    """Test export wraps a relation or definition, which still defines its name"""
+    from relational_language_parser.names_context import NamesContext
+
+    names = NamesContext()
+    result = parse("export set P := A * B\nexport rel D := (R : P -> C)\nexport D^", names)
+    statements = [statement["expr"] for statement in result["expr"]]
+    assert [statement["type"] for statement in statements] == ["export"] * 3
+    assert statements[0]["expr"]["type"] == "definition"
+    assert statements[1]["expr"]["name"] == "D"
+    assert statements[2]["expr"]["operation"] == "converse"
+    assert "P" in names.set_definitions and "D" in names.rel_definitions
+    with pytest.raises(ValueError, match="Name export already defined"):
+        parse("rel export := (R : A -> B)")
+
+
 def test_precedence():
     """Test operator precedence with product and coproduct"""
     result = parse("(R : A -> B) * (S : C -> D) + (T : E -> F) * (U : G -> H)")
@@ -330,3 +407,92 @@ def test_multiline_program_invariance():
 
     assert result1 == result2
     assert result2 == result3
+
+
+def test_parser_is_shared_between_calls():
+    """The LALR parser is built once and reused, with fresh names per call"""
+    from relational_language_parser.parser import get_parser
+
+    assert get_parser() is get_parser()
+    # Each call gets its own NamesContext, so redefining a name is allowed
+    parse("rel R := RR: A -> B")
+    parse("rel R := RR: A -> B")
+
+
+def test_parse_with_supplied_names_context():
+    """Definitions from earlier calls are visible when the context is passed in"""
+    from relational_language_parser.names_context import NamesContext
+
+    names = NamesContext()
+    parse("rel R := RR: A -> B", names)
+    result = parse("R;S: B -> C", names)
+    assert result["expr"][0]["expr"]["left"]["operation"] == "defined"
+
+
+def test_parser_disk_cache(tmp_path):
+    """A parser loaded from the cache file behaves like a freshly built one"""
+    from relational_language_parser.parser import build_parser
+
+    cache_path = str(tmp_path / "rellang.lark")
+    build_parser(cache=cache_path)
+    cached = build_parser(cache=cache_path)
+
+    text = "(R : A -> B);(S : B -> C)"
+    assert parse(text, parser=cached) == parse(text)
+
+
+def test_iter_statements_matches_parse(tmp_path):
+    """Streaming a file yields the same statements as parsing it whole"""
+    from relational_language_parser.parser import iter_statements
+
+    program = "set X := A * B\n\nrel R := S: X -> C\nR;(T: C -> D)\n"
+    path = tmp_path / "program.rel"
+    path.write_text(program)
+
+    with open(path) as source:
+        streamed = list(iter_statements(source))
+    assert tuple(streamed) == parse(program)["expr"]
+    assert tuple(iter_statements(program)) == parse(program)["expr"]
+
+
+def test_iter_statements_is_lazy():
+    """Statements before a type error are yielded before the error is raised"""
+    from relational_language_parser.parser import iter_statements
+
+    statements = iter_statements(["R: A -> B\n", "(R: A -> B);(S: C -> D)\n"])
+    assert next(statements)["expr"]["rel_name"] == "R"
+    with pytest.raises(ValueError, match="Type mismatch in composition"):
+        next(statements)
+
+
+def test_parse_file_matches_parse(tmp_path):
+    """Parsing a file through the memory mapped scanner matches parse()"""
+    from relational_language_parser.parser import parse_file
+
+    program = "set X := A * B\n\nrel R := S: X -> C\nR;(T: C -> D)\n"
+    path = tmp_path / "program.rel"
+    path.write_text(program)
+    assert parse_file(str(path)) == parse(program)
+
+    path.write_text("R: A -> B\n(R: A -> B);(S: C -> D)\n")
+    with pytest.raises(ValueError, match="Type mismatch in composition"):
+        parse_file(str(path))
+
+
+@pytest.mark.parametrize("depth", [300, 3000])
+def test_deeply_nested_input(depth):
+    """Nesting is limited by memory, not by the recursion limit, with the shared parser and with one built by lark"""
+    from relational_language_parser.parser import build_parser
+
+    rel = "(R : A -> A)"
+    for i in range(depth):
+        rel = f"((R{i} : A -> A);{rel})"
+    nested_set = "A"
+    for i in range(depth):
+        nested_set = f"(B{i} * {nested_set})"
+    text = f"{rel}\nset X := {nested_set}\n"
+
+    for parser in (None, build_parser()):
+        result = parse(text, parser=parser)
+        assert result["expr"][0]["expr"]["operation"] == "composition"
+        assert result["expr"][0]["expr"]["left"]["rel_name"] == f"R{depth - 1}"
@@ -0,0 +1,220 @@
+from collections.abc import Mapping, Sequence
+from typing import Optional
+
+import numpy as np
+
+from rellang.evaluator import Evaluator
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    ClosureRelation,
+    ComplementRelation,
+    ComposedRelation,
+    ConverseRelation,
+    CoproductRelation,
+    DefinedRelation,
+    ProductRelation,
+    Relation,
+    SetExpr,
+    StructuralRelation,
+)
+from rellang.sparse import SparseBackend, SparseRelation, _sorted_unique
+
+
+class Query(Evaluator):
+    """
+    Images of subsets of a domain under relation expressions, without computing the relations.
+
+    image(expr, subset) propagates the subset through the expression: through compositions one relation after the other, as a vector-matrix product restricted to the rows of the current frontier, through products by splitting the frontier into its pairs and joining the images of the components, and through coproducts by splitting it between the summands. Converses are pushed down to the atomic relations, which are then read by column, structural relations are applied by index arithmetic on the frontier, and closures are searched breadth-first from it. So the work is proportional to the pairs leaving the frontier, not to the size of the relations; pairs_visited counts those pairs for the last query.
+
+    Atomic relations are kept as SparseRelation values (and their transposes, once a converse needs them), converted once on first use. Subsets and images are sorted arrays of element indices, in the element order of DenseBackend.
+    """
+
+    def __init__(
+        self,
+        carriers: Mapping[str, int | Sequence],
+        relations: Mapping[str, object],
+        names: Optional[NamesContext] = None,
+    ):
+        super().__init__(carriers, relations, names, SparseBackend())
+        self._transposed: dict[str, SparseRelation] = {}
+        self.pairs_visited = 0
+
+    def image(self, expr: Relation, subset) -> np.ndarray:
+        """
+        The elements of the codomain of expr related to some element of subset.
+
+        subset is a boolean mask over the domain or an iterable of element indices.
+        """
+        frontier = self._frontier(subset, self.set_size(expr.dom_cod.domain))
+        self.pairs_visited = 0
+        return self._image(expr, frontier, False)
+
+    def preimage(self, expr: Relation, subset) -> np.ndarray:
+        """The elements of the domain of expr related to some element of subset, a subset of the codomain."""
+        frontier = self._frontier(subset, self.set_size(expr.dom_cod.codomain))
+        self.pairs_visited = 0
+        return self._image(expr, frontier, True)
+
+    def image_mask(self, expr: Relation, subset) -> np.ndarray:
+        """image() as a boolean mask over the codomain."""
+        mask = np.zeros(self.set_size(expr.dom_cod.codomain), dtype=bool)
+        mask[self.image(expr, subset)] = True
+        return mask
+
+    @staticmethod
+    def _frontier(subset, size: int) -> np.ndarray:
+        if isinstance(subset, np.ndarray) and subset.dtype == bool:
+            if subset.shape != (size,):
+                raise ValueError(
+                    f"Subset mask has shape {subset.shape}, the set has {size} elements"
+                )
+            return np.flatnonzero(subset)
+        if not isinstance(subset, np.ndarray):
+            subset = np.fromiter(subset, dtype=np.int64)
+        frontier = _sorted_unique(subset.astype(np.int64).ravel())
+        if frontier.size and (frontier[0] < 0 or frontier[-1] >= size):
+            raise ValueError(f"Subset element outside a set of {size} elements")
+        return frontier
+
+    def _sets(self, expr: Relation, inverted: bool) -> tuple[SetExpr, SetExpr]:
+        # The sets the frontier comes from and goes to
+        if inverted:
+            return expr.dom_cod.codomain, expr.dom_cod.domain
+        return expr.dom_cod.domain, expr.dom_cod.codomain
+
+    def _image(self, expr: Relation, frontier: np.ndarray, inverted: bool):
+        if not frontier.size:
+            return frontier
+        if isinstance(expr, AtomicRelation):
+            matrix = self._atomic_value(expr)
+            if inverted:
+                matrix = self._transpose(expr.rel_name, matrix)
+            rows = matrix.gather_rows(frontier)
+            self.pairs_visited += rows.nnz
+            return _sorted_unique(rows.indices)
+        if isinstance(expr, DefinedRelation):
+            if expr.name not in self.names.rel_definitions:
+                raise ValueError(f"Undefined relation: {expr.name}")
+            return self._image(self.names.get_rel(expr.name), frontier, inverted)
+        if isinstance(expr, StructuralRelation):
+            return self._structural_image(expr, frontier, inverted)
+        if isinstance(expr, ConverseRelation):
+            return self._image(expr.expr, frontier, not inverted)
+        if isinstance(expr, ComplementRelation):
+            return self._complement_image(expr, frontier, inverted)
+        if isinstance(expr, ClosureRelation):
+            return self._closure_image(expr, frontier, inverted)
+        if isinstance(expr, ComposedRelation):
+            first, second = (
+                (expr.right, expr.left) if inverted else (expr.left, expr.right)
+            )
+            return self._image(second, self._image(first, frontier, inverted), inverted)
+        if isinstance(expr, ProductRelation):
+            return self._product_image(expr, frontier, inverted)
+        if isinstance(expr, CoproductRelation):
+            left_in, left_out = (
+                self.set_size(side) for side in self._sets(expr.left, inverted)
+            )
+            split = np.searchsorted(frontier, left_in)
+            left = self._image(expr.left, frontier[:split], inverted)
+            right = self._image(expr.right, frontier[split:] - left_in, inverted)
+            return np.concatenate((left, right + left_out))
+        raise TypeError(f"Cannot query {type(expr).__name__}")
+
+    def _transpose(self, name: str, matrix: SparseRelation) -> SparseRelation:
+        transposed = self._transposed.get(name)
+        if transposed is None:
+            transposed = matrix.transpose()
+            self._transposed[name] = transposed
+        return transposed
+
+    def _product_image(self, expr: ProductRelation, frontier: np.ndarray, inverted):
+        # An element (a, b) of the frontier goes to image(left, a) x image(right, b). Elements a with the same b's are queried together, so a rectangle P x Q is one query of each side.
+        right_in, right_out = (
+            self.set_size(side) for side in self._sets(expr.right, inverted)
+        )
+        firsts = frontier // right_in
+        seconds = frontier - firsts * right_in
+        starts = np.flatnonzero(np.concatenate(([True], firsts[1:] != firsts[:-1])))
+        groups: dict[bytes, list[int]] = {}
+        second_sets: dict[bytes, np.ndarray] = {}
+        for start, end in zip(starts, np.append(starts[1:], frontier.size)):
+            group = seconds[start:end]
+            key = group.tobytes()
+            groups.setdefault(key, []).append(int(firsts[start]))
+            second_sets[key] = group
+        images = []
+        for key, group_firsts in groups.items():
+            left = self._image(expr.left, np.array(group_firsts), inverted)
+            right = self._image(expr.right, second_sets[key], inverted)
+            images.append((left[:, None] * right_out + right[None, :]).ravel())
+        return _sorted_unique(np.concatenate(images))
+
+    def _closure_image(self, expr: ClosureRelation, frontier, inverted):
+        # Breadth-first: only the elements reached for the first time take another step
+        reached = self._image(expr.expr, frontier, inverted)
+        new = reached
+        while new.size:
+            found = self._image(expr.expr, new, inverted)
+            new = found[~np.isin(found, reached, assume_unique=True)]
+            reached = _sorted_unique(np.concatenate((reached, new)))
+        return reached
+
+    def _complement_image(self, expr: ComplementRelation, frontier, inverted):
+        # y is in the image unless every element of the frontier is related to y
+        size = self.set_size(self._sets(expr, inverted)[1])
+        covered = np.ones(size, dtype=bool)
+        for position in range(frontier.size):
+            related = np.zeros(size, dtype=bool)
+            related[
+                self._image(expr.expr, frontier[position : position + 1], inverted)
+            ] = True
+            covered &= related
+            if not covered.any():
+                break
+        return np.flatnonzero(~covered)
+
+    def _structural_image(self, expr: StructuralRelation, frontier, inverted):
+        name = expr.name
+        source, target = (
+            self.names.unfold_set(side) for side in self._sets(expr, inverted)
+        )
+        if name == "Full":
+            return np.arange(self.set_size(target), dtype=np.int64)
+        if name == "Empty":
+            return np.zeros(0, dtype=np.int64)
+        self.pairs_visited += frontier.size
+        if not inverted:
+            if name == "Copy":
+                return frontier * (self.set_size(source) + 1)
+            if name == "First":
+                return _sorted_unique(frontier // self.set_size(source.right))
+            if name == "Second":
+                return _sorted_unique(frontier % self.set_size(source.right))
+            if name == "Collapse":
+                return _sorted_unique(frontier % self.set_size(target))
+            if name == "Left":
+                return frontier
+            return frontier + self.set_size(target.left)
+        # Preimages, source is the codomain of the structural relation
+        if name == "Copy":
+            step = self.set_size(target) + 1
+            return frontier[frontier % step == 0] // step
+        if name in ("First", "Second"):
+            width = self.set_size(target.right)
+            others = np.arange(
+                width if name == "First" else self.set_size(target.left),
+                dtype=np.int64,
+            )
+            if name == "First":
+                pairs = frontier[:, None] * width + others[None, :]
+            else:
+                pairs = others[:, None] * width + frontier[None, :]
+            return _sorted_unique(pairs.ravel())
+        if name == "Collapse":
+            return np.concatenate((frontier, frontier + self.set_size(source)))
+        left = self.set_size(source.left)
+        if name == "Left":
+            return frontier[frontier < left]
+        return frontier[frontier >= left] - left
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from rellang.evaluator import Evaluator
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+from rellang.query import Query
+from rellang.testing import random_relations
+
+CARRIERS = {"A": 5, "B": 3, "C": 4}
+SHAPES = {"R": (5, 3), "S": (3, 4), "T": (4, 15)}
+
+EXPRESSIONS = [
+    "(R : A -> B)",
+    "(R : A -> B);(S : B -> C)",
+    "(R : A -> B);(S : B -> C);(S : B -> C)^;(R : A -> B)^",
+    "(R : A -> B) * (S : B -> C)",
+    "((R : A -> B) * (S : B -> C))^",
+    "((R : A -> B) + (S : B -> C));((R : A -> B)^ + ((S : B -> C)^;(S : B -> C)))",
+    "(T : C -> A * B);(R : A -> B) * (R : A -> B)^",
+    "~(R : A -> B);(S : B -> C)",
+    "~((R : A -> B);~(S : B -> C))^",
+    "(Copy : A -> A * A);(R : A -> B) * (R : A -> B)",
+    "(T : C -> A * B);(First : A * B -> A)",
+    "(T : C -> A * B);(Second : A * B -> B);(Second : A * B -> B)^",
+    "(First : A * B -> A)^;(First : A * B -> A)",
+    "(Copy : B -> B * B)^;(S : B -> C)",
+    "(Collapse : C + C -> C);(Collapse : C + C -> C)^",
+    "(Left : A -> A + B);(Right : B -> A + B)^",
+    "(Full : C -> A + B);(Left : A -> A + B)^",
+    "(Empty : A -> B) + (S : B -> C)",
+    "set P := A * B\nrel D := (T : C -> P);(Second : P -> B)\n(D + D);((S : B -> C) + D^);(Collapse : C + C -> C)",
+]
+
+
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_images_match_evaluation(text):
+    names = NamesContext()
+    expr = parse(text, names).expr[-1].expr
+    values = random_relations(SHAPES, 0.4)
+    query = Query(CARRIERS, values, names)
+    value = Evaluator(CARRIERS, values, names).evaluate(expr)
+    rng = np.random.default_rng(1)
+    for _ in range(10):
+        subset = rng.random(value.shape[0]) < 0.3
+        assert np.array_equal(
+            query.image(expr, subset), np.flatnonzero(value[subset].any(axis=0))
+        )
+        cosubset = rng.random(value.shape[1]) < 0.3
+        assert np.array_equal(
+            query.preimage(expr, cosubset),
+            np.flatnonzero(value[:, cosubset].any(axis=1)),
+        )
+
+
+def test_subsets_and_masks():
+    names = NamesContext()
+    expr = parse("(R : A -> B);(S : B -> C)", names).expr[0].expr
+    values = random_relations(SHAPES, 0.4)
+    query = Query(CARRIERS, values, names)
+    expected = np.flatnonzero((values["R"] @ values["S"])[[3, 1]].any(axis=0))
+    assert np.array_equal(query.image(expr, [3, 1, 3]), expected)
+    assert np.array_equal(query.image(expr, np.array([1, 3])), expected)
+    mask = np.zeros(4, dtype=bool)
+    mask[expected] = True
+    assert np.array_equal(query.image_mask(expr, {1, 3}), mask)
+    assert query.image(expr, []).size == 0
+    with pytest.raises(ValueError, match="outside a set of 5 elements"):
+        query.image(expr, [5])
+    with pytest.raises(ValueError, match="Subset mask has shape"):
+        query.image(expr, np.ones(4, dtype=bool))
+
+
+def test_work_follows_the_frontier():
+    # A chain of permutations: one element has one image at each step
+    size = 10000
+    rng = np.random.default_rng(0)
+    values = {}
+    for name in "RST":
+        matrix = np.zeros((size, size), dtype=bool)
+        matrix[np.arange(size), rng.permutation(size)] = True
+        values[name] = matrix
+    expr = parse("(R : A -> A);(S : A -> A);(T : A -> A)").expr[0].expr
+    query = Query({"A": size}, values)
+    image = query.image(expr, [7])
+    index = 7
+    for name in "RST":
+        index = np.flatnonzero(values[name][index])[0]
+    assert image.tolist() == [index]
+    assert query.pairs_visited == 3
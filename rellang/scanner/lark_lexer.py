@@ -0,0 +1,84 @@
+from collections.abc import Iterator
+
+from rellang.parser import Lexer, LexerConf, Token
+from rellang.scanner.scanner import Scanner, identifier_regex
+
+# Source text of the token kinds that are literal strings in the grammar
+_literals = {
+    "plus": "+",
+    "times": "*",
+    "left_paren": "(",
+    "right_paren": ")",
+    "colon": ":",
+    "semicolon": ";",
+    "equals": "=",
+    "arrow": "->",
+    "def_equals": ":=",
+    "caret": "^",
+    "closure": "^+",
+    "tilde": "~",
+    "rel_keyword": "rel",
+    "set_keyword": "set",
+}
+
+
+class ScannerLexer(Lexer):
+    """
+    Lark lexer backed by Scanner, for build_parser(scanner=True) and for feeding a file's tokens to the parser in iter_file_statements.
+
+    It is built on the Lexer and Token classes of the runtime rellang.parser selected, so with the standalone parser it does not import lark.
+
+    Token kinds are mapped to the grammar's terminal names by matching the literal strings in the grammar. An identifier whose text is a literal of the grammar (a keyword) is given that terminal instead.
+    """
+
+    def __init__(self, lexer_conf: LexerConf):
+        by_literal = {
+            terminal.pattern.value: terminal.name
+            for terminal in lexer_conf.terminals
+            # By type rather than class, so the terminals of the standalone parser work too
+            if terminal.pattern.type == "str"
+        }
+        self.terminal_names = {
+            kind: by_literal[literal]
+            for kind, literal in _literals.items()
+            if literal in by_literal
+        }
+        self.terminal_names["identifier"] = "IDENTIFIER"
+        self.terminal_names["new_line"] = "NEWLINE"
+        self.keywords = {
+            literal: name
+            for literal, name in by_literal.items()
+            if identifier_regex.fullmatch(literal)
+        }
+
+    def lex(self, source: str) -> Iterator[Token]:
+        # Lark passes custom lexers the complete text
+        return self.lark_tokens(Scanner(source))
+
+    def lark_tokens(self, scanner: Scanner) -> Iterator[Token]:
+        """Converts the tokens of any Scanner, including one over a memory mapped file, to Lark tokens."""
+        terminal_names = self.terminal_names
+        keywords = self.keywords
+        for token in scanner.iter_tokens():
+            kind = token.kind
+            if kind == "end_of_source":
+                return
+            value = _literals.get(kind) or scanner.text(token)
+            if kind == "identifier":
+                terminal = keywords.get(value, "IDENTIFIER")
+            elif kind in terminal_names:
+                terminal = terminal_names[kind]
+            else:
+                # Scanned but not used by the grammar, e.g. a lone "="
+                terminal = kind.upper()
+            end_line = token.line + (kind == "new_line")
+            yield Token(
+                terminal,
+                value,
+                token.start,
+                token.line,
+                token.column,
+                end_line,
+                1 if kind == "new_line" else token.column + len(value),
+                token.end,
+            )
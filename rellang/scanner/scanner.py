@@ -1,6 +1,27 @@
-from typing import Literal, Optional, Tuple, Union
+from collections.abc import Iterator
+from typing import Literal, NamedTuple, Tuple, Union
+import mmap
 import re
 
+type TokenKind = Literal[
+    "plus",
+    "times",
+    "left_paren",
+    "right_paren",
+    "colon",
+    "semicolon",
+    "equals",
+    "new_line",
+    "arrow",
+    "def_equals",
+    "caret",
+    "closure",
+    "tilde",
+    "rel_keyword",
+    "set_keyword",
+    "identifier",
+    "end_of_source",
+]
 
 type TokenType = Union[
     Literal[
@@ -9,10 +30,14 @@ type TokenType = Union[
         "left_paren",
         "right_paren",
         "colon",
+        "semicolon",
         "equals",
         "new_line",
         "arrow",
         "def_equals",
+        "caret",
+        "closure",
+        "tilde",
         "rel_keyword",
         "set_keyword",
         "end_of_source",
@@ -22,159 +47,156 @@ type TokenType = Union[
 
 identifier_regex = re.compile("[a-zA-Z_][a-zA-Z_0-9]*")
 
+# One alternative per token kind, each preceded by the spaces and tabs to skip. Alternatives are tried in order, so ":=", "->" and "^+" come before ":" and "^", the error group catches anything else and end_of_source matches once at the end.
+_token_pattern = r"""
+    [ \t]*
+    (?:
+      (?P<new_line>\r?\n|\r)
+    | (?P<identifier>[a-zA-Z_][a-zA-Z_0-9]*)
+    | (?P<def_equals>:=)
+    | (?P<arrow>->)
+    | (?P<colon>:)
+    | (?P<semicolon>;)
+    | (?P<equals>=)
+    | (?P<plus>\+)
+    | (?P<times>\*)
+    | (?P<closure>\^\+)
+    | (?P<caret>\^)
+    | (?P<tilde>~)
+    | (?P<left_paren>\()
+    | (?P<right_paren>\))
+    | (?P<error>.)
+    | (?P<end_of_source>\Z)
+    )
+    """
+_token_regex = re.compile(_token_pattern, re.VERBOSE | re.DOTALL)
+# The same pattern for byte sources, which the re module can match in place over mmap and memoryview buffers
+_token_regex_bytes = re.compile(_token_pattern.encode("ascii"), re.VERBOSE | re.DOTALL)
 
-class Scanner:
-    def __init__(self, source: str):
-        self.current_char: int = 0  # index of current character of the current word
-        self.current_line: int = 0  # index of the current line
-        self.lines = [line for line in source.splitlines() if line != ""]
-        self.tokens: list[TokenType] = []
-
-    def error_msg(self, message: str) -> str:
-        return f"""Error at line {self.current_line + 1}, column {self.current_char + 1}:
-    {message}"""
+_keywords: dict[str, TokenKind] = {"rel": "rel_keyword", "set": "set_keyword"}
+_keywords_bytes: dict[bytes, TokenKind] = {
+    keyword.encode("ascii"): kind for keyword, kind in _keywords.items()
+}
 
-    def is_at_end(self) -> bool:
-        """Returns true when on the last line and current_char is past the last character. Of if current line is after the last line"""
-        if self.current_line > len(self.lines) - 1:
-            print("current line greater than lines")
-            return True
-        elif self.current_line == len(self.lines) - 1 and self.current_char >= len(
-            self.lines[self.current_line]
-        ):
+type Source = Union[str, bytes, memoryview, mmap.mmap]
 
-            return True
-        else:
-            return False
 
-    def get_line(self):
-        if self.current_line < len(self.lines):
-            return self.lines[self.current_line]
-        else:
-            raise ValueError(
-                self.error_msg(
-                    "Couldn't get line, this is likely a bug in scanner code"
-                )
-            )
+class Token(NamedTuple):
+    """
+    A token as offsets into the source. The text is only sliced out when asked for with Scanner.text().
+    """
+
+    kind: TokenKind
+    start: int  # Offset of the first character
+    end: int  # Offset after the last character
+    line: int  # 1-based line of the first character
+    column: int  # 1-based column of the first character
 
-    def get_chars(self, length: int = 1) -> str:
+
+class Scanner:
+    """
+    Tokenizer for rellang source.
+
+    The whole source is scanned with one compiled pattern, advancing by match offsets without copying lines or the rest of the line. Spaces and tabs are skipped, every line break gives a new_line token (as the grammar's NEWLINE), and the stream ends with end_of_source.
+    """
+
+    def __init__(self, source: Source):
+        self.source = source
+        self.tokens: list[Token] = []
+        self._file = None
+
+    @classmethod
+    def open(cls, path: str) -> "Scanner":
         """
-        Gets the character at the current character or characters from the current character up to plus n characters forward.
+        Scans a file through a read-only memory map, without reading it into memory. Offsets are byte offsets and only the text of tokens asked for is decoded. Close the scanner, or use it as a context manager, to release the map.
         """
-        if length < 1:
-            raise ValueError(self.error_msg("Length must be 1 or greater"))
-
-        line = self.get_line()
-        char_index = self.current_char
-        end_index = self.current_char + length
-        if char_index < len(line):
-            return line[char_index:end_index]
-        else:
-            return ""
+        file = open(path, "rb")
+        try:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            source = b""
+        scanner = cls(source)
+        scanner._file = file
+        return scanner
+
+    def close(self):
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "Scanner":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def error_msg(self, line: int, column: int, message: str) -> str:
+        return f"""Error at line {line}, column {column}:
+    {message}"""
 
-    def advance_line(self):
-        self.current_line += 1
-        self.current_char = 0
-        if self.current_line < len(self.lines):
-            self.tokens.append("new_line")
+    def iter_tokens(self) -> Iterator[Token]:
+        source = self.source
+        if isinstance(source, str):
+            token_regex, keywords, key = _token_regex, _keywords, str
         else:
-            self.tokens.append("end_of_source")
+            # Slices of a memoryview are views, which can't be looked up in a dict
+            token_regex, keywords, key = _token_regex_bytes, _keywords_bytes, bytes
+        new_token = tuple.__new__  # Skips the NamedTuple constructor in this hot loop
+        line = 1
+        line_start = 0
+        for match in token_regex.finditer(source):
+            kind = match.lastgroup
+            start = match.start(kind)
+            end = match.end()
+            if kind == "identifier":
+                # Only three letter identifiers can be keywords
+                if end - start == 3 and key(source[start:end]) in keywords:
+                    kind = keywords[key(source[start:end])]
+            elif kind == "new_line":
+                yield new_token(Token, (kind, start, end, line, start - line_start + 1))
+                line += 1
+                line_start = end
+                continue
+            elif kind == "error":
+                line_end = _line_end(source, start)
+                raise ValueError(
+                    self.error_msg(
+                        line,
+                        start - line_start + 1,
+                        f"""No match at:
+{self._decode(line_start, start)}>>>{self._decode(start, line_end)}<<<""",
+                    )
+                )
+            yield new_token(Token, (kind, start, end, line, start - line_start + 1))
 
-    def advance(self, length: int = 1):
-        if length < 1:
-            raise ValueError(self.error_msg("Length must be 1 or greater"))
+    def scan_source(self) -> list[Token]:
+        self.tokens = list(self.iter_tokens())
+        return self.tokens
 
-        if self.current_char + length < len(self.get_line()):
-            self.current_char += length
-        else:
-            self.advance_line()
-
-    def match(self, to_match: str):
-        return self.get_chars(len(to_match)) == to_match
-
-    def match_identifier(self):
-        remaining = self.get_line()[self.current_char :]
-        print("matching identifier:")
-        print(remaining)
-        identifier = identifier_regex.match(remaining)
-        if identifier:
-            return identifier.group()
-        else:
-            return None
-
-    def scan_token(self):
-        c = self.get_chars()
-        consumed_chars = 1
-        token: Optional[TokenType] = None
-        line = self.get_line()
-        char_index = self.current_char
-        no_match_msg: str = self.error_msg(
-            f"""No match at:
-{line[:char_index]}>>>{line[char_index:]}<<<"""
-        )
-
-        match c:
-            case "(":
-                token = "left_paren"
-            case ")":
-                token = "right_paren"
-            case ":":
-                if self.match(":="):
-                    consumed_chars = 2
-                    token = "def_equals"
-                else:
-                    token = "colon"
-            case "=":
-                token = "equals"
-            case "+":
-                token = "plus"
-            case "*":
-                token = "times"
-            case "-":
-                if self.match("->"):
-                    token = "arrow"
-                    consumed_chars = 2
-                else:
-                    raise ValueError(no_match_msg)
-            case "r":
-                if self.match("rel"):
-                    consumed_chars = 3
-                    token = "rel_keyword"
-            case "s":
-                if self.match("set"):
-                    consumed_chars = 3
-                    token = "rel_keyword"
-            case " ":
-                print("match space")
-                pass  # Ignore spaces
-            case "\t":
-                pass  # Ignore tabs
-            # Note: newlines are already removed when lines are split
-            case _:
-                identifier = self.match_identifier()
-                if identifier:
-                    consumed_chars = len(identifier)
-                    token = ("identifier", identifier)
-                else:
-                    raise ValueError(no_match_msg)
-
-        if token is not None:
-            self.tokens.append(token)
-        self.advance(consumed_chars)
-
-    def scan_source(self):
-        while not self.is_at_end():
-            self.scan_token()
-        print(self.tokens)
-
-
-Scanner(
-    """
+    def text(self, token: Token) -> str:
+        return self._decode(token.start, token.end)
+
+    def _decode(self, start: int, end: int) -> str:
+        text = self.source[start:end]
+        if isinstance(text, str):
+            return text
+        return bytes(text).decode("utf-8", errors="replace")
+
+    def token_type(self, token: Token) -> TokenType:
+        """The token in the TokenType form, with the name attached to identifiers."""
+        if token.kind == "identifier":
+            return ("identifier", self.text(token))
+        return token.kind
 
 
-R  := A + BB ->
+_line_break_regex = re.compile(r"\r|\n")
+_line_break_regex_bytes = re.compile(rb"\r|\n")
 
-R:=A+ B
 
-"""
-).scan_source()
+def _line_end(source: Source, offset: int) -> int:
+    regex = _line_break_regex if isinstance(source, str) else _line_break_regex_bytes
+    match = regex.search(source, offset)
+    return match.start() if match else len(source)
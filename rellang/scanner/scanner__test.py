@@ -0,0 +1,111 @@
+import pytest
+
+from rellang.parser import build_parser, get_parser, parse
+from rellang.scanner.scanner import Scanner, Token
+
+
+def kinds(source: str) -> list:
+    scanner = Scanner(source)
+    return [scanner.token_type(token) for token in scanner.scan_source()]
+
+
+def test_token_types():
+    assert kinds("set X := A * B\nrel R:=S : X->C;T") == [
+        "set_keyword",
+        ("identifier", "X"),
+        "def_equals",
+        ("identifier", "A"),
+        "times",
+        ("identifier", "B"),
+        "new_line",
+        "rel_keyword",
+        ("identifier", "R"),
+        "def_equals",
+        ("identifier", "S"),
+        "colon",
+        ("identifier", "X"),
+        "arrow",
+        ("identifier", "C"),
+        "semicolon",
+        ("identifier", "T"),
+        "end_of_source",
+    ]
+
+
+def test_converse_and_complement_tokens():
+    assert kinds("~R^") == [
+        "tilde",
+        ("identifier", "R"),
+        "caret",
+        "end_of_source",
+    ]
+
+
+def test_closure_token():
+    assert kinds("R^+ ^ +") == [
+        ("identifier", "R"),
+        "closure",
+        "caret",
+        "plus",
+        "end_of_source",
+    ]
+
+
+def test_keywords_need_whole_identifier():
+    """Names that start with a keyword are identifiers"""
+    assert kinds("settings relation rel") == [
+        ("identifier", "settings"),
+        ("identifier", "relation"),
+        "rel_keyword",
+        "end_of_source",
+    ]
+
+
+def test_offsets_lines_and_columns():
+    scanner = Scanner("R : A\n\n  (S)")
+    tokens = scanner.scan_source()
+    assert tokens[0] == Token("identifier", 0, 1, 1, 1)
+    assert tokens[3] == Token("new_line", 5, 6, 1, 6)
+    assert tokens[5] == Token("left_paren", 9, 10, 3, 3)
+    assert scanner.text(tokens[6]) == "S"
+    assert tokens[-1] == Token("end_of_source", 12, 12, 3, 6)
+
+
+def test_error_position():
+    with pytest.raises(ValueError, match="Error at line 2, column 6"):
+        Scanner("R : A\n  -> ? B").scan_source()
+
+
+def test_lark_lexer_gives_same_ast():
+    """Scanner plugged into the LALR parser produces the same ASTs"""
+    parser = build_parser(scanner=True)
+    program = """
+    set X := A * B
+
+    rel R := (S: X -> C);(T: C -> D)
+    R;(U : D -> E + F) : X -> E + F
+    ~R^;(First : X * D -> X)^
+    (R;(U : D -> X))^+
+    export rel Y := R^
+    """
+    assert parse(program, parser=parser) == parse(program)
+    assert list(parser.lex("R;S")) == list(get_parser().lex("R;S"))
+
+
+def test_bytes_and_mapped_files_scan_the_same(tmp_path):
+    """Byte sources and memory mapped files give the same tokens as text"""
+    source = "set X := A * B\r\nrel R := S: X -> C\n\nR;T\n"
+    expected = Scanner(source).scan_source()
+    assert Scanner(source.encode()).scan_source() == expected
+    assert Scanner(memoryview(bytearray(source.encode()))).scan_source() == expected
+
+    path = tmp_path / "program.rel"
+    path.write_bytes(source.encode())
+    with Scanner.open(str(path)) as scanner:
+        tokens = scanner.scan_source()
+        assert tokens == expected
+        assert scanner.text(tokens[1]) == "X"
+
+    (tmp_path / "empty.rel").write_bytes(b"")
+    with Scanner.open(str(tmp_path / "empty.rel")) as scanner:
+        assert [token.kind for token in scanner.scan_source()] == ["end_of_source"]
@@ -0,0 +1,232 @@
+import json
+import sys
+from typing import BinaryIO, Optional
+
+from rellang.incremental import IncrementalParser
+from rellang.parser import Lark, _newline_regex, describe_error, get_parser
+
+# JSON-RPC error codes
+_parse_error = -32700
+_method_not_found = -32601
+_internal_error = -32603
+_server_not_initialized = -32002
+
+_error_severity = 1
+
+
+def read_message(stream: BinaryIO) -> Optional[dict]:
+    """Reads one message framed by a Content-Length header, as in the language server protocol. Returns None at the end of the stream."""
+    length = None
+    while True:
+        header = stream.readline()
+        if not header:
+            return None
+        header = header.strip()
+        if not header:
+            break
+        name, _, value = header.decode("ascii").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    if length is None:
+        raise ValueError("Message without a Content-Length header")
+    return json.loads(stream.read(length))
+
+
+def write_message(stream: BinaryIO, message: dict):
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stream.flush()
+
+
+def _utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _code_point_index(line: str, character: int) -> int:
+    """The index in line of a position given in UTF-16 code units, which is how the protocol counts characters."""
+    if line.isascii():
+        return min(character, len(line))
+    units = 0
+    for index, char in enumerate(line):
+        if units >= character:
+            return index
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+class Document:
+    """
+    An open document: its lines and the IncrementalParser that checks it.
+
+    Each document has its own parser, so its NamesContext and statement cache are kept between edits and only the statements an edit touches, and those depending on definitions it changed, are parsed again.
+    """
+
+    def __init__(self, text: str, version: int = 0, parser: Optional[Lark] = None):
+        self.lines = _newline_regex.split(text)
+        self.version = version
+        self.parser = IncrementalParser(parser)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def apply_change(self, change: dict):
+        """Applies one entry of the contentChanges of a didChange notification: a whole new text, or a replacement of a range."""
+        if "range" not in change:
+            self.lines = _newline_regex.split(change["text"])
+            return
+        start, end = change["range"]["start"], change["range"]["end"]
+        last = len(self.lines) - 1
+        start_line, end_line = min(start["line"], last), min(end["line"], last)
+        first, final = self.lines[start_line], self.lines[end_line]
+        replaced = (
+            first[: _code_point_index(first, start["character"])]
+            + change["text"]
+            + final[_code_point_index(final, end["character"]) :]
+        )
+        self.lines[start_line : end_line + 1] = _newline_regex.split(replaced)
+
+    def diagnostics(self) -> list[dict]:
+        """Parses the document and returns a diagnostic for each statement that fails, located within its line."""
+        errors: list[tuple[int, Exception]] = []
+        self.parser.parse(self.text, errors)
+        return [_diagnostic(index, self.lines[index], error) for index, error in errors]
+
+
+def _diagnostic(index: int, line: str, error: Exception) -> dict:
+    start, end, message = describe_error(line, error)
+    return {
+        "range": {
+            "start": {"line": index, "character": _utf16_length(line[:start])},
+            "end": {"line": index, "character": _utf16_length(line[:end])},
+        },
+        "severity": _error_severity,
+        "source": "rellang",
+        "message": message,
+    }
+
+
+class LanguageServer:
+    """
+    A language server speaking JSON-RPC over a pair of byte streams, normally stdin and stdout.
+
+    It is meant to stay resident: the parser is built once, when the client initializes, and each open document keeps its parse state, so checking an edit costs a dictionary lookup per unchanged statement and a parse of the changed ones. Documents are synchronized incrementally and diagnostics are published after every open and change.
+    """
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO):
+        self.reader = reader
+        self.writer = writer
+        self.documents: dict[str, Document] = {}
+        self.parser: Optional[Lark] = None
+        self.shutdown_requested = False
+        self._handlers = {
+            "initialize": self.initialize,
+            "initialized": lambda params: None,
+            "shutdown": self.shutdown,
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+        }
+
+    def serve(self) -> int:
+        """Handles messages until exit or the end of the input, returning the process exit code the protocol asks for."""
+        while True:
+            try:
+                message = read_message(self.reader)
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                self._send({"id": None, "error": _error(_parse_error, str(e))})
+                continue
+            if message is None or message.get("method") == "exit":
+                return 0 if self.shutdown_requested else 1
+            self.handle(message)
+
+    def handle(self, message: dict):
+        method = message.get("method")
+        request_id = message.get("id")
+        handler = self._handlers.get(method)
+        if handler is None:
+            # Notifications the server does not know, such as $/cancelRequest, are ignored
+            if request_id is not None:
+                error = _error(_method_not_found, f"Unknown method {method}")
+                self._send({"id": request_id, "error": error})
+            return
+        if self.parser is None and method != "initialize":
+            if request_id is not None:
+                error = _error(_server_not_initialized, "Server not initialized")
+                self._send({"id": request_id, "error": error})
+            return
+        try:
+            result = handler(message.get("params") or {})
+        except Exception as e:
+            if request_id is None:
+                # A notification has no response to carry the error, and the server keeps running
+                self._notify("window/logMessage", {"type": 1, "message": str(e)})
+            else:
+                error = _error(_internal_error, str(e))
+                self._send({"id": request_id, "error": error})
+            return
+        if request_id is not None:
+            self._send({"id": request_id, "result": result})
+
+    def initialize(self, params: dict) -> dict:
+        self.parser = get_parser()
+        return {
+            "capabilities": {
+                # Incremental synchronization: didChange carries the edited ranges
+                "textDocumentSync": {"openClose": True, "change": 2},
+            },
+            "serverInfo": {"name": "rellang"},
+        }
+
+    def shutdown(self, params: dict):
+        self.shutdown_requested = True
+        return None
+
+    def did_open(self, params: dict):
+        item = params["textDocument"]
+        document = Document(item["text"], item.get("version", 0), self.parser)
+        self.documents[item["uri"]] = document
+        self.publish(item["uri"], document)
+
+    def did_change(self, params: dict):
+        identifier = params["textDocument"]
+        document = self.documents[identifier["uri"]]
+        for change in params["contentChanges"]:
+            document.apply_change(change)
+        document.version = identifier.get("version", document.version)
+        self.publish(identifier["uri"], document)
+
+    def did_close(self, params: dict):
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self._notify("textDocument/publishDiagnostics", {"uri": uri, "diagnostics": []})
+
+    def publish(self, uri: str, document: Document):
+        self._notify(
+            "textDocument/publishDiagnostics",
+            {
+                "uri": uri,
+                "version": document.version,
+                "diagnostics": document.diagnostics(),
+            },
+        )
+
+    def _notify(self, method: str, params: dict):
+        self._send({"method": method, "params": params})
+
+    def _send(self, message: dict):
+        write_message(self.writer, {"jsonrpc": "2.0", **message})
+
+
+def _error(code: int, message: str) -> dict:
+    return {"code": code, "message": message}
+
+
+def main() -> None:
+    server = LanguageServer(sys.stdin.buffer, sys.stdout.buffer)
+    sys.exit(server.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from rellang.incremental import IncrementalParser
+from rellang.server import Document, LanguageServer, read_message, write_message
+
+PROGRAM = """set X := A * B
+rel R := S: X -> C
+rel T := R;(U: C -> D)
+T: X -> D
+"""
+
+
+class Client:
+    """Talks to a server process over its stdin and stdout."""
+
+    def __init__(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "rellang.server"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        self.next_id = 0
+
+    def request(self, method: str, params=None):
+        self.next_id += 1
+        self.notify(method, params, id=self.next_id)
+        return self.receive()
+
+    def notify(self, method: str, params=None, **fields):
+        message = {"jsonrpc": "2.0", "method": method, **fields}
+        if params is not None:
+            message["params"] = params
+        write_message(self.process.stdin, message)
+
+    def receive(self) -> dict:
+        return read_message(self.process.stdout)
+
+
+def open_params(text: str, uri="file:///a.rel") -> dict:
+    return {"textDocument": {"uri": uri, "version": 1, "text": text}}
+
+
+def change_params(version, *changes, uri="file:///a.rel") -> dict:
+    return {
+        "textDocument": {"uri": uri, "version": version},
+        "contentChanges": list(changes),
+    }
+
+
+def edit(line, start, end, text) -> dict:
+    return {
+        "range": {
+            "start": {"line": line, "character": start},
+            "end": {"line": line, "character": end},
+        },
+        "text": text,
+    }
+
+
+def test_session_over_stdio():
+    client = Client()
+    try:
+        response = client.request("initialize", {"capabilities": {}})
+        assert response["id"] == 1
+        assert response["result"]["capabilities"]["textDocumentSync"]["change"] == 2
+        client.notify("initialized", {})
+
+        client.notify("textDocument/didOpen", open_params(PROGRAM))
+        published = client.receive()
+        assert published["method"] == "textDocument/publishDiagnostics"
+        assert published["params"]["diagnostics"] == []
+
+        # U: C -> D becomes U: Q -> D
+        client.notify("textDocument/didChange", change_params(2, edit(2, 15, 16, "Q")))
+        diagnostics = client.receive()["params"]["diagnostics"]
+        assert len(diagnostics) == 1
+        assert diagnostics[0]["message"].startswith("Type mismatch in composition")
+        assert diagnostics[0]["range"]["start"] == {"line": 2, "character": 0}
+        assert diagnostics[0]["range"]["end"] == {"line": 2, "character": 22}
+
+        client.notify("textDocument/didChange", change_params(3, edit(2, 15, 16, "C")))
+        published = client.receive()["params"]
+        assert published["version"] == 3 and published["diagnostics"] == []
+
+        assert client.request("unknown/method")["error"]["code"] == -32601
+        assert client.request("shutdown") == {"jsonrpc": "2.0", "id": 3, "result": None}
+        client.notify("exit")
+        assert client.process.wait(timeout=10) == 0
+    finally:
+        client.process.kill()
+        client.process.stdin.close()
+        client.process.stdout.close()
+
+
+def run(*messages) -> list[dict]:
+    """Feeds messages to an in-process server and returns what it wrote."""
+    reader = io.BytesIO()
+    for message in messages:
+        write_message(reader, message)
+    reader.seek(0)
+    writer = io.BytesIO()
+    LanguageServer(reader, writer).serve()
+    writer.seek(0)
+    return list(iter(lambda: read_message(writer), None))
+
+
+def test_requests_before_initialize_are_refused():
+    (response,) = run({"jsonrpc": "2.0", "id": 1, "method": "shutdown"})
+    assert response["error"]["code"] == -32002
+
+
+def test_every_error_is_reported():
+    text = "rel R := S: A -> B\n(R;;)\nR;(T: C -> D)\n\n(R;(T: B -> 𝔸))"
+    responses = run(
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+        {
+            "jsonrpc": "2.0",
+            "method": "textDocument/didOpen",
+            "params": open_params(text),
+        },
+    )
+    diagnostics = responses[1]["params"]["diagnostics"]
+    assert [d["range"]["start"]["line"] for d in diagnostics] == [1, 2, 4]
+    assert diagnostics[0]["message"].startswith("Unexpected token ';'")
+    assert diagnostics[0]["range"]["start"]["character"] == 3
+    assert diagnostics[1]["message"].startswith("Type mismatch in composition")
+    assert diagnostics[2]["message"] == "Unexpected character '𝔸'"
+    # Positions are in UTF-16 code units, where 𝔸 takes two
+    assert diagnostics[2]["range"]["start"]["character"] == 12
+    assert diagnostics[2]["range"]["end"]["character"] == 14
+
+
+@pytest.mark.parametrize(
+    "change, expected",
+    [
+        (edit(1, 9, 10, "S2"), "a\nrel R := S2: A -> B\nc"),
+        (edit(0, 1, 1, "\nb"), "a\nb\nrel R := S: A -> B\nc"),
+        (
+            {
+                "range": {
+                    "start": {"line": 0, "character": 1},
+                    "end": {"line": 2, "character": 0},
+                },
+                "text": "",
+            },
+            "ac",
+        ),
+        ({"text": "new\ntext"}, "new\ntext"),
+    ],
+)
+def test_document_changes(change, expected):
+    document = Document("a\nrel R := S: A -> B\nc")
+    document.apply_change(change)
+    assert document.text == expected
+
+
+def test_unicode_positions():
+    document = Document("(R: 𝔸 -> B)")
+    # 𝔸 takes two UTF-16 code units
+    document.apply_change(edit(0, 6, 6, "x"))
+    assert document.text == "(R: 𝔸x -> B)"
+
+
+def test_errors_do_not_stop_later_statements():
+    parser = IncrementalParser()
+    errors = []
+    program = parser.parse("(R: A -> B);(S: C -> D)\nrel T := U: A -> B\nT;T", errors)
+    assert [index for index, _ in errors] == [0, 2]
+    assert len(program.expr) == 1
+    # The failed statements are parsed again, the good one is reused
+    errors = []
+    parser.parse("(R: A -> B);(S: C -> D)\nrel T := U: A -> B\nT;(V: B -> C)", errors)
+    assert parser.reused == 1 and parser.reparsed == 2
+    assert [index for index, _ in errors] == [0]
@@ -0,0 +1,394 @@
+import numpy as np
+
+from rellang.closure import matrix_closure, semi_naive_closure
+from rellang.evaluator import DenseBackend
+
+# Upper bound on the intermediate (row, column) pairs a sparse composition materializes at once
+_compose_chunk = 1 << 22
+
+
+class SparseRelation:
+    """
+    A boolean matrix in compressed sparse row (CSR) form.
+
+    The columns related to row i are indices[indptr[i]:indptr[i + 1]], sorted and without duplicates. Element order is that of DenseBackend, so to_dense() gives exactly the matrix the dense evaluator computes.
+    """
+
+    __slots__ = ("shape", "indptr", "indices")
+
+    def __init__(self, shape: tuple[int, int], indptr: np.ndarray, indices: np.ndarray):
+        self.shape = shape
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_pairs(cls, shape: tuple[int, int], rows, columns) -> "SparseRelation":
+        """The relation holding (rows[k], columns[k]) for every k. Pairs may repeat and come in any order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        if rows.size and (
+            rows.min() < 0
+            or rows.max() >= shape[0]
+            or columns.min() < 0
+            or columns.max() >= shape[1]
+        ):
+            raise ValueError(f"Pair outside a relation of shape {shape}")
+        return cls._from_keys(shape, _sorted_unique(rows * shape[1] + columns))
+
+    @classmethod
+    def from_dense(cls, matrix) -> "SparseRelation":
+        matrix = np.asarray(matrix, dtype=bool)
+        rows, columns = np.nonzero(matrix)
+        indptr = np.zeros(matrix.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=matrix.shape[0]), out=indptr[1:])
+        return cls(matrix.shape, indptr, columns.astype(np.int64))
+
+    @classmethod
+    def function(cls, index: np.ndarray, columns: int) -> "SparseRelation":
+        """The relation of each row i to column index[i] only."""
+        return cls(
+            (index.size, columns),
+            np.arange(index.size + 1, dtype=np.int64),
+            index.astype(np.int64),
+        )
+
+    @classmethod
+    def outer(cls, rows: np.ndarray, columns: np.ndarray) -> "SparseRelation":
+        """The relation of every row in the rows mask to every column in the columns mask."""
+        selected = np.flatnonzero(columns)
+        indptr = np.zeros(rows.size + 1, dtype=np.int64)
+        np.cumsum(rows * selected.size, out=indptr[1:])
+        return cls(
+            (rows.size, columns.size),
+            indptr,
+            np.tile(selected, int(np.count_nonzero(rows))).astype(np.int64),
+        )
+
+    @classmethod
+    def _from_keys(cls, shape: tuple[int, int], keys: np.ndarray) -> "SparseRelation":
+        # keys are sorted, distinct row * columns + column values
+        rows = keys // shape[1]
+        indptr = np.searchsorted(rows, np.arange(shape[0] + 1), side="left")
+        return cls(shape, indptr.astype(np.int64), keys - rows * shape[1])
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indices.size)
+
+    @property
+    def density(self) -> float:
+        cells = self.shape[0] * self.shape[1]
+        return self.nnz / cells if cells else 0.0
+
+    def row_indices(self) -> np.ndarray:
+        """The row of every stored pair, aligned with indices."""
+        return np.repeat(np.arange(self.shape[0], dtype=np.int64), np.diff(self.indptr))
+
+    def to_dense(self) -> np.ndarray:
+        matrix = np.zeros(self.shape, dtype=bool)
+        matrix[self.row_indices(), self.indices] = True
+        return matrix
+
+    def transpose(self) -> "SparseRelation":
+        rows = self.row_indices()
+        keys = np.sort(self.indices * self.shape[0] + rows)
+        return SparseRelation._from_keys((self.shape[1], self.shape[0]), keys)
+
+    def compose(self, other: "SparseRelation") -> "SparseRelation":
+        """self;other, following every pair (i, k) of self into row k of other."""
+        rows = self.row_indices()
+        counts = np.diff(other.indptr)[self.indices]
+        keys = []
+        # Chunk the pairs of self so the expanded paths stay bounded in memory
+        ends = np.cumsum(counts)
+        start = 0
+        while start < rows.size:
+            base = ends[start - 1] if start else 0
+            stop = int(np.searchsorted(ends, base + _compose_chunk, side="right"))
+            stop = max(stop, start + 1)
+            chunk_counts = counts[start:stop]
+            total = int(chunk_counts.sum())
+            if total:
+                # Position of each path within the row of other it follows
+                offsets = np.arange(total) - np.repeat(
+                    np.cumsum(chunk_counts) - chunk_counts, chunk_counts
+                )
+                columns = other.indices[
+                    np.repeat(other.indptr[self.indices[start:stop]], chunk_counts)
+                    + offsets
+                ]
+                keys.append(
+                    _sorted_unique(
+                        np.repeat(rows[start:stop], chunk_counts) * other.shape[1]
+                        + columns
+                    )
+                )
+            start = stop
+        shape = (self.shape[0], other.shape[1])
+        if not keys:
+            return SparseRelation._from_keys(shape, np.zeros(0, dtype=np.int64))
+        # A row of self split across two chunks can give the same key in both
+        return SparseRelation._from_keys(shape, _sorted_unique(np.concatenate(keys)))
+
+    def gather_rows(self, index: np.ndarray) -> "SparseRelation":
+        """Row i of the result is row index[i] of self."""
+        counts = np.diff(self.indptr)[index]
+        indptr = np.zeros(index.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        positions = np.repeat(self.indptr[index] - indptr[:-1], counts) + np.arange(
+            indptr[-1]
+        )
+        return SparseRelation(
+            (index.size, self.shape[1]), indptr, self.indices[positions]
+        )
+
+    def scatter_columns(self, index: np.ndarray, columns: int) -> "SparseRelation":
+        """Column c of the result is the OR of the columns j of self with index[j] == c."""
+        keys = self.row_indices() * columns + index[self.indices]
+        return SparseRelation._from_keys((self.shape[0], columns), _sorted_unique(keys))
+
+    def rows_meeting(self, columns: np.ndarray) -> np.ndarray:
+        """Mask of the rows related to some column in the columns mask."""
+        result = np.zeros(self.shape[0], dtype=bool)
+        result[self.row_indices()[columns[self.indices]]] = True
+        return result
+
+    def columns_meeting(self, rows: np.ndarray) -> np.ndarray:
+        """Mask of the columns related to some row in the rows mask."""
+        result = np.zeros(self.shape[1], dtype=bool)
+        result[self.indices[rows[self.row_indices()]]] = True
+        return result
+
+    def product(self, other: "SparseRelation") -> "SparseRelation":
+        """The Kronecker product, ((a, c), (b, d)) for (a, b) in self and (c, d) in other."""
+        rows = (
+            self.row_indices()[:, None] * other.shape[0] + other.row_indices()[None, :]
+        )
+        columns = self.indices[:, None] * other.shape[1] + other.indices[None, :]
+        shape = (self.shape[0] * other.shape[0], self.shape[1] * other.shape[1])
+        return SparseRelation._from_keys(
+            shape, np.sort((rows * shape[1] + columns).ravel())
+        )
+
+    def coproduct(self, other: "SparseRelation") -> "SparseRelation":
+        """The block-diagonal relation, other shifted past the rows and columns of self."""
+        return SparseRelation(
+            (self.shape[0] + other.shape[0], self.shape[1] + other.shape[1]),
+            np.concatenate((self.indptr, other.indptr[1:] + self.nnz)),
+            np.concatenate((self.indices, other.indices + self.shape[1])),
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SparseRelation):
+            return NotImplemented
+        return (
+            self.shape == other.shape
+            and np.array_equal(self.indptr, other.indptr)
+            and np.array_equal(self.indices, other.indices)
+        )
+
+    def __repr__(self) -> str:
+        return f"SparseRelation(shape={self.shape}, nnz={self.nnz})"
+
+
+def _sorted_unique(keys: np.ndarray) -> np.ndarray:
+    # np.unique hashes before sorting in recent NumPy, a plain sort is several times faster for int64 keys
+    keys = np.sort(keys)
+    if keys.size:
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return keys
+
+
+def as_sparse(value) -> SparseRelation:
+    if isinstance(value, SparseRelation):
+        return value
+    return SparseRelation.from_dense(value)
+
+
+def as_dense(value) -> np.ndarray:
+    if isinstance(value, SparseRelation):
+        return value.to_dense()
+    return np.asarray(value, dtype=bool)
+
+
+class SparseBackend:
+    """Evaluator backend keeping every value as a SparseRelation."""
+
+    name = "sparse"
+
+    def atomic(self, matrix) -> SparseRelation:
+        return as_sparse(matrix)
+
+    def shape(self, value: SparseRelation) -> tuple[int, int]:
+        return value.shape
+
+    def compose(self, left, right) -> SparseRelation:
+        return left.compose(right)
+
+    def product(self, left, right) -> SparseRelation:
+        return left.product(right)
+
+    def coproduct(self, left, right) -> SparseRelation:
+        return left.coproduct(right)
+
+    def gather_rows(self, value: SparseRelation, index: np.ndarray) -> SparseRelation:
+        return value.gather_rows(index)
+
+    def scatter_columns(
+        self, value: SparseRelation, index: np.ndarray, columns: int
+    ) -> SparseRelation:
+        return value.scatter_columns(index, columns)
+
+    def rows_meeting(self, value: SparseRelation, columns: np.ndarray) -> np.ndarray:
+        return value.rows_meeting(columns)
+
+    def columns_meeting(self, value: SparseRelation, rows: np.ndarray) -> np.ndarray:
+        return value.columns_meeting(rows)
+
+    def transpose(self, value: SparseRelation) -> SparseRelation:
+        return value.transpose()
+
+    def complement(self, value: SparseRelation) -> SparseRelation:
+        # Dense by nature, a complement is built through a boolean matrix
+        return SparseRelation.from_dense(np.logical_not(value.to_dense()))
+
+    def closure(self, value: SparseRelation) -> SparseRelation:
+        return as_sparse(semi_naive_closure(value))
+
+    def function(self, index: np.ndarray, columns: int) -> SparseRelation:
+        return SparseRelation.function(index, columns)
+
+    def outer(self, rows: np.ndarray, columns: np.ndarray) -> SparseRelation:
+        return SparseRelation.outer(rows, columns)
+
+    def to_dense(self, value: SparseRelation) -> np.ndarray:
+        return value.to_dense()
+
+
+class AutoBackend:
+    """
+    Evaluator backend choosing between dense matrices and SparseRelation for every node.
+
+    Products and coproducts, whose result density is known exactly from the operands, are kept sparse when that density is below max_density. A composition over an inner set of size k is done sparsely when its expected number of paths, nnz(left) * nnz(right) / k, times path_cost is below the rows * k * columns multiply-adds of a dense product (dense products run through BLAS, so one sparse path costs several hundred of them). Any result with more than max_dense_cells entries is sparse. Operands are converted as the chosen operation needs, and atomic relations may be supplied as dense matrices or as SparseRelation values.
+    """
+
+    name = "auto"
+
+    def __init__(
+        self,
+        max_density: float = 0.02,
+        max_dense_cells: int = 1 << 26,
+        path_cost: float = 500.0,
+    ):
+        self.max_density = max_density
+        self.max_dense_cells = max_dense_cells
+        self.path_cost = path_cost
+        self._dense = DenseBackend()
+
+    def _sparse(self, shape: tuple[int, int], density: float) -> bool:
+        return density < self.max_density or shape[0] * shape[1] > self.max_dense_cells
+
+    def atomic(self, matrix):
+        if isinstance(matrix, SparseRelation):
+            value = matrix
+        else:
+            value = np.asarray(matrix, dtype=bool)
+        return self._choose(value, density(value))
+
+    def _choose(self, value, estimate: float):
+        if self._sparse(value.shape, estimate):
+            return as_sparse(value)
+        return as_dense(value)
+
+    def shape(self, value) -> tuple[int, int]:
+        return value.shape
+
+    def compose(self, left, right):
+        rows, inner = left.shape
+        columns = right.shape[1]
+        paths = nnz(left) * nnz(right) / inner if inner else 0
+        if (
+            paths * self.path_cost < rows * inner * columns
+            or rows * columns > self.max_dense_cells
+        ):
+            return as_sparse(left).compose(as_sparse(right))
+        return self._dense.compose(as_dense(left), as_dense(right))
+
+    def product(self, left, right):
+        shape = (left.shape[0] * right.shape[0], left.shape[1] * right.shape[1])
+        if self._sparse(shape, density(left) * density(right)):
+            return as_sparse(left).product(as_sparse(right))
+        return self._dense.product(as_dense(left), as_dense(right))
+
+    def coproduct(self, left, right):
+        shape = (left.shape[0] + right.shape[0], left.shape[1] + right.shape[1])
+        cells = shape[0] * shape[1]
+        estimate = (nnz(left) + nnz(right)) / cells if cells else 0.0
+        if self._sparse(shape, estimate):
+            return as_sparse(left).coproduct(as_sparse(right))
+        return self._dense.coproduct(as_dense(left), as_dense(right))
+
+    # Compositions with structural relations keep the representation of the other operand
+
+    def gather_rows(self, value, index: np.ndarray):
+        if isinstance(value, SparseRelation):
+            return value.gather_rows(index)
+        return self._dense.gather_rows(value, index)
+
+    def scatter_columns(self, value, index: np.ndarray, columns: int):
+        if isinstance(value, SparseRelation):
+            return value.scatter_columns(index, columns)
+        return self._dense.scatter_columns(value, index, columns)
+
+    def rows_meeting(self, value, columns: np.ndarray) -> np.ndarray:
+        if isinstance(value, SparseRelation):
+            return value.rows_meeting(columns)
+        return self._dense.rows_meeting(value, columns)
+
+    def columns_meeting(self, value, rows: np.ndarray) -> np.ndarray:
+        if isinstance(value, SparseRelation):
+            return value.columns_meeting(rows)
+        return self._dense.columns_meeting(value, rows)
+
+    def transpose(self, value):
+        if isinstance(value, SparseRelation):
+            return value.transpose()
+        return self._dense.transpose(value)
+
+    def complement(self, value):
+        return self._choose(np.logical_not(as_dense(value)), 1.0 - density(value))
+
+    def closure(self, value):
+        if isinstance(value, SparseRelation):
+            result = semi_naive_closure(value)
+        else:
+            result = matrix_closure(value)
+        return self._choose(result, density(result))
+
+    def function(self, index: np.ndarray, columns: int):
+        if self._sparse((index.size, columns), 1 / columns if columns else 0.0):
+            return SparseRelation.function(index, columns)
+        return self._dense.function(index, columns)
+
+    def outer(self, rows: np.ndarray, columns: np.ndarray):
+        estimate = (rows.mean() if rows.size else 0.0) * (
+            columns.mean() if columns.size else 0.0
+        )
+        if self._sparse((rows.size, columns.size), estimate):
+            return SparseRelation.outer(rows, columns)
+        return self._dense.outer(rows, columns)
+
+    def to_dense(self, value) -> np.ndarray:
+        return as_dense(value)
+
+
+def nnz(value) -> int:
+    if isinstance(value, SparseRelation):
+        return value.nnz
+    return int(np.count_nonzero(value))
+
+
+def density(value) -> float:
+    if isinstance(value, SparseRelation):
+        return value.density
+    return float(value.mean()) if value.size else 0.0
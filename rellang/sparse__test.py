@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from rellang.evaluator import Evaluator
+from rellang.parser import parse
+from rellang.sparse import AutoBackend, SparseBackend, SparseRelation
+from rellang.testing import evaluate, random_relations
+
+EXPRESSIONS = [
+    "(R : A -> B);(S : B -> C)",
+    "(R : A -> B) * (S : B -> C)",
+    "(R : A -> B) + (S : B -> C)",
+    "((R : A -> B);(S : B -> C)) * (T : C -> A) + (R : A -> B)",
+    "rel D := (S : B -> C);(T : C -> A)\n(R : A -> B);D;(R : A -> B)",
+]
+
+
+@pytest.mark.parametrize("density", [0.02, 0.3])
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_backends_agree_with_dense(text, density):
+    carriers = {"A": 7, "B": 5, "C": 6}
+    relations = random_relations(
+        {"R": (7, 5), "S": (5, 6), "T": (6, 7)}, density, len(text)
+    )
+    dense = evaluate(text, carriers, relations)
+    assert np.array_equal(evaluate(text, carriers, relations, SparseBackend()), dense)
+    assert np.array_equal(evaluate(text, carriers, relations, AutoBackend()), dense)
+    # Everything dense except what the choices convert
+    mostly_dense = AutoBackend(max_density=0, path_cost=1e12)
+    assert np.array_equal(evaluate(text, carriers, relations, mostly_dense), dense)
+
+
+def test_sparse_relation_conversions():
+    relation = SparseRelation.from_pairs((3, 4), [2, 0, 2, 2], [1, 3, 0, 1])
+    assert relation.nnz == 3
+    assert relation.to_dense().tolist() == [
+        [False, False, False, True],
+        [False, False, False, False],
+        [True, True, False, False],
+    ]
+    assert SparseRelation.from_dense(relation.to_dense()) == relation
+    assert np.array_equal(relation.transpose().to_dense(), relation.to_dense().T)
+    with pytest.raises(ValueError, match="outside"):
+        SparseRelation.from_pairs((3, 4), [3], [0])
+
+
+def test_large_sparse_carriers():
+    """Carriers far too large for dense matrices evaluate through the sparse path"""
+    n = 300_000
+    successor = SparseRelation.from_pairs((n, n), np.arange(n - 1), np.arange(1, n))
+    backend = AutoBackend()
+    value = Evaluator({"A": n}, {"R": successor}, backend=backend).evaluate(
+        parse("(R : A -> A);(R : A -> A)").expr[0].expr
+    )
+    assert isinstance(value, SparseRelation)
+    assert value.nnz == n - 2
+    assert value.indices[0] == 2 and value.indices[-1] == n - 1
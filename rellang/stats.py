@@ -0,0 +1,72 @@
+from collections import Counter
+
+
+class ParseStats:
+    """
+    Timings and counts collected by parse(text, stats=ParseStats()).
+
+    Times are in seconds and accumulate over every parse the object is passed to, so one ParseStats can describe a single call or a whole batch. Rule times are exclusive: Lark transforms children before calling a rule, so a rule's time does not include its subtrees.
+    """
+
+    def __init__(self):
+        self.parses = 0
+        self.tokens = 0
+        self.lex_time = 0.0  # The parser's own lexer, as the parser pulls tokens from it
+        self.parse_time = 0.0  # LALR parser, from tokens to parse tree
+        self.transform_time = 0.0  # ASTTransformer, building nodes and type checking
+        self.rule_calls: Counter[str] = Counter()
+        self.rule_time: Counter[str] = Counter()
+        self.type_checks = 0  # Domain and codomain equality checks
+        self.type_check_time = 0.0
+        self.node_counts: Counter[str] = Counter()  # AST node class -> nodes built
+
+    @property
+    def total_time(self) -> float:
+        return self.lex_time + self.parse_time + self.transform_time
+
+    def record_rule(self, rule: str, elapsed: float):
+        self.rule_calls[rule] += 1
+        self.rule_time[rule] += elapsed
+
+    def to_dict(self) -> dict:
+        return {
+            "parses": self.parses,
+            "tokens": self.tokens,
+            "lex_time": self.lex_time,
+            "parse_time": self.parse_time,
+            "transform_time": self.transform_time,
+            "total_time": self.total_time,
+            "type_checks": self.type_checks,
+            "type_check_time": self.type_check_time,
+            "rules": {
+                rule: {"calls": calls, "time": self.rule_time[rule]}
+                for rule, calls in self.rule_calls.most_common()
+            },
+            "node_counts": dict(self.node_counts.most_common()),
+        }
+
+    def save(self, path: str):
+        """Writes to_dict() as JSON, for comparing runs offline."""
+        # Imported here, parsing imports this module and rarely saves stats
+        import json
+
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.parses} parses, {self.tokens} tokens, {self.total_time * 1e3:.3f} ms",
+            f"  lex        {self.lex_time * 1e3:10.3f} ms",
+            f"  parse      {self.parse_time * 1e3:10.3f} ms",
+            f"  transform  {self.transform_time * 1e3:10.3f} ms",
+            f"  type checks {self.type_checks} in {self.type_check_time * 1e3:.3f} ms",
+            "  rules:",
+        ]
+        for rule, elapsed in self.rule_time.most_common():
+            lines.append(
+                f"    {rule:<22} {self.rule_calls[rule]:>8} calls {elapsed * 1e3:10.3f} ms"
+            )
+        lines.append("  nodes:")
+        for name, count in self.node_counts.most_common():
+            lines.append(f"    {name:<22} {count:>8}")
+        return "\n".join(lines)
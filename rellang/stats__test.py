@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from rellang.parser import UnexpectedCharacters, build_parser, get_parser, parse
+from rellang.stats import ParseStats
+
+
+def test_stats_match_uninstrumented_parse():
+    """Instrumentation does not change the result and counts rules, type checks and nodes"""
+    text = "rel R := (S : A -> B)\nR;(T : B -> C) : A -> C\n"
+    stats = ParseStats()
+    assert parse(text, stats=stats) == parse(text)
+
+    assert stats.parses == 1
+    assert stats.tokens == 25
+    assert stats.rule_calls["rel_composed_trans"] == 1
+    assert stats.rule_calls["rel_def_trans"] == 1
+    # The composition and the explicit type annotation
+    assert stats.type_checks == 2
+    assert stats.node_counts["DefinedRelation"] == 1
+    assert stats.node_counts["Statement"] == 2
+    assert stats.lex_time > 0 and stats.parse_time > 0 and stats.transform_time > 0
+
+
+def test_stats_accumulate_and_errors_propagate():
+    stats = ParseStats()
+    parse("(R : A -> B)", stats=stats)
+    with pytest.raises(ValueError, match="Type mismatch in composition"):
+        parse("(R : A -> B);(S : C -> D)", stats=stats)
+    assert stats.parses == 2
+    assert stats.rule_calls["rel_atomic_trans"] == 3
+
+
+def test_stats_time_the_parsers_own_lexer(monkeypatch):
+    """Tokens are pulled from the lexer the parse consumes, not from a separate pass of Lark's basic lexer"""
+    parser = get_parser()
+    monkeypatch.setattr(parser, "lex", None)
+    stats = ParseStats()
+    parse(
+        "rel R := (S : A -> B)\nR;(T : B -> C) : A -> C\n", parser=parser, stats=stats
+    )
+    assert stats.tokens == 25
+    with pytest.raises(UnexpectedCharacters):
+        parse("(R : A -> 𝔸)", parser=parser, stats=stats)
+
+
+def test_stats_with_scanner_lexer():
+    stats = ParseStats()
+    parse("(R : A -> B) * (S : C -> D)", parser=build_parser(scanner=True), stats=stats)
+    assert stats.rule_calls["rel_product_trans"] == 1
+
+
+def test_stats_export(tmp_path):
+    stats = ParseStats()
+    parse("set X := A * B\n(R : X -> X)", stats=stats)
+    path = tmp_path / "stats.json"
+    stats.save(str(path))
+    exported = json.loads(path.read_text())
+    assert exported["rules"]["set_def_trans"]["calls"] == 1
+    assert exported["node_counts"]["Definition"] == 1
+    assert "set_def_trans" in str(stats)
@@ -0,0 +1,171 @@
+from typing import Callable, Optional
+
+import numpy as np
+
+from rellang.names_context import NamesContext
+from rellang.nodes import SetExpr, StructuralRelation
+
+
+class ImplicitRelation:
+    """
+    A relation kept as a rule instead of a matrix, for the structural relations.
+
+    A function relates each row i to the single column index[i]: Copy, First, Second, Collapse, Left and Right are functions, and their index array has one entry per domain element where the matrix would have |domain| x |codomain| entries. A transposed function is the converse of one, relating index[j] to j for each column j. An outer relation relates every row in the rows mask to every column in the columns mask: Full is the outer relation of two all-true masks and Empty that of two all-false ones.
+    """
+
+    __slots__ = ("shape", "index", "rows", "columns", "transposed")
+
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        index: Optional[np.ndarray] = None,
+        rows: Optional[np.ndarray] = None,
+        columns: Optional[np.ndarray] = None,
+        transposed: bool = False,
+    ):
+        self.shape = shape
+        self.index = index
+        self.rows = rows
+        self.columns = columns
+        self.transposed = transposed
+
+    @classmethod
+    def function(cls, index: np.ndarray, columns: int) -> "ImplicitRelation":
+        return cls((index.size, columns), index=index)
+
+    @classmethod
+    def outer(cls, rows: np.ndarray, columns: np.ndarray) -> "ImplicitRelation":
+        return cls((rows.size, columns.size), rows=rows, columns=columns)
+
+    @property
+    def is_function(self) -> bool:
+        return self.index is not None and not self.transposed
+
+    @property
+    def is_outer(self) -> bool:
+        return self.index is None
+
+    def converse(self) -> "ImplicitRelation":
+        if self.is_outer:
+            return ImplicitRelation.outer(self.columns, self.rows)
+        return ImplicitRelation(
+            (self.shape[1], self.shape[0]),
+            index=self.index,
+            transposed=not self.transposed,
+        )
+
+    def materialize(self, backend):
+        """The relation in the representation of backend."""
+        if self.is_outer:
+            return backend.outer(self.rows, self.columns)
+        if self.transposed:
+            return backend.transpose(backend.function(self.index, self.shape[0]))
+        return backend.function(self.index, self.shape[1])
+
+    def __repr__(self) -> str:
+        if self.is_outer:
+            kind = "outer"
+        else:
+            kind = "transposed function" if self.transposed else "function"
+        return f"ImplicitRelation({kind}, shape={self.shape})"
+
+
+def structural_value(
+    expr: StructuralRelation,
+    set_size: Callable[[SetExpr], int],
+    names: NamesContext,
+) -> ImplicitRelation:
+    """The ImplicitRelation of a structural relation, with the element order of DenseBackend."""
+    domain = names.unfold_set(expr.dom_cod.domain)
+    codomain = names.unfold_set(expr.dom_cod.codomain)
+    rows = set_size(domain)
+    columns = set_size(codomain)
+    name = expr.name
+    if name == "Full":
+        return ImplicitRelation.outer(
+            np.ones(rows, dtype=bool), np.ones(columns, dtype=bool)
+        )
+    if name == "Empty":
+        return ImplicitRelation.outer(
+            np.zeros(rows, dtype=bool), np.zeros(columns, dtype=bool)
+        )
+    elements = np.arange(rows, dtype=np.int64)
+    if name == "Copy":
+        # x is sent to (x, x), at x * |X| + x
+        index = elements * (rows + 1)
+    elif name == "First":
+        index = elements // set_size(domain.right)
+    elif name == "Second":
+        index = elements % set_size(domain.right)
+    elif name == "Collapse":
+        index = elements % columns
+    elif name == "Left":
+        index = elements
+    elif name == "Right":
+        index = elements + set_size(codomain.left)
+    else:
+        raise ValueError(f"Unknown structural relation: {name}")
+    return ImplicitRelation.function(index, columns)
+
+
+def compose(backend, left, right):
+    """
+    left;right where either side may be an ImplicitRelation.
+
+    Nothing is materialized: a function on the left gathers rows of right, a function on the right ORs the columns of left into their images, transposed functions do the same through transposes, an outer relation reduces the other side to the rows or columns meeting its masks, and most pairs of implicit relations compose into another.
+    """
+    if isinstance(left, ImplicitRelation) and isinstance(right, ImplicitRelation):
+        return _compose_implicit(backend, left, right)
+    if isinstance(left, ImplicitRelation):
+        if left.is_outer:
+            return ImplicitRelation.outer(
+                left.rows, backend.columns_meeting(right, left.columns)
+            )
+        if left.transposed:
+            # Row c of the result is the OR of the rows of right at the preimages of c
+            return backend.transpose(
+                backend.scatter_columns(
+                    backend.transpose(right), left.index, left.shape[0]
+                )
+            )
+        return backend.gather_rows(right, left.index)
+    if right.is_outer:
+        return ImplicitRelation.outer(
+            backend.rows_meeting(left, right.rows), right.columns
+        )
+    if right.transposed:
+        # Column j of the result is column index[j] of left
+        return backend.transpose(
+            backend.gather_rows(backend.transpose(left), right.index)
+        )
+    return backend.scatter_columns(left, right.index, right.shape[1])
+
+
+def _compose_implicit(backend, left: ImplicitRelation, right: ImplicitRelation):
+    if left.is_outer and right.is_outer:
+        if np.any(left.columns & right.rows):
+            return ImplicitRelation.outer(left.rows, right.columns)
+        return ImplicitRelation.outer(np.zeros_like(left.rows), right.columns)
+    if right.is_outer:
+        if left.transposed:
+            rows = np.zeros(left.shape[0], dtype=bool)
+            rows[left.index[right.rows]] = True
+            return ImplicitRelation.outer(rows, right.columns)
+        return ImplicitRelation.outer(right.rows[left.index], right.columns)
+    if left.is_outer:
+        if right.transposed:
+            return ImplicitRelation.outer(left.rows, left.columns[right.index])
+        columns = np.zeros(right.shape[1], dtype=bool)
+        columns[right.index[left.columns]] = True
+        return ImplicitRelation.outer(left.rows, columns)
+    if left.is_function and right.is_function:
+        return ImplicitRelation.function(right.index[left.index], right.shape[1])
+    if left.transposed and right.transposed:
+        # F^;G^ is the converse of G;F
+        return ImplicitRelation.function(
+            left.index[right.index], left.shape[0]
+        ).converse()
+    # A function against a transposed function relates pairs with equal images, which has no index form
+    if left.transposed:
+        return compose(backend, left.materialize(backend), right)
+    return compose(backend, left, right.materialize(backend))
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from rellang.bitpacked import BitPackedBackend
+from rellang.evaluator import DenseBackend, Evaluator
+from rellang.names_context import NamesContext
+from rellang.parser import parse
+from rellang.sparse import AutoBackend, SparseBackend
+from rellang.structural import ImplicitRelation
+from rellang.testing import materialized, random_relations
+
+CARRIERS = {"A": 5, "B": 3, "C": 4}
+SHAPES = {"R": (4, 15), "S": (5, 4), "T": (15, 15), "U": (8, 4)}
+
+EXPRESSIONS = [
+    "(R : C -> A * B);(First : A * B -> A)",
+    "(R : C -> A * B);(Second : A * B -> B)",
+    "(S : A -> C);(Copy : C -> C * C)",
+    "(Collapse : A + A -> A);(S : A -> C);(Copy : C -> C * C)",
+    "(First : A * B -> A);(S : A -> C)",
+    "(R : C -> A * B);(Full : A * B -> C)",
+    "(Full : C -> A * B);(T : A * B -> A * B)",
+    "(R : C -> A * B);(Empty : A * B -> C)",
+    "(U : C + C -> C);(Left : C -> C + A)",
+    "(U : C + C -> C);(Right : C -> A + C)",
+    "(Left : C -> C + C);(Collapse : C + C -> C)",
+    "(Copy : A -> A * A);(Second : A * A -> A);(Full : A -> B)",
+    "(Right : C -> C + C);(Full : C + C -> A);(Copy : A -> A * A)",
+    "(Full : A -> C);(Right : C -> A + C)",
+    "(First : A * B -> A) * (S : A -> C) + (Empty : B -> B)",
+    "set P := A * B\nrel F := First : P -> A\n(R : C -> P);F;(Copy : A -> A * A)",
+]
+
+
+@pytest.mark.parametrize(
+    "backend", [DenseBackend(), SparseBackend(), AutoBackend(), BitPackedBackend()]
+)
+@pytest.mark.parametrize("text", EXPRESSIONS)
+def test_implicit_evaluation_matches_materialized(text, backend):
+    names = NamesContext()
+    program = parse(text, names)
+    expr = program.expr[-1].expr
+    evaluator = Evaluator(CARRIERS, random_relations(SHAPES, 0.3), names, backend)
+    expected = materialized(expr, evaluator, random_relations(SHAPES, 0.3))
+    assert np.array_equal(backend.to_dense(evaluator.evaluate(expr)), expected)
+
+
+def test_structural_matrices():
+    evaluator = Evaluator(CARRIERS, {})
+
+    def value(text: str) -> np.ndarray:
+        return evaluator.evaluate(parse(text).expr[0].expr)
+
+    copy = value("Copy : B -> B * B")
+    assert [np.flatnonzero(row).tolist() for row in copy] == [[0], [4], [8]]
+    first = value("First : A * B -> A")
+    second = value("Second : A * B -> B")
+    for a in range(5):
+        for b in range(3):
+            assert np.flatnonzero(first[a * 3 + b]).tolist() == [a]
+            assert np.flatnonzero(second[a * 3 + b]).tolist() == [b]
+    collapse = value("Collapse : B + B -> B")
+    assert [np.flatnonzero(row).tolist() for row in collapse] == [[0], [1], [2]] * 2
+    assert np.array_equal(value("Left : B -> B + C")[:, :3], np.eye(3, dtype=bool))
+    assert np.array_equal(value("Right : C -> B + C")[:, 3:], np.eye(4, dtype=bool))
+    assert value("Full : A -> B").all()
+    assert not value("Empty : A -> B").any()
+
+
+def test_compositions_stay_implicit():
+    names = NamesContext()
+    expr = (
+        parse("(Copy : A -> A * A);(Second : A * A -> A);(Full : A -> B)", names)
+        .expr[0]
+        .expr
+    )
+    evaluator = Evaluator({"A": 2000, "B": 3000}, {}, names)
+    # As matrices Copy and Second would have 8 * 10**9 entries each
+    value = evaluator._value(expr)
+    assert isinstance(value, ImplicitRelation)
+    assert value.shape == (2000, 3000)
+    assert value.rows.all() and value.columns.all()
@@ -0,0 +1,71 @@
+import numpy as np
+
+from rellang.evaluator import DenseBackend, Evaluator
+from rellang.names_context import NamesContext
+from rellang.nodes import (
+    AtomicRelation,
+    ClosureRelation,
+    ComplementRelation,
+    ComposedRelation,
+    ConverseRelation,
+    CoproductRelation,
+    ProductRelation,
+    StructuralRelation,
+)
+from rellang.parser import parse
+from rellang.structural import structural_value
+
+# Helpers shared by the evaluator tests. Like the __test modules next to the code they test, this module ships with the package, it only needs numpy.
+
+
+def random_relations(
+    shapes: dict[str, tuple[int, int]], density: float, seed: int = 0
+) -> dict[str, np.ndarray]:
+    """A random boolean matrix of each shape, by relation name, with each pair related with probability density."""
+    rng = np.random.default_rng(seed)
+    return {name: rng.random(shape) < density for name, shape in shapes.items()}
+
+
+def evaluate(text: str, carriers: dict, relations: dict, backend=None) -> np.ndarray:
+    """The value of the last statement of a program, as a dense matrix."""
+    names = NamesContext()
+    program = parse(text, names)
+    evaluator = Evaluator(carriers, relations, names, backend)
+    return evaluator.backend.to_dense(evaluator.evaluate_program(program)[-1])
+
+
+def materialized(expr, evaluator: Evaluator, values: dict) -> np.ndarray:
+    """The value computed with every intermediate relation, structural ones included, as a dense matrix."""
+    dense = DenseBackend()
+    if isinstance(expr, StructuralRelation):
+        return structural_value(expr, evaluator.set_size, evaluator.names).materialize(
+            dense
+        )
+    if isinstance(expr, AtomicRelation):
+        return values[expr.rel_name]
+    if isinstance(expr, ConverseRelation):
+        return materialized(expr.expr, evaluator, values).T.copy()
+    if isinstance(expr, ComplementRelation):
+        return ~materialized(expr.expr, evaluator, values)
+    if isinstance(expr, ClosureRelation):
+        return _paths(materialized(expr.expr, evaluator, values))
+    if not isinstance(expr, (ComposedRelation, ProductRelation, CoproductRelation)):
+        return materialized(evaluator.names.get_rel(expr.name), evaluator, values)
+    left = materialized(expr.left, evaluator, values)
+    right = materialized(expr.right, evaluator, values)
+    if isinstance(expr, ComposedRelation):
+        return dense.compose(left, right)
+    if isinstance(expr, ProductRelation):
+        return dense.product(left, right)
+    return dense.coproduct(left, right)
+
+
+def _paths(matrix: np.ndarray) -> np.ndarray:
+    # The transitive closure, adding one step to every path until nothing changes, independent of rellang.closure
+    dense = DenseBackend()
+    result = matrix
+    while True:
+        longer = result | dense.compose(result, matrix)
+        if np.array_equal(longer, result):
+            return result
+        result = longer
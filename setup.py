@@ -1,8 +1,16 @@
 # setup.py
+import os
+import re
+
 from setuptools import setup, find_packages
 
+# The version is kept in rellang/__init__.py, where the AST cache keys on it. Read as text so building does not import the package.
+with open(os.path.join(os.path.dirname(__file__), "rellang", "__init__.py")) as f:
+    version = re.search(r'^__version__ = "([^"]+)"', f.read(), re.M).group(1)
+
 setup(
     name="rellang",
     packages=find_packages(),
-    version="0.1.0",
+    version=version,
+    entry_points={"console_scripts": ["rellang = rellang.main:main"]},
 )